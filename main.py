@@ -1,16 +1,16 @@
-import os
-
 import numpy as np
-import pandas as pd
-from tqdm import tqdm
 
+from package.batched_trainer import BatchedTrainer
 from package.dyna_q_agent import Dyna_Q_Agent
 from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
 from package.plots import plot_average_reward, plot_steps_per_episode
+from package.prioritized_sweeping_agent import Prioritized_Sweeping_Agent
 from package.q_learning_agent import Q_learning_Agent
+from package.results_store import ResultsStore, results_path
+from package.runner import run_experiments
 
 if __name__ == "__main__":
-    agents_parameters = {   
+    agents_parameters = {
         Q_learning_Agent: {
             "epsilon": 0.1,
             "gamma": 0.9,
@@ -28,44 +28,68 @@ if __name__ == "__main__":
             "gamma": 0.9,
             "step_size": 0.25,
         },
+        Prioritized_Sweeping_Agent: {
+            "planning_steps": 100,
+            "epsilon": 0.1,
+            "gamma": 0.9,
+            "step_size": 0.25,
+        },
     }
 
     num_runs = 10
     num_episodes = 250
     random_seeds = np.arange(num_runs) + 100  # avoid seed 17, only used for testing
+    # train all the runs of an agent together with vectorized updates
+    # (statistically equivalent to the sequential runs, but not bit-identical)
+    batched_training = False
+    # number of processes used for the sequential runs (None: one per CPU)
+    num_workers = None
+    # streams the metrics of every sequential run to results/live/<name>_<seed>.jsonl,
+    # follow them with package.live_metrics.follow_feeds("results/live")
+    live_feed_dir = None
 
-    for agent_class, agent_parameters in agents_parameters.items():
-        print(agent_class().name)
-        agent_results = []
-
-        for run in tqdm(range(num_runs), position=0, leave=True):
-            # instantiate a new agent for each run
-            agent = agent_class(**agent_parameters)
-            # Set a different random seed for each run
-            agent.random_generator = np.random.RandomState(seed=random_seeds[run])
-            agent.fit(
-                n_episode=num_episodes, log_progress=[num_episodes - 1], plot=False
-            )
+    # also export the results to results/<name>_results.csv
+    export_csv = False
 
-            # Append the episode results to the agent's results list
-            agent_results.append(agent.episodes)
-
-        # Concatenate the episode results from all runs
-        agent_results_concatenated = pd.concat(
-            agent_results, keys=range(num_runs), names=["Run", "episode"]
+    # one results store per agent, in results/<name>
+    stores = {
+        agent_class: ResultsStore.create(
+            results_path(agent_class.name),
+            name=agent_class.name,
+            n_episode=num_episodes,
+            parameters=agent_parameters,
         )
-
-        # Create results directory if it doesn't exist
-        os.makedirs("results", exist_ok=True)
-
-        # Write the concatenated results to a CSV file for all runs
-        results_file = f"results/{agent.name}_results.csv"
-        agent_results_concatenated.to_csv(
-            results_file,
-            header=["steps", "reward", "is_optimal"],
-            index_label=["Run", "episode"],
+        for agent_class, agent_parameters in agents_parameters.items()
+    }
+    sequential_agents = {
+        agent_class: agent_parameters
+        for agent_class, agent_parameters in agents_parameters.items()
+        if not (batched_training and agent_class in BatchedTrainer.supported_agents)
+    }
+    # each (agent, seed) run is trained in a separate process,
+    # the runs are appended to the stores as they complete
+    for agent_class, run, episodes in run_experiments(
+        sequential_agents,
+        random_seeds,
+        num_episodes,
+        max_workers=num_workers,
+        feed_dir=live_feed_dir,
+    ):
+        stores[agent_class].append(
+            episodes["steps"], episodes["reward"], seed=random_seeds[run]
         )
 
+    for agent_class, agent_parameters in agents_parameters.items():
+        if agent_class not in sequential_agents:
+            trainer = BatchedTrainer(agent_class, random_seeds, **agent_parameters)
+            trainer.fit(n_episode=num_episodes)
+            stores[agent_class].append_runs(
+                trainer.n_steps, trainer.rewards, seeds=random_seeds
+            )
+        if export_csv:
+            store = stores[agent_class]
+            store.to_csv(f"results/{store.name}_results.csv")
+
     # Compare the agents performances
-    plot_average_reward(Q_learning_Agent(), Dyna_Q_Agent(), Dyna_Q_plus_Agent())
-    plot_steps_per_episode(Q_learning_Agent(), Dyna_Q_Agent(), Dyna_Q_plus_Agent())
+    plot_average_reward(*agents_parameters)
+    plot_steps_per_episode(*agents_parameters)
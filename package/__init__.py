@@ -2,4 +2,6 @@ from .agent import Agent
 from .dyna_q_agent import Dyna_Q_Agent
 from .dyna_q_plus_agent import Dyna_Q_plus_Agent
 from .env import Env
+from .prioritized_sweeping_agent import Prioritized_Sweeping_Agent
 from .q_learning_agent import Q_learning_Agent
+from .vec_env import VecEnv
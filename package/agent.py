@@ -1,6 +1,11 @@
 import numpy as np
 
+from package.argmax import argmax
 from package.env import Env
+from package.metrics import EpisodeMetrics
+from package.random_streams import RandomStreams
+from package.sparse import SlotIndex, SparseTable
+from package.tables import StateDictView
 
 
 class Agent:
@@ -9,27 +14,37 @@ class Agent:
         gamma: float = 0.1,  # undiscounted task
         step_size: float = 0.1,
         epsilon: float = 0.1,
+        env: Env = None,
+        sparse: bool = False,
     ) -> None:
-        self.env = Env()
+        # grid world of the agent, the default 8x12 grid if env is None
+        self.env = Env() if env is None else env
+        # sparse tables only store the rows of the states visited so far
+        self.sparse = sparse
+        self.slot_index = SlotIndex(self.env.n_states) if sparse else None
         self.gamma = gamma
         self.step_size = step_size
         self.epsilon = epsilon
-        self.n_actions = 4
+        self.n_actions = self.env.n_actions
         self.actions = list(range(self.n_actions))
         self.last_action = -1
         self.last_state = -1
-        self.start_position = self.coord_to_state(
-            self.env.coordinates.get("A")[0][::-1]
-        )
+        self.start_position = self.env.start_state
         self.position = self.start_position
-        self.q_values = self.init_state_action_dict()
-        self.state_visits = self.init_state_dict(initial_value=0)
+        self.q_table = self.init_state_action_table()
+        self.visit_counts = self.init_state_table(initial_value=0)
+        # dict-compatible views, q_values[state] returns the row of q_table
+        self.q_values = StateDictView(self.q_table, self.env.states)
+        self.state_visits = StateDictView(self.visit_counts, self.env.states)
         self.random_generator = np.random.RandomState(
             seed=17
         )  # used mainly for testing
         self.done = False
-        self.n_steps = []
-        self.rewards = []
+        # steps, reward and optimality class of each episode
+        self.metrics = EpisodeMetrics()
+        self.episode_reward = 0
+        # phase timers of the last fit, set by fit(profile=True)
+        self.profiler = None
 
     def reset(self):
         self.done = False
@@ -37,29 +52,73 @@ class Agent:
         self.last_action = -1
         self.last_state = -1
 
+    @property
+    def random_generator(self):
+        return self.rng.generator
+
+    @random_generator.setter
+    def random_generator(self, generator) -> None:
+        """
+        Wraps the generator in RandomStreams: a RandomState reproduces the former
+        seeded sequences, a Generator (e.g. np.random.default_rng) is drawn in blocks
+        """
+        self.rng = RandomStreams(generator)
+
+    @property
+    def n_steps(self) -> np.ndarray:
+        return self.metrics.steps
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self.metrics.rewards
+
+    def memory_usage(self) -> dict:
+        """
+        Bytes used by the tables of the agent and by its environment
+        """
+        usage = {
+            name: getattr(self, name).nbytes
+            for name in [
+                "q_table",
+                "visit_counts",
+                "last_tried",
+                "model",
+                "queue",
+                "replay_buffer",
+            ]
+            if getattr(self, name, None) is not None
+        }
+        if self.sparse:
+            usage["slot_index"] = self.slot_index.nbytes
+        usage["env"] = self.env.nbytes
+        usage["total"] = sum(usage.values())
+        return usage
+
     def coord_to_state(self, coordinates: tuple) -> int:
-        return coordinates[0] * 10 + coordinates[1]
+        return self.env.coord_to_state(coordinates)
 
     def state_to_coord(self, state: int):
-        return (int(state // 10), state % 10)
-
-    def init_state_action_dict(self) -> dict:
-        output_dict = {}
-        rows, cols = self.env.grid.index, self.env.grid.columns
-        for col in cols:
-            for row in rows:
-                output_dict[self.coord_to_state((col, row))] = np.zeros(
-                    4, dtype=np.float32
-                )
-        return output_dict
-
-    def init_state_dict(self, initial_value) -> dict:
-        output_dict = {}
-        rows, cols = self.env.grid.index, self.env.grid.columns
-        for col in cols:
-            for row in rows:
-                output_dict[self.coord_to_state((col, row))] = initial_value
-        return output_dict
+        return self.env.state_to_coord(state)
+
+    def init_table(self, row_shape: tuple = (), dtype=np.float32, fill_value=0):
+        """
+        Table indexed by state, a dense array or a SparseTable if the agent is sparse
+        """
+        if self.sparse:
+            return SparseTable(self.slot_index, row_shape, dtype, fill_value)
+        return np.full((self.env.n_states, *row_shape), fill_value, dtype=dtype)
+
+    def init_state_action_table(self) -> np.ndarray:
+        return self.init_table((self.n_actions,), np.float32)
+
+    def init_state_table(self, initial_value) -> np.ndarray:
+        return self.init_table((), np.asarray(initial_value).dtype, initial_value)
+
+    def init_state_action_dict(self) -> StateDictView:
+        return StateDictView(self.init_state_action_table(), self.env.states)
+
+    def init_state_dict(self, initial_value) -> StateDictView:
+        return StateDictView(self.init_state_table(initial_value), self.env.states)
 
     def update_coord(self, coord: tuple, action: int) -> tuple:
         """
@@ -68,45 +127,27 @@ class Agent:
         If the agent falls into a whole ('T') or finds the goal ('G'), the episode ends
         """
         assert action in [0, 1, 2, 3], f"Invalid action {action}"
-        x, y = coord
-        if action == 0:
-            y -= 1
-        elif action == 1:
-            x += 1
-        elif action == 2:
-            y += 1
-        elif action == 3:
-            x -= 1
-
-        # if the action moves the agent out of bounds
-        if x not in range(0, self.env.grid.shape[1]):
-            return coord
-        if y not in range(0, self.env.grid.shape[0]):
-            return coord
-
-        # /!\ when parsing the dataframe x and y are reversed
-        # if the agent bumps into a wall
-        if self.env.grid.loc[y, x] == "W":
-            return coord
-        # if the agent goes through the portal
-        if self.env.grid.loc[y, x] == "P":
-            return (11, 0)
-        # if the agent encounters falls into a trap
-        if self.env.grid.loc[y, x] == "T":
-            self.rewards.append(0)
-            self.done = True
-            # return self.env.coordinates["A"][0]
-        # if the agent finds the treasure
-        if self.env.grid.loc[y, x] == "G":
-            self.rewards.append(1)
+        return self.state_to_coord(self.transition(self.coord_to_state(coord), action))
+
+    def transition(self, state: int, action: int) -> int:
+        """
+        Looks up the next state in the environment's transition table
+        Records the reward and ends the episode on terminal transitions
+        """
+        if self.env.terminal[state, action]:
+            self.episode_reward = self.env.reward[state, action]
             self.done = True
+        return self.env.next_state[state, action]
 
-        self.position == (x, y)
-        return (x, y)
+    def observe_reward(self, state: int) -> int:
+        """
+        Reward received when reaching state
+        """
+        return self.env.state_reward[state]
 
     def update_state(self, state: int, action: int) -> int:
         """
-        Uses the update_coord function to update the agent's position (i.e. state)
+        Uses the transition table to update the agent's position (i.e. state)
         based on its current state and an action
         """
         assert action in [
@@ -115,11 +156,9 @@ class Agent:
             2,
             3,
         ], f"Invalid action: {action}, should be in {[i for i in range(4)]}"
-        coord = self.state_to_coord(state)
-        updated_coord = self.update_coord(coord, action)
-        updated_state = self.coord_to_state(updated_coord)
+        updated_state = self.transition(state, action)
         self.position = updated_state
-        self.state_visits[self.position] += 1
+        self.visit_counts[self.position] += 1
         return updated_state
 
     def argmax(self, action_values) -> int:
@@ -127,9 +166,7 @@ class Agent:
         Selects the index of the highest action value
         Breaks ties randomly
         """
-        return self.random_generator.choice(
-            np.flatnonzero(action_values == np.max(action_values))
-        )
+        return argmax(action_values, self.rng.randint)
 
     def epsilon_greedy(self, state) -> int:
         """
@@ -137,10 +174,10 @@ class Agent:
         w.r.t. the current action-value function
         """
         # probability of epsilon of picking a random action
-        if self.random_generator.rand() < self.epsilon:
-            action = self.random_generator.choice(self.actions)
+        if self.rng.rand() < self.epsilon:
+            action = self.rng.randint(self.n_actions)
         # picking the action greedily w.r.t state action values
         else:
-            action_values = self.q_values[state]
+            action_values = self.q_table[state]
             action = self.argmax(action_values)
         return action
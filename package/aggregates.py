@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from package.results_store import ResultsStore, results_path
+
+
+class EpisodeAggregate:
+    """
+    Per-episode count, mean and sum of squared deviations (m2) of the steps and
+    rewards across runs
+    New runs are merged into the aggregate with the parallel update of Chan et al.,
+    without going back over the runs already aggregated
+    """
+
+    columns = ("steps", "reward")
+
+    def __init__(self, n_episode: int) -> None:
+        self.count = np.zeros(n_episode, dtype=np.int64)
+        self.mean = {column: np.zeros(n_episode) for column in self.columns}
+        self.m2 = {column: np.zeros(n_episode) for column in self.columns}
+
+    @property
+    def n_episode(self) -> int:
+        return len(self.count)
+
+    @property
+    def n_runs(self) -> int:
+        return int(self.count.max()) if self.n_episode else 0
+
+    def merge(self, count: np.ndarray, mean: dict, m2: dict) -> None:
+        """
+        Merges the statistics of other runs, given per episode
+        """
+        total = self.count + count
+        weight = np.divide(count, total, out=np.zeros(len(total)), where=total > 0)
+        for column in self.columns:
+            delta = mean[column] - self.mean[column]
+            self.mean[column] = self.mean[column] + delta * weight
+            self.m2[column] = (
+                self.m2[column] + m2[column] + delta**2 * self.count * weight
+            )
+        self.count = total
+
+    def update(self, steps: np.ndarray, rewards: np.ndarray) -> None:
+        """
+        Adds new runs, arrays of shape (n_runs, n_episode)
+        """
+        if len(steps) == 0:
+            return
+        runs = {
+            "steps": np.asarray(steps, dtype=np.float64),
+            "reward": np.asarray(rewards, dtype=np.float64),
+        }
+        mean = {column: values.mean(axis=0) for column, values in runs.items()}
+        m2 = {
+            column: ((values - mean[column]) ** 2).sum(axis=0)
+            for column, values in runs.items()
+        }
+        self.merge(np.full(self.n_episode, len(steps)), mean, m2)
+
+    def variance(self, column: str) -> np.ndarray:
+        """
+        Sample variance of each episode, nan for the episodes of a single run
+        """
+        return np.divide(
+            self.m2[column],
+            self.count - 1,
+            out=np.full(self.n_episode, np.nan),
+            where=self.count > 1,
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Mean and variance of the steps and reward and number of runs, by episode
+        """
+        frame = pd.DataFrame(
+            {
+                "steps": self.mean["steps"],
+                "reward": self.mean["reward"],
+                "steps_var": self.variance("steps"),
+                "reward_var": self.variance("reward"),
+                "count": self.count,
+            }
+        )
+        frame.index.name = "episode"
+        return frame
+
+    @classmethod
+    def from_csv(cls, path: str) -> "EpisodeAggregate":
+        """
+        Aggregates the results of an agent saved in the former CSV format
+        """
+        results = pd.read_csv(path, index_col=["Run", "episode"])
+        grouped = results.groupby("episode")[["steps", "reward"]]
+        count, mean, variance = grouped.count(), grouped.mean(), grouped.var()
+        aggregate = cls(len(count))
+        aggregate.count = count["steps"].to_numpy(dtype=np.int64)
+        for column in cls.columns:
+            aggregate.mean[column] = mean[column].to_numpy(dtype=np.float64)
+            aggregate.m2[column] = variance[column].fillna(0).to_numpy(
+                dtype=np.float64
+            ) * (aggregate.count - 1)
+        return aggregate
+
+
+class AggregateCache:
+    """
+    Aggregates of the results of the agents, cached by results file
+    An entry is reused as long as the modification time and size of its file
+    are unchanged, the runs appended to a results store since then are merged
+    incrementally, only a new store or a modified CSV file is aggregated again
+    @results_dir: directory of the results stores (results/<name>)
+    and of the former CSV files (results/<name>_results.csv)
+    """
+
+    def __init__(self, results_dir: str = "results") -> None:
+        self.results_dir = results_dir
+        # path: (file signature, store identity, aggregate)
+        self.entries = {}
+
+    @staticmethod
+    def signature(path: str) -> tuple:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, name: str) -> EpisodeAggregate:
+        """
+        Aggregate of the results of an agent, from its results store if it exists
+        """
+        path = results_path(name, self.results_dir)
+        if ResultsStore.exists(path):
+            return self.from_store(path)
+        return self.from_csv(os.path.join(self.results_dir, f"{name}_results.csv"))
+
+    def from_store(self, path: str) -> EpisodeAggregate:
+        signature = self.signature(os.path.join(path, ResultsStore.metadata_file))
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[2]
+        store = ResultsStore(path)
+        identity = (store.metadata.get("created"), store.n_episode)
+        if entry is not None and entry[1] == identity:
+            aggregate = entry[2]
+        else:
+            aggregate = EpisodeAggregate(store.n_episode)
+        # the runs are only appended, the new ones follow the aggregated ones
+        aggregate.update(
+            store.steps[aggregate.n_runs :], store.rewards[aggregate.n_runs :]
+        )
+        self.entries[path] = (signature, identity, aggregate)
+        return aggregate
+
+    def from_csv(self, path: str) -> EpisodeAggregate:
+        signature = self.signature(path)
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != signature:
+            entry = (signature, None, EpisodeAggregate.from_csv(path))
+            self.entries[path] = entry
+        return entry[2]
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+# shared by the plots (and any dashboard) of the current process
+aggregate_cache = AggregateCache()
@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def argmax(action_values, randint) -> int:
+    """
+    Index of the highest action value, ties are broken uniformly at random
+    Works on python floats, without the temporary arrays of
+    flatnonzero(action_values == max(action_values)), which is faster for
+    the few actions of the grid world
+    @randint: randint(n) draws an integer in [0, n), only called when there are ties,
+    the draw is the same as random_generator.choice(ties)
+    """
+    if isinstance(action_values, np.ndarray):
+        action_values = action_values.tolist()
+    best = max(action_values)
+    n_ties = action_values.count(best)
+    index = action_values.index(best)
+    if n_ties == 1:
+        return index
+    # skip to the tie selected by the draw
+    for _ in range(randint(n_ties)):
+        index = action_values.index(best, index + 1)
+    return index
+
+
+def argmax_batch(action_values: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+    """
+    Batched argmax over the rows of a (batch, n_actions) matrix, the tie of
+    row i is selected with uniforms[i] (uniform in [0, 1))
+    """
+    is_max = action_values == action_values.max(axis=1, keepdims=True)
+    n_ties = is_max.sum(axis=1)
+    tie_index = (uniforms * n_ties).astype(np.int64)
+    # first action at which the number of ties seen exceeds tie_index
+    return np.argmax(is_max.cumsum(axis=1) > tie_index[:, None], axis=1)
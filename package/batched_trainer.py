@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+
+from package.argmax import argmax_batch
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.metrics import episodes_frame
+from package.q_learning_agent import Q_learning_Agent
+from package.vec_env import VecEnv
+
+
+class BatchedStreams:
+    """
+    One random stream per seed, drawn in blocks of block_size uniforms
+    Every run consumes the same number of uniforms at each step, so the
+    values used by a run only depend on its own seed
+    """
+
+    def __init__(self, seeds: list, block_size: int = 4096) -> None:
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+        self.block_size = block_size
+        self.refill()
+
+    def refill(self) -> None:
+        self.buffer = np.stack(
+            [generator.random(self.block_size) for generator in self.generators]
+        )
+        self.position = 0
+
+    def uniform(self, n: int) -> np.ndarray:
+        """
+        Returns the next n uniforms of every stream, shape (n_runs, n)
+        """
+        if n > self.block_size:
+            self.block_size = n
+            self.refill()
+        elif self.position + n > self.block_size:
+            self.refill()
+        values = self.buffer[:, self.position : self.position + n]
+        self.position += n
+        return values
+
+
+class BatchedTrainer:
+    """
+    Trains one agent per seed in lockstep, all the runs share stacked arrays:
+    @q_values: (n_runs, n_states, n_actions) Q-tensor
+    @state_visits: (n_runs, n_states) visit counts
+    Epsilon-greedy selection, TD updates, Dyna model updates, planning and
+    episode bookkeeping are performed for every run with vectorized NumPy calls
+    Supports the Q_learning_Agent, Dyna_Q_Agent and Dyna_Q_plus_Agent algorithms,
+    with the same update rules as the sequential agents (statistically equivalent
+    results, the random numbers are drawn from per-seed numpy Generators)
+    """
+
+    supported_agents = (Q_learning_Agent, Dyna_Q_Agent, Dyna_Q_plus_Agent)
+
+    def __init__(
+        self,
+        agent_class: type,
+        seeds: list,
+        late_portal_episode: int = 100,
+        **agent_parameters,
+    ) -> None:
+        if agent_class not in self.supported_agents:
+            raise ValueError(f"Batched training is not available for {agent_class}")
+        agent = agent_class(**agent_parameters)
+        self.name = agent.name
+        self.gamma = agent.gamma
+        self.step_size = agent.step_size
+        self.epsilon = agent.epsilon
+        self.planning = issubclass(agent_class, Dyna_Q_Agent)
+        self.exploration_bonus = issubclass(agent_class, Dyna_Q_plus_Agent)
+        self.planning_steps = agent.planning_steps if self.planning else 0
+        self.kappa = agent.kappa if self.exploration_bonus else 0
+        self.seeds = list(seeds)
+        self.n_runs = len(self.seeds)
+
+        self.vec_env = VecEnv(
+            self.n_runs, env=agent.env, late_portal_episode=late_portal_episode
+        )
+        self.n_states, self.n_actions = self.vec_env.n_states, self.vec_env.n_actions
+        self.streams = BatchedStreams(self.seeds)
+        self.q_values = np.zeros(
+            (self.n_runs, self.n_states, self.n_actions), dtype=np.float32
+        )
+        self.state_visits = np.zeros((self.n_runs, self.n_states), dtype=np.int64)
+        if self.planning:
+            self.init_model()
+
+    def init_model(self) -> None:
+        """
+        Per run model arrays, model_next_state is -1 for terminal transitions
+        Visited states and their recorded actions are kept in insertion order
+        so that planning samples a state, then an action, like the agents do
+        """
+        shape = (self.n_runs, self.n_states, self.n_actions)
+        self.model_next_state = np.zeros(shape, dtype=np.int64)
+        self.model_reward = np.zeros(shape, dtype=np.float32)
+        self.model_observed = np.zeros(shape, dtype=bool)
+        self.model_states = np.zeros((self.n_runs, self.n_states), dtype=np.int64)
+        self.n_model_states = np.zeros(self.n_runs, dtype=np.int64)
+        self.model_actions = np.zeros(shape, dtype=np.int64)
+        self.n_model_actions = np.zeros((self.n_runs, self.n_states), dtype=np.int64)
+        if self.exploration_bonus:
+            # Dyna-Q+ records the taken action first, then the others in order
+            self.action_orders = np.array(
+                [
+                    [action] + [a for a in range(self.n_actions) if a != action]
+                    for action in range(self.n_actions)
+                ]
+            )
+            # tau(state, action) = time - last_tried(state, action)
+            self.time = np.zeros(self.n_runs, dtype=np.int64)
+            self.last_tried = np.zeros(shape, dtype=np.int64)
+
+    def select_actions(self, runs: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """
+        Epsilon-greedy selection for every run, ties are broken randomly
+        """
+        uniforms = self.streams.uniform(2)[runs]
+        greedy = argmax_batch(self.q_values[runs, states], uniforms[:, 1])
+        random_actions = (uniforms[:, 1] * self.n_actions).astype(np.int64)
+        return np.where(uniforms[:, 0] < self.epsilon, random_actions, greedy)
+
+    def td_update(
+        self,
+        runs: np.ndarray,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """
+        Q(s, a) += step_size * (reward + gamma * max Q(s', .) - Q(s, a)),
+        without the bootstrap term for terminal transitions
+        """
+        q = self.q_values[runs, states, actions].astype(np.float64)
+        bootstrap = self.q_values[runs, next_states].max(axis=1)
+        target = rewards + np.where(dones, 0, self.gamma * bootstrap)
+        self.q_values[runs, states, actions] = q + self.step_size * (target - q)
+
+    def update_model(
+        self,
+        runs: np.ndarray,
+        states: np.ndarray,
+        actions: np.ndarray,
+        next_states: np.ndarray,
+        rewards: np.ndarray,
+    ) -> None:
+        new_states = self.n_model_actions[runs, states] == 0
+        new_runs, added = runs[new_states], states[new_states]
+        self.model_states[new_runs, self.n_model_states[new_runs]] = added
+        self.n_model_states[new_runs] += 1
+        if self.exploration_bonus:
+            # every action of a visited state is in the model, the ones that
+            # were not taken lead back to the state with a reward of 0
+            self.model_actions[new_runs, added] = self.action_orders[
+                actions[new_states]
+            ]
+            self.n_model_actions[new_runs, added] = self.n_actions
+            self.model_observed[runs, states] = True
+            self.model_next_state[runs, states] = states[:, None]
+            self.model_reward[runs, states] = 0
+        else:
+            self.state_visits[runs[~new_states], states[~new_states]] += 1
+            new_pairs = ~self.model_observed[runs, states, actions]
+            pair_runs, pair_states = runs[new_pairs], states[new_pairs]
+            self.model_actions[
+                pair_runs, pair_states, self.n_model_actions[pair_runs, pair_states]
+            ] = actions[new_pairs]
+            self.n_model_actions[pair_runs, pair_states] += 1
+            self.model_observed[runs, states, actions] = True
+        self.model_next_state[runs, states, actions] = next_states
+        self.model_reward[runs, states, actions] = rewards
+
+    def planning_step(self, runs: np.ndarray) -> None:
+        """
+        Performs planning_steps simulated updates for every run
+        The model does not change during planning, so all the (state, action)
+        samples are drawn at once, only the TD updates are applied in sequence
+        """
+        uniforms = self.streams.uniform(2 * self.planning_steps)[runs]
+        state_index = (uniforms[:, ::2] * self.n_model_states[runs, None]).astype(
+            np.int64
+        )
+        states = self.model_states[runs[:, None], state_index]
+        action_index = (
+            uniforms[:, 1::2] * self.n_model_actions[runs[:, None], states]
+        ).astype(np.int64)
+        actions = self.model_actions[runs[:, None], states, action_index]
+        next_states = self.model_next_state[runs[:, None], states, actions]
+        rewards = self.model_reward[runs[:, None], states, actions].astype(np.float64)
+        if self.exploration_bonus:
+            tau = (
+                self.time[runs, None] - self.last_tried[runs[:, None], states, actions]
+            )
+            rewards += self.kappa * np.sqrt(tau)
+        discounts = np.where(next_states == -1, 0, self.gamma)
+
+        # flat indices into q_values, one column per planning step
+        run_rows = runs[:, None] * self.n_states
+        pairs = (run_rows + states) * self.n_actions + actions
+        next_rows = run_rows + np.maximum(next_states, 0)
+        q_flat = self.q_values.reshape(-1)
+        q_rows = self.q_values.reshape(-1, self.n_actions)
+        for step in range(self.planning_steps):
+            pair = pairs[:, step]
+            q = q_flat[pair]
+            target = rewards[:, step] + discounts[:, step] * q_rows[
+                next_rows[:, step]
+            ].max(axis=1)
+            q_flat[pair] = q + self.step_size * (target - q)
+
+    def fit(self, n_episode: int) -> None:
+        """
+        Plays n_episode episodes for every run
+        @n_steps, @rewards: (n_runs, n_episode) arrays of episode results
+        """
+        self.n_episode = n_episode
+        self.n_steps = np.zeros((self.n_runs, n_episode), dtype=np.int64)
+        self.rewards = np.zeros((self.n_runs, n_episode), dtype=np.float32)
+        episode_steps = np.zeros(self.n_runs, dtype=np.int64)
+        active = self.vec_env.episodes < n_episode
+
+        while active.any():
+            runs = np.flatnonzero(active)
+            states = self.vec_env.states[runs]
+            episodes = self.vec_env.episodes[runs]
+            actions = self.select_actions(runs, states)
+            if self.exploration_bonus:
+                # tau is reset for every action but the first one of an episode
+                started = episode_steps[runs] > 0
+                tried = runs[started]
+                self.time[tried] += 1
+                self.last_tried[tried, states[started], actions[started]] = self.time[
+                    tried
+                ]
+            next_states, rewards, dones = self.vec_env.step(actions, envs=runs)
+            self.state_visits[runs, next_states] += 1
+            episode_steps[runs] += 1
+
+            self.td_update(runs, states, actions, rewards, next_states, dones)
+            if self.planning:
+                model_next_states = np.where(dones, -1, next_states)
+                self.update_model(runs, states, actions, model_next_states, rewards)
+            self.state_visits[runs[dones], states[dones]] += 1
+            if self.planning:
+                self.planning_step(runs)
+
+            # episode bookkeeping
+            finished = runs[dones]
+            self.n_steps[finished, episodes[dones]] = episode_steps[finished]
+            self.rewards[finished, episodes[dones]] = rewards[dones]
+            episode_steps[finished] = 0
+            active = self.vec_env.episodes < n_episode
+
+    def results(self) -> pd.DataFrame:
+        """
+        Episode results of every run, indexed by (Run, episode) like in main.py
+        """
+        return pd.concat(
+            [
+                episodes_frame(self.n_steps[run], self.rewards[run])
+                for run in range(self.n_runs)
+            ],
+            keys=range(self.n_runs),
+            names=["Run", "episode"],
+        )
@@ -0,0 +1,384 @@
+import argparse
+import json
+import os
+import platform
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.env import Env
+from package.layouts import maze_layout
+from package.prioritized_sweeping_agent import Prioritized_Sweeping_Agent
+from package.q_learning_agent import Q_learning_Agent
+from package.runner import run_experiments
+from package.vec_env import VecEnv
+
+SEED = 17
+GRID_SHAPES = [(8, 12), (100, 100), (1000, 1000)]
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join("benchmarks", "results.json")
+
+
+def best_time(function, repeat: int) -> float:
+    """
+    Smallest wall time of repeat calls of function, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def record(name: str, value: float, unit: str, higher_is_better: bool) -> dict:
+    return {
+        "name": name,
+        "value": value,
+        "unit": unit,
+        "higher_is_better": higher_is_better,
+    }
+
+
+def make_env(grid_shape: tuple) -> Env:
+    """
+    Default grid of the experiment for its 8x12 shape, a generated maze otherwise
+    """
+    if grid_shape == (8, 12):
+        return Env()
+    return Env(maze_layout(*grid_shape, seed=SEED, late_portal=True))
+
+
+def bench_env_steps(grid_shape: tuple, n_steps: int, repeat: int) -> list:
+    """
+    Seconds to build the transition tables of the grid, and transitions per second
+    of Agent.update_state (single grid) and of VecEnv.step (64 grids stepped together)
+    """
+    size = "x".join(map(str, grid_shape))
+    build_seconds = best_time(lambda: make_env(grid_shape), repeat)
+    env = make_env(grid_shape)
+    agent = Q_learning_Agent(env=env)
+    actions = np.random.RandomState(SEED).randint(agent.n_actions, size=n_steps)
+
+    def single():
+        agent.reset()
+        for action in actions:
+            agent.update_state(agent.position, action)
+            if agent.done:
+                agent.reset()
+
+    vec_env = VecEnv(64, env=env)
+    # the tables of the grid and of its opened late portal lead to valid states
+    if vec_env.next_state.min() < 0:
+        raise ValueError(f"The {size} grid has transitions to invalid states")
+    vec_actions = np.random.RandomState(SEED).randint(
+        vec_env.n_actions, size=(n_steps // 64 + 1, 64)
+    )
+
+    def vectorized():
+        vec_env.reset()
+        for actions in vec_actions:
+            vec_env.step(actions)
+
+    return [
+        record(f"env_build_{size}", build_seconds, "s", False),
+        record(
+            f"env_steps_{size}", n_steps / best_time(single, repeat), "steps/s", True
+        ),
+        record(
+            f"vec_env_steps_{size}",
+            vec_actions.size / best_time(vectorized, repeat),
+            "steps/s",
+            True,
+        ),
+    ]
+
+
+def play_steps(agent, n_steps: int) -> None:
+    """
+    Plays n_steps transitions of the agent, starting new episodes when they end,
+    so that the work is the same on every grid whatever the length of the episodes
+    """
+    agent.reset()
+    agent.agent_start(agent.start_position)
+    for _ in range(n_steps):
+        if agent.done:
+            agent.agent_end()
+            agent.reset()
+            agent.agent_start(agent.start_position)
+        else:
+            agent.step(agent.position, agent.observe_reward(agent.position))
+
+
+def bench_q_learning(grid_shape: tuple, n_steps: int, repeat: int) -> list:
+    """
+    Transitions per second of Q-learning on the grid, with the legacy RandomState
+    (drawn value by value) and with a PCG64 Generator (drawn in blocks)
+    """
+    size = "x".join(map(str, grid_shape))
+    env = make_env(grid_shape)
+    results = []
+    for suffix, make_generator in [
+        ("", np.random.RandomState),
+        ("_pcg64", np.random.default_rng),
+    ]:
+
+        def train():
+            agent = Q_learning_Agent(env=env)
+            agent.random_generator = make_generator(SEED)
+            play_steps(agent, n_steps)
+
+        seconds = best_time(train, repeat)
+        results.append(
+            record(
+                f"q_learning_transitions{suffix}_{size}",
+                n_steps / seconds,
+                "steps/s",
+                True,
+            )
+        )
+    return results
+
+
+def bench_planning(
+    grid_shape: tuple, planning_steps: list, n_calls: int, repeat: int
+) -> list:
+    """
+    Planning updates per second of Dyna-Q and Dyna-Q+ on the grid, scalar and
+    batched, with a model filled by 2000 transitions of training (10 planning steps),
+    and of prioritized sweeping
+    """
+    size = "x".join(map(str, grid_shape))
+    env = make_env(grid_shape)
+    results = []
+    for agent_class in [Dyna_Q_Agent, Dyna_Q_plus_Agent]:
+        for batched in [False, True]:
+            for k in planning_steps:
+                agent = agent_class(
+                    planning_steps=10, batched_planning=batched, env=env
+                )
+                agent.random_generator = np.random.RandomState(SEED)
+                play_steps(agent, 2000)
+                agent.planning_steps = k
+
+                def plan():
+                    for _ in range(n_calls):
+                        agent.planning_step()
+
+                mode = "batched" if batched else "scalar"
+                results.append(
+                    record(
+                        f"{agent.name}_{mode}_planning_{k}_{size}",
+                        n_calls * k / best_time(plan, repeat),
+                        "updates/s",
+                        True,
+                    )
+                )
+    # prioritized sweeping only plans the queued pairs, its planning updates are
+    # counted over 2000 transitions of training (queueing and predecessors included),
+    # random initial values give the pairs a priority before the goal is found
+    initial_values = np.random.RandomState(SEED).rand(env.n_states, env.n_actions)
+    for k in planning_steps:
+        updates = []
+
+        def train():
+            agent = Prioritized_Sweeping_Agent(planning_steps=k, env=env)
+            agent.random_generator = np.random.RandomState(SEED)
+            agent.q_table[:] = initial_values
+            play_steps(agent, 2000)
+            updates.append(agent.planning_updates)
+
+        seconds = best_time(train, repeat)
+        results.append(
+            record(
+                f"Prioritized_sweeping_planning_{k}_{size}",
+                updates[-1] / seconds,
+                "updates/s",
+                True,
+            )
+        )
+    return results
+
+
+def bench_logging(n_calls: int, repeat: int) -> list:
+    """
+    Seconds per call of state_dict_to_matrix and of the episodes
+    DataFrame built by log_agent_performances
+    """
+    agent = Q_learning_Agent()
+    agent.random_generator = np.random.RandomState(SEED)
+    agent.fit(100, snapshot_every=0)
+
+    def matrices():
+        for _ in range(n_calls):
+            agent.state_dict_to_matrix(agent.q_values)
+
+    def frames():
+        for _ in range(n_calls):
+            agent.metrics.to_frame(last=100)
+
+    return [
+        record(
+            "state_dict_to_matrix",
+            best_time(matrices, repeat) / n_calls,
+            "s/call",
+            False,
+        ),
+        record("episodes_frame", best_time(frames, repeat) / n_calls, "s/call", False),
+    ]
+
+
+def bench_experiment(n_runs: int, n_episode: int, repeat: int) -> list:
+    """
+    Seconds of a main.py-style experiment, run in the current process
+    """
+    agents_parameters = {
+        Q_learning_Agent: {"epsilon": 0.1, "gamma": 0.9, "step_size": 0.25},
+        Dyna_Q_Agent: {
+            "planning_steps": 100,
+            "epsilon": 0.1,
+            "gamma": 0.9,
+            "step_size": 0.25,
+        },
+        Dyna_Q_plus_Agent: {
+            "planning_steps": 100,
+            "epsilon": 0.1,
+            "gamma": 0.9,
+            "step_size": 0.25,
+        },
+        Prioritized_Sweeping_Agent: {
+            "planning_steps": 100,
+            "epsilon": 0.1,
+            "gamma": 0.9,
+            "step_size": 0.25,
+        },
+    }
+    seeds = np.arange(n_runs) + 100
+
+    def experiment():
+        for _ in run_experiments(
+            agents_parameters, seeds, n_episode, max_workers=1, progress=False
+        ):
+            pass
+
+    return [record("experiment", best_time(experiment, repeat), "s", False)]
+
+
+def run_benchmarks(quick: bool = False, repeat: int = 3) -> list:
+    """
+    Runs every benchmark with fixed seeds, quick uses smaller workloads
+    The environment, Q-learning and planning are benchmarked on every shape of
+    GRID_SHAPES (up to 100x100 if quick), to catch slowdowns growing with the grid
+    """
+    scale = 10 if quick else 1
+    grid_shapes = GRID_SHAPES[:2] if quick else GRID_SHAPES
+    planning_steps = [10, 100] if quick else [10, 50, 100, 500]
+    per_grid = [
+        bench_env_steps(shape, 20_000 // scale, repeat)
+        + bench_q_learning(shape, 20_000 // scale, repeat)
+        + bench_planning(shape, planning_steps, 200 // scale, repeat)
+        for shape in grid_shapes
+    ]
+    return (
+        sum(per_grid, [])
+        + bench_logging(100 // scale, repeat)
+        # a single repetition, the experiment is long enough to be stable
+        + bench_experiment(1 if quick else 2, 5 if quick else 100, 1)
+    )
+
+
+def compare(results: list, baseline: list, tolerance: float = 0.25) -> list:
+    """
+    Returns the benchmarks of results that are more than tolerance slower than the baseline
+    Each regression is recorded as the result with its baseline value and slowdown ratio
+    """
+    baseline = {result["name"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result["name"])
+        if reference is None:
+            continue
+        if result["higher_is_better"]:
+            slowdown = reference["value"] / result["value"]
+        else:
+            slowdown = result["value"] / reference["value"]
+        if slowdown > 1 + tolerance:
+            regressions.append(
+                {**result, "baseline": reference["value"], "slowdown": slowdown}
+            )
+    return regressions
+
+
+def save_results(results: list, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+
+
+def load_results(path: str) -> list:
+    with open(path) as file:
+        return json.load(file)["results"]
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Throughput benchmarks of the agents and environment, exits with"
+        " status 1 on regressions and 2 when there is no baseline to compare to"
+    )
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="stores the results as the new baseline",
+    )
+    parser.add_argument(
+        "--init-baseline",
+        action="store_true",
+        help="stores the results as the baseline if there is none yet",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="accepted slowdown relative to the baseline (0.25 = 25%%)",
+    )
+    args = parser.parse_args(args)
+
+    results = run_benchmarks(quick=args.quick, repeat=args.repeat)
+    for result in results:
+        print(f"{result['name']:<40} {result['value']:>14.6g} {result['unit']}")
+    save_results(results, args.output)
+    if args.save_baseline or (args.init_baseline and not os.path.isfile(args.baseline)):
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.isfile(args.baseline):
+        # a distinct status, the regressions could not be checked
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create it")
+        return 2
+    regressions = compare(results, load_results(args.baseline), args.tolerance)
+    for regression in regressions:
+        print(
+            f"Regression: {regression['name']} is {regression['slowdown']:.2f}x slower "
+            f"than the baseline ({regression['value']:.6g} vs {regression['baseline']:.6g} {regression['unit']})"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import importlib
+import inspect
+import json
+import os
+import shutil
+
+import numpy as np
+
+from package.env import Env
+from package.layouts import LATE_PORTAL
+
+# version of the checkpoint format
+FORMAT = 1
+METADATA_FILE = "checkpoint.json"
+# attributes rebuilt by fit, saved as None
+TRANSIENT = {"profiler", "value_estimates", "trajectory_log"}
+NUMBERS = (int, float, np.integer, np.floating)
+
+
+def class_path(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def import_class(path: str) -> type:
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def has_custom_state(cls: type) -> bool:
+    """
+    Whether the class defines __getstate__ (e.g. RandomStreams)
+    """
+    return getattr(cls, "__getstate__", None) is not getattr(
+        object, "__getstate__", None
+    )
+
+
+class CheckpointWriter:
+    """
+    Encodes the attributes of an object (recursively) as a json description,
+    the arrays and the long lists of numbers are written to .npy files
+    Objects referenced several times (e.g. the table of q_values and q_table)
+    are written once and referenced by name
+    The environment is saved as its layout and rebuilt when loading
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.names = {}
+        # keeps the encoded objects alive, so that their ids are not reused
+        self.encoded = []
+
+    def save_array(self, array: np.ndarray, name: str) -> str:
+        file = f"{name}.npy"
+        np.save(os.path.join(self.path, file), array, allow_pickle=False)
+        return file
+
+    def encode(self, value, name: str):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, np.generic):
+            return {"scalar": value.item(), "dtype": value.dtype.str}
+        if isinstance(value, np.dtype):
+            return {"dtype": value.str}
+        if isinstance(value, tuple):
+            return {"tuple": self.encode_items(value, name)}
+        if isinstance(value, list):
+            if value and all(
+                isinstance(item, NUMBERS) and not isinstance(item, bool)
+                for item in value
+            ):
+                return {"list": self.save_array(np.asarray(value), name)}
+            return self.encode_items(value, name)
+        if type(value) is dict:
+            return {
+                "dict": {
+                    key: self.encode(item, f"{name}.{key}")
+                    for key, item in value.items()
+                }
+            }
+        if id(value) in self.names:
+            return {"ref": self.names[id(value)]}
+        self.names[id(value)] = name
+        self.encoded.append(value)
+        if isinstance(value, np.ndarray):
+            return {
+                "array": self.save_array(value, name),
+                "size": value.size,
+                "writeable": value.flags.writeable,
+            }
+        if isinstance(value, np.random.RandomState):
+            return {"random_state": self.encode(value.get_state(legacy=False), name)}
+        if isinstance(value, np.random.Generator):
+            return {"generator": self.encode(value.bit_generator.state, name)}
+        if isinstance(value, Env):
+            # the late portal cells are turned into portals when it opens
+            layout = value.cells.copy()
+            for row, col in value.coordinates.get("LP", ()):
+                layout[row, col] = LATE_PORTAL
+            return {
+                "env": class_path(type(value)),
+                "layout": self.save_array(layout, name),
+                "late_portal_active": value.late_portal_active,
+            }
+        cls = type(value)
+        state = value.__getstate__() if has_custom_state(cls) else vars(value)
+        return {
+            "object": class_path(cls),
+            "attributes": {
+                key: None if key in TRANSIENT else self.encode(item, f"{name}.{key}")
+                for key, item in state.items()
+                # skips the methods shadowed by an attached PhaseProfiler
+                if not (inspect.ismethod(item) or inspect.isfunction(item))
+            },
+        }
+
+    def encode_items(self, items, name: str) -> list:
+        return [
+            self.encode(item, f"{name}.{index}") for index, item in enumerate(items)
+        ]
+
+
+class CheckpointReader:
+    """
+    Rebuilds the objects encoded by CheckpointWriter
+    @mmap_mode: mode of the memory-mapped arrays, "c" (copy-on-write) lets the agent
+    update its tables without modifying the checkpoint, None loads them in memory
+    """
+
+    def __init__(self, path: str, mmap_mode: str = "c") -> None:
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.objects = {}
+
+    def load_array(self, file: str, mmap_mode: str = None) -> np.ndarray:
+        return np.load(
+            os.path.join(self.path, file), mmap_mode=mmap_mode, allow_pickle=False
+        )
+
+    def decode(self, value, name: str):
+        if not isinstance(value, (dict, list)):
+            return value
+        if isinstance(value, list):
+            return self.decode_items(value, name)
+        if "scalar" in value:
+            return np.dtype(value["dtype"]).type(value["scalar"])
+        if "dtype" in value:
+            return np.dtype(value["dtype"])
+        if "tuple" in value:
+            return tuple(self.decode_items(value["tuple"], name))
+        if "list" in value:
+            return self.load_array(value["list"]).tolist()
+        if "dict" in value:
+            return {
+                key: self.decode(item, f"{name}.{key}")
+                for key, item in value["dict"].items()
+            }
+        if "ref" in value:
+            return self.objects[value["ref"]]
+        decoded = self.decode_object(value, name)
+        self.objects[name] = decoded
+        return decoded
+
+    def decode_object(self, value: dict, name: str):
+        if "array" in value:
+            # empty arrays cannot be memory-mapped
+            mmap_mode = self.mmap_mode if value["size"] else None
+            array = self.load_array(value["array"], mmap_mode)
+            array.flags.writeable = value["writeable"]
+            return array
+        if "random_state" in value:
+            random_state = np.random.RandomState()
+            random_state.set_state(self.decode(value["random_state"], name))
+            return random_state
+        if "generator" in value:
+            state = self.decode(value["generator"], name)
+            bit_generator = getattr(np.random, state["bit_generator"])()
+            bit_generator.state = state
+            return np.random.Generator(bit_generator)
+        if "env" in value:
+            env = import_class(value["env"])(self.load_array(value["layout"]))
+            if value["late_portal_active"]:
+                env.activate_late_portal()
+            return env
+        cls = import_class(value["object"])
+        decoded = cls.__new__(cls)
+        # registered before its attributes, which can reference it
+        self.objects[name] = decoded
+        state = {
+            key: self.decode(item, f"{name}.{key}")
+            for key, item in value["attributes"].items()
+        }
+        if has_custom_state(cls):
+            decoded.__setstate__(state)
+        else:
+            decoded.__dict__.update(state)
+        return decoded
+
+    def decode_items(self, items: list, name: str) -> list:
+        return [
+            self.decode(item, f"{name}.{index}") for index, item in enumerate(items)
+        ]
+
+
+def save_checkpoint(agent, path: str) -> None:
+    """
+    Saves the full state of an agent in the directory path: its tables, model,
+    random generator, episode counters, metrics and the status of the late portal
+    The checkpoint is written next to path and then replaces it, so that the
+    previous checkpoint stays valid (and can still be memory-mapped) until then
+    """
+    temporary_path = f"{path}.tmp"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    os.makedirs(temporary_path)
+    writer = CheckpointWriter(temporary_path)
+    metadata = {"format": FORMAT, "agent": writer.encode(agent, "agent")}
+    with open(os.path.join(temporary_path, METADATA_FILE), "w") as file:
+        json.dump(metadata, file, indent=1)
+    if os.path.isdir(path):
+        # the files of a memory-mapped checkpoint stay readable once removed
+        shutil.rmtree(path)
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str, mmap_mode: str = "c"):
+    """
+    Loads an agent saved with save_checkpoint, its arrays are memory-mapped
+    (copy-on-write by default) instead of being read in memory
+    Training resumes with agent.fit and continues exactly as without the interruption
+    """
+    with open(os.path.join(path, METADATA_FILE)) as file:
+        metadata = json.load(file)
+    if metadata["format"] != FORMAT:
+        raise ValueError(
+            f"Unsupported checkpoint format {metadata['format']}, expected {FORMAT}"
+        )
+    return CheckpointReader(path, mmap_mode).decode(metadata["agent"], "agent")
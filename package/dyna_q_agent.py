@@ -1,70 +1,109 @@
 import numpy as np
+from package.env import Env
 from package.q_learning_agent import Q_learning_Agent
+from package.world_model import WorldModel
 
 
 class Dyna_Q_Agent(Q_learning_Agent):
+    name = "Dyna-Q"
+
     def __init__(
         self,
         gamma: float = 1,
         step_size: float = 0.1,
         epsilon: float = 0.1,
         planning_steps: int = 100,
+        batched_planning: bool = False,
+        planning_chunk_size: int = 128,
+        env: Env = None,
+        sparse: bool = False,
     ) -> None:
-        super().__init__(gamma, step_size, epsilon)
+        super().__init__(gamma, step_size, epsilon, env, sparse)
         self.planning_steps = planning_steps
-        self.model = {}  # model[state][action] = (new state, reward)
-        self.name = "Dyna-Q"
+        # batched planning draws and applies the planning updates chunk by chunk
+        self.batched_planning = batched_planning
+        self.planning_chunk_size = planning_chunk_size
+        # model[state][action] = (new state, reward)
+        self.model = WorldModel(self.env.n_states, self.n_actions, sparse=sparse)
+        # number of planning updates performed, used to compare planning throughput
+        self.planning_updates = 0
 
     def update_model(
         self, last_state: int, last_action: int, state: int, reward: int
     ) -> None:
         """
-        Adds a new transition to the model, if the state is encountered for
-        the first time, creates a new key
+        Adds a new transition to the model, the state is counted as visited
+        if it was already in the model
         """
-        try:
-            self.model[last_state][last_action] = (state, reward)
-            self.state_visits[last_state] += 1
-        except KeyError:
-            self.model[last_state] = {}
-            self.model[last_state][last_action] = (state, reward)
+        if last_state in self.model:
+            self.visit_counts[last_state] += 1
+        self.model.update(last_state, last_action, state, reward)
 
     def planning_step(self) -> None:
         """
         Performs planning (indirect RL)
         """
+        self.planning_updates += self.planning_steps
+        if self.batched_planning:
+            return self.batched_planning_step()
         for _ in range(self.planning_steps):
-            # select a visited state
-            planning_state = self.random_generator.choice(list(self.model.keys()))
-            # select a recorded action
-            planning_action = self.random_generator.choice(
-                list(self.model[planning_state].keys())
-            )
+            # select a visited state and one of its recorded actions
+            planning_state, planning_action = self.model.sample(self.rng)
             # get the predicted next state and reward
-            next_state, reward = self.model[planning_state][planning_action]
+            next_state = self.model.next_state[planning_state, planning_action]
+            reward = self.model.reward[planning_state, planning_action]
             # update the values in case of terminal state
             if next_state == -1:
-                update = self.q_values[planning_state][planning_action]
+                update = self.q_table[planning_state, planning_action]
                 update += self.step_size * (reward - update)
-                self.q_values[planning_state][planning_action] = update
+                self.q_table[planning_state, planning_action] = update
             # update the values in case of non-terminal state
             else:
-                update = self.q_values[planning_state][planning_action]
+                update = self.q_table[planning_state, planning_action]
                 update += self.step_size * (
-                    reward + self.gamma * np.max(self.q_values[next_state]) - update
+                    reward + self.gamma * self.q_table[next_state].max() - update
                 )
-                self.q_values[planning_state][planning_action] = update
+                self.q_table[planning_state, planning_action] = update
+
+    def planning_reward(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """
+        Rewards predicted by the model for the planning updates
+        """
+        return self.model.reward[states, actions]
+
+    def batched_planning_step(self) -> None:
+        """
+        Performs the planning updates in chunks of planning_chunk_size samples
+        The targets of a chunk are computed from the q-values at the start of the chunk
+        A pair sampled n times in a chunk receives n successive updates towards
+        its target: q <- target + (1 - step_size) ** n * (q - target)
+        """
+        remaining = self.planning_steps
+        while remaining > 0:
+            n_samples = min(remaining, self.planning_chunk_size)
+            remaining -= n_samples
+            states, actions = self.model.sample_batch(self.rng, n_samples)
+            _, index, counts = np.unique(
+                states * self.n_actions + actions, return_index=True, return_counts=True
+            )
+            states, actions = states[index], actions[index]
+            next_states = self.model.next_state[states, actions]
+            # no bootstrap term for terminal transitions (next_state == -1)
+            bootstrap = self.q_table[np.maximum(next_states, 0)].max(axis=1)
+            targets = self.planning_reward(states, actions) + np.where(
+                next_states == -1, 0, self.gamma * bootstrap
+            )
+            q = self.q_table[states, actions].astype(np.float64)
+            self.q_table[states, actions] = targets + (1 - self.step_size) ** counts * (
+                q - targets
+            )
 
     def step(self, state: int, reward: int) -> None:
         """
         A step performed by the agent
         """
         # direct RL update
-        update = self.q_values[self.past_state][self.past_action]
-        update += self.step_size * (
-            reward + self.gamma * np.max(self.q_values[state]) - update
-        )
-        self.q_values[self.past_state][self.past_action] = update
+        self.direct_update(state, reward)
         # model update
         self.update_model(self.past_state, self.past_action, state, reward)
         # planning step
@@ -82,15 +121,13 @@ class Dyna_Q_Agent(Q_learning_Agent):
         """
         Called once the agent reaches a terminal state
         """
-        terminal_coordinates = self.state_to_coord(self.position)
-        # the coordinates must be reversed when querying the dataframe
-        reward = self.env.get_reward(terminal_coordinates)
+        reward = self.observe_reward(self.position)
         # direct RL update for a terminal state
-        update = self.q_values[self.past_state][self.past_action]
+        update = self.q_table[self.past_state, self.past_action]
         update += self.step_size * (reward - update)
-        self.q_values[self.past_state][self.past_action] = update
+        self.q_table[self.past_state, self.past_action] = update
         # model update with next_action = -1
         self.update_model(self.past_state, self.past_action, -1, reward)
-        self.state_visits[self.past_state] += 1
+        self.visit_counts[self.past_state] += 1
         # planning step
         self.planning_step()
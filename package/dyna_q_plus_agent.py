@@ -1,5 +1,6 @@
 import numpy as np
 from package import Dyna_Q_Agent
+from package.env import Env
 
 
 class Dyna_Q_plus_Agent(Dyna_Q_Agent):
@@ -9,8 +10,12 @@ class Dyna_Q_plus_Agent(Dyna_Q_Agent):
     The number of transitions since the last time (state, action)
     was tried is given by tau(state, action)
     The associated reward is given by: reward + kappa * sqrt(tau(state, action))
+    tau is computed lazily as time - last_tried(state, action), where time counts
+    the calls to update_tau and last_tried records the last time each pair was tried
     """
 
+    name = "Dyna-Q_plus"
+
     def __init__(
         self,
         gamma: float = 1,
@@ -18,11 +23,24 @@ class Dyna_Q_plus_Agent(Dyna_Q_Agent):
         epsilon: float = 0.1,
         planning_steps: int = 100,
         kappa: float = 1e-3,
+        batched_planning: bool = False,
+        planning_chunk_size: int = 128,
+        env: Env = None,
+        sparse: bool = False,
     ) -> None:
-        super().__init__(gamma, step_size, epsilon, planning_steps)
-        self.name = "Dyna-Q_plus"
+        super().__init__(
+            gamma,
+            step_size,
+            epsilon,
+            planning_steps,
+            batched_planning,
+            planning_chunk_size,
+            env,
+            sparse,
+        )
         self.kappa = kappa
-        self.tau = self.init_state_action_dict()
+        self.time = 0
+        self.last_tried = self.init_table((self.n_actions,), np.int64)
 
     def update_model(
         self, last_state: int, last_action: int, state: int, reward: int
@@ -33,18 +51,27 @@ class Dyna_Q_plus_Agent(Dyna_Q_Agent):
         are initialized with 0, they will be updated at each time steps
         according to the Dyna-Q+ algorithm
         """
-        if last_state not in self.model:
-            self.model[last_state] = {last_action: (state, reward)}
+        self.model.update(last_state, last_action, state, reward)
         for action in self.actions:
             if action != last_action:
-                self.model[last_state][action] = (last_state, 0)
-        else:
-            self.model[last_state][last_action] = (state, reward)
+                self.model.update(last_state, action, last_state, 0)
+
+    @property
+    def tau(self) -> np.ndarray:
+        """
+        Number of transitions since each (state, action) was last tried
+        """
+        return (self.time - np.asarray(self.last_tried)).astype(np.float32)
+
+    def get_tau(self, states, actions):
+        """
+        tau for a single pair or for arrays of states and actions
+        """
+        return np.float32(self.time - self.last_tried[states, actions])
 
     def update_tau(self, state: int, action: int) -> None:
-        for key in list(self.tau.keys()):
-            self.tau[key] += 1
-        self.tau[state][action] = 0
+        self.time += 1
+        self.last_tried[state, action] = self.time
 
     def planning_step(self) -> None:
         """
@@ -52,42 +79,48 @@ class Dyna_Q_plus_Agent(Dyna_Q_Agent):
         Performs planning (indirect RL) and adds a bonus to the transition reward
         The bonus is given by kappa * sqrt(tau(state, action))
         """
+        self.planning_updates += self.planning_steps
+        if self.batched_planning:
+            return self.batched_planning_step()
         for _ in range(self.planning_steps):
-            # select a visited state
-            planning_state = self.random_generator.choice(list(self.model.keys()))
-            # select a recorded action
-            planning_action = self.random_generator.choice(
-                list(self.model[planning_state].keys())
-            )
+            # select a visited state and one of its recorded actions
+            planning_state, planning_action = self.model.sample(self.rng)
             # get the predicted next state and reward
-            next_state, reward = self.model[planning_state][planning_action]
+            next_state = self.model.next_state[planning_state, planning_action]
+            reward = self.model.reward[planning_state, planning_action]
             # add the bonus reward
-            reward += self.kappa * np.sqrt(self.tau[planning_state][planning_action])
+            reward += self.kappa * np.sqrt(
+                self.get_tau(planning_state, planning_action)
+            )
             # update the values in case of terminal state
             if next_state == -1:
-                update = self.q_values[planning_state][planning_action]
+                update = self.q_table[planning_state, planning_action]
                 update += self.step_size * (reward - update)
-                self.q_values[planning_state][planning_action] = update
+                self.q_table[planning_state, planning_action] = update
             # update the values in case of non-terminal state
             else:
-                update = self.q_values[planning_state][planning_action]
+                update = self.q_table[planning_state, planning_action]
                 update += self.step_size * (
-                    reward + self.gamma * np.max(self.q_values[next_state]) - update
+                    reward + self.gamma * self.q_table[next_state].max() - update
                 )
-                self.q_values[planning_state][planning_action] = update
+                self.q_table[planning_state, planning_action] = update
+
+    def planning_reward(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """
+        Adds the bonus reward to the rewards predicted by the model
+        """
+        return self.model.reward[states, actions] + self.kappa * np.sqrt(
+            self.get_tau(states, actions)
+        )
 
     def step(self, state: int, reward: int) -> None:
         """
         Overwrite the Dyna-Q step function
-        At every step, we increment the last visit counter for every state action by 1
-        The current state action pair is reset to 0
+        At every step, we increment the time counter by 1 and record it as
+        the last time the current state action pair was tried (tau = 0)
         """
         # direct RL update
-        update = self.q_values[self.past_state][self.past_action]
-        update += self.step_size * (
-            reward + self.gamma * np.max(self.q_values[state]) - update
-        )
-        self.q_values[self.past_state][self.past_action] = update
+        self.direct_update(state, reward)
         # model update
         self.update_model(self.past_state, self.past_action, state, reward)
         # planning step
@@ -1,35 +1,105 @@
 import numpy as np
 import pandas as pd
 
+from package.layouts import (
+    DEFAULT_LAYOUT,
+    EMPTY,
+    GOAL,
+    LATE_PORTAL,
+    PORTAL,
+    PORTAL_EXIT,
+    START,
+    TRAP,
+    WALL,
+    parse_layout,
+)
+
+# codes of the cells in the grid DataFrame
+GRID_CODES = {
+    EMPTY: 0,
+    WALL: "W",
+    TRAP: "T",
+    PORTAL: "P",
+    PORTAL_EXIT: "P",
+    LATE_PORTAL: "LP",
+    GOAL: "G",
+    START: "A",
+}
+
 
 class Env:
-    def __init__(self) -> None:
-        self.coordinates = {
-            "A": ((6, 1),),  # agent start position
-            "W": ((3, range(3)), (range(5, 8), 3)),  # wall
-            "T": ((range(3), 8), (3, range(8, 12))),  # trap
-            "P": ((6, 10), (0, 11)),  # portal
-            "LP": ((2, 1),),  # late portal
-            "G": ((2, 9),),  # goal
-        }
-        self.generate_grid()
+    """
+    Grid world defined by a layout (see package.layouts), the default layout
+    is the 8x12 grid of the experiment
+    @layout: text map, array of characters or array of cell codes
+    (e.g. generated by maze_layout or rooms_layout)
+    States are encoded in row-major order: state = y * n_cols + x, with (x, y) = (col, row)
+    """
+
+    def __init__(self, layout=None) -> None:
+        self.cells = parse_layout(DEFAULT_LAYOUT if layout is None else layout)
+        self.n_rows, self.n_cols = self.cells.shape
+        self.n_states = self.n_rows * self.n_cols
+        self.n_actions = 4
+        # (dx, dy) for the actions up, right, down, left
+        self.moves = np.array([[0, -1], [1, 0], [0, 1], [-1, 0]])
+        self.coordinates = self.find_markers()
+        if "A" not in self.coordinates:
+            raise ValueError("The layout has no start cell")
+        has_portals = "P" in self.coordinates or "LP" in self.coordinates
+        if has_portals and PORTAL_EXIT not in self.cells:
+            raise ValueError("The layout has portals but no portal exit")
+        self.start_state = self.coord_to_state(self.coordinates["A"][0][::-1])
+        self.late_portal_active = False
         self.generate_reward_map()
+        self.build_transition_table()
+
+    def find_markers(self) -> dict:
+        """
+        (row, col) coordinates of the start, portals (the exit last), late portals and goals
+        Walls and traps are only stored in cells
+        """
+        coordinates = {}
+        for key, codes in [
+            ("A", [START]),
+            ("P", [PORTAL, PORTAL_EXIT]),
+            ("LP", [LATE_PORTAL]),
+            ("G", [GOAL]),
+        ]:
+            cells = [
+                tuple(int(i) for i in cell)
+                for code in codes
+                for cell in np.argwhere(self.cells == code)
+            ]
+            if cells:
+                coordinates[key] = tuple(cells)
+        return coordinates
 
-    def generate_grid(self) -> pd.DataFrame:
-        grid = np.zeros((8, 12), dtype=np.object0)
-        for key in list(self.coordinates.keys()):
-            for values in self.coordinates[key]:
-                grid[values] = key
-        self.grid = pd.DataFrame(grid)
+    @property
+    def grid(self) -> pd.DataFrame:
+        """
+        Cells of the grid, 0 for empty cells and W, T, P, LP, G or A otherwise
+        """
+        codes = np.empty(max(GRID_CODES) + 1, dtype=object)
+        for code, value in GRID_CODES.items():
+            codes[code] = value
+        return pd.DataFrame(codes[self.cells])
+
+    @property
+    def has_late_portal(self) -> bool:
+        return "LP" in self.coordinates
 
     def activate_late_portal(self):
-        late_portal_coord = self.coordinates.get("LP")[0]
-        self.grid.loc[late_portal_coord] = "P"
+        self.cells[self.cells == LATE_PORTAL] = PORTAL
+        self.late_portal_active = True
+        self.build_transition_table()
 
-    def generate_reward_map(self) -> pd.DataFrame:
-        reward_map = np.zeros((8, 12), dtype=np.float32)
-        reward_map[self.coordinates["G"][0]] = 1
-        self.reward_map = pd.DataFrame(reward_map)
+    def generate_reward_map(self) -> None:
+        self.reward_array = (self.cells == GOAL).astype(np.float32)
+
+    @property
+    def reward_map(self) -> pd.DataFrame:
+        return pd.DataFrame(self.reward_array)
 
     def get_reward(self, coordinates: tuple = None, reverse: bool = True) -> int:
         """
@@ -41,6 +111,73 @@ class Env:
                     as they are already in the (row, col) format
         """
         if reverse:
-            return self.reward_map.loc[coordinates[::-1]]
+            return self.reward_array[coordinates[::-1]]
         else:
-            return self.reward_map.loc[coordinates]
+            return self.reward_array[coordinates]
+
+    def coord_to_state(self, coordinates: tuple) -> int:
+        return coordinates[1] * self.n_cols + coordinates[0]
+
+    def state_to_coord(self, state: int):
+        y, x = divmod(int(state), self.n_cols)
+        return (x, y)
+
+    def state_array_to_grid(self, values: np.ndarray) -> np.ndarray:
+        """
+        Reshapes an array indexed by state into the (n_rows, n_cols) layout of the grid
+        """
+        return values.reshape(self.n_rows, self.n_cols)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the layout and the transition tables
+        """
+        arrays = [
+            self.cells,
+            self.reward_array,
+            self.states,
+            self.next_state,
+            self.reward,
+            self.terminal,
+            self.portal,
+        ]
+        return sum(array.nbytes for array in arrays)
+
+    def build_transition_table(self) -> None:
+        """
+        Precomputes the dynamics of the grid as dense arrays indexed by [state, action]:
+        @next_state: state reached after taking the action
+        @reward: reward associated to the next state
+        @terminal: whether the transition ends the episode (trap or goal)
+        @portal: whether the transition was redirected by a portal
+        Every cell is a state, vectorized over the grid (linear in its size)
+        Called again whenever the grid changes (e.g. activate_late_portal)
+        """
+        cells = self.cells.ravel()
+        self.states = np.arange(self.n_states)
+        ys, xs = np.divmod(self.states, self.n_cols)
+        exits = np.flatnonzero(cells == PORTAL_EXIT)
+        portal_exit = exits[-1] if len(exits) else -1
+
+        next_state = np.empty((self.n_states, self.n_actions), dtype=np.int64)
+        terminal = np.empty((self.n_states, self.n_actions), dtype=bool)
+        portal = np.empty((self.n_states, self.n_actions), dtype=bool)
+        for action, (dx, dy) in enumerate(self.moves):
+            nx, ny = xs + dx, ys + dy
+            # moving out of bounds leaves the agent in place
+            in_bounds = (nx >= 0) & (nx < self.n_cols) & (ny >= 0) & (ny < self.n_rows)
+            moved = np.where(in_bounds, self.coord_to_state((nx, ny)), self.states)
+            target = np.where(in_bounds, cells[moved], WALL)
+            is_portal = (target == PORTAL) | (target == PORTAL_EXIT)
+            moved = np.where(is_portal, portal_exit, moved)
+            # bumping into a wall (or the edge of the grid) leaves the agent in place
+            next_state[:, action] = np.where(target == WALL, self.states, moved)
+            portal[:, action] = is_portal
+            terminal[:, action] = (target == TRAP) | (target == GOAL)
+
+        self.state_reward = self.reward_array.ravel()
+        self.next_state = next_state
+        self.reward = self.state_reward[next_state]
+        self.terminal = terminal
+        self.portal = portal
@@ -0,0 +1,72 @@
+import numpy as np
+from plotly.colors import get_colorscale, sample_colorscale, unlabel_rgb
+
+
+def select_frames(
+    values, every: int = 1, min_change: float = None, max_frames: int = None
+) -> np.ndarray:
+    """
+    Indices of the frames of an animation of values (n_frames, n_rows, n_cols)
+    @every: keeps one frame out of every
+    @min_change: skips the frames whose values differ by less than min_change
+    (maximum absolute difference) from the last kept frame
+    @max_frames: then keeps at most max_frames frames, evenly spaced
+    The first and last frames are always kept
+    """
+    n_frames = len(values)
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.int64)
+    indices = np.arange(0, n_frames, every)
+    if min_change is not None:
+        kept = [indices[0]]
+        last = np.asarray(values[indices[0]])
+        for index in indices[1:]:
+            frame = np.asarray(values[index])
+            if np.abs(frame - last).max() >= min_change:
+                kept.append(index)
+                last = frame
+        indices = np.array(kept)
+    if indices[-1] != n_frames - 1:
+        indices = np.append(indices, n_frames - 1)
+    if max_frames is not None and len(indices) > max_frames:
+        positions = np.linspace(0, len(indices) - 1, max(max_frames, 1))
+        indices = indices[np.unique(positions.round().astype(np.int64))]
+    return indices
+
+
+def value_range(values, indices: np.ndarray) -> tuple:
+    """
+    Minimum and maximum of the selected frames, read one frame at a time
+    """
+    low = min(float(np.min(values[index])) for index in indices)
+    high = max(float(np.max(values[index])) for index in indices)
+    return low, high
+
+
+def quantize(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """
+    Maps values in [low, high] to the 256 levels of a uint8 array
+    """
+    if high <= low:
+        return np.zeros(np.shape(values), dtype=np.uint8)
+    levels = (np.asarray(values, dtype=np.float64) - low) * (255 / (high - low))
+    return np.clip(levels.round(), 0, 255).astype(np.uint8)
+
+
+def level_ticks(low: float, high: float, n_ticks: int = 5) -> dict:
+    """
+    Colorbar ticks of quantized values, labelled with the original values
+    """
+    levels = np.linspace(0, 255, n_ticks)
+    return {
+        "tickvals": levels.tolist(),
+        "ticktext": [f"{low + level / 255 * (high - low):.3g}" for level in levels],
+    }
+
+
+def colorscale_palette(colorscale: str = "Viridis") -> np.ndarray:
+    """
+    256 RGB colors sampled from a plotly colorscale, as a (256, 3) uint8 array
+    """
+    colors = sample_colorscale(get_colorscale(colorscale), np.linspace(0, 1, 256))
+    return np.array([unlabel_rgb(color) for color in colors]).round().astype(np.uint8)
@@ -0,0 +1,129 @@
+import struct
+
+import numpy as np
+
+
+def lzw_encode(pixels: bytes, min_code_size: int = 8) -> bytes:
+    """
+    Variable-length LZW compression of the pixels of a GIF image
+    The dictionary is keyed by (prefix code, pixel) packed in an integer,
+    it is reset with a clear code once the 4096 codes are used
+    """
+    clear = 1 << min_code_size
+    end = clear + 1
+    output = bytearray()
+    buffer = clear
+    n_bits = code_size = min_code_size + 1
+    next_code = end + 1
+    table = {}
+    prefix = pixels[0]
+    for pixel in pixels[1:]:
+        key = (prefix << 8) | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        buffer |= prefix << n_bits
+        n_bits += code_size
+        while n_bits >= 8:
+            output.append(buffer & 255)
+            buffer >>= 8
+            n_bits -= 8
+        if next_code < 4096:
+            table[key] = next_code
+            if next_code == 1 << code_size:
+                code_size += 1
+            next_code += 1
+        else:
+            buffer |= clear << n_bits
+            n_bits += code_size
+            table = {}
+            code_size = min_code_size + 1
+            next_code = end + 1
+        prefix = pixel
+    buffer |= (prefix | end << code_size) << n_bits
+    n_bits += 2 * code_size
+    while n_bits > 0:
+        output.append(buffer & 255)
+        buffer >>= 8
+        n_bits -= 8
+    return bytes(output)
+
+
+class GifWriter:
+    """
+    Writes an animated GIF frame by frame, without keeping the frames in memory
+    @shape: (height, width) of the frames in pixels
+    @palette: (256, 3) uint8 RGB colors, frames are arrays of palette indices
+    @delay: time between two frames, in hundredths of a second
+    @loop: number of repetitions of the animation, 0 loops forever
+    """
+
+    def __init__(
+        self,
+        path: str,
+        shape: tuple,
+        palette: np.ndarray,
+        delay: int = 8,
+        loop: int = 0,
+    ) -> None:
+        self.shape = tuple(shape)
+        self.delay = delay
+        self.n_frames = 0
+        self.previous = None
+        self.file = open(path, "wb")
+        height, width = self.shape
+        # global color table of 256 colors
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+        self.file.write(np.asarray(palette, dtype=np.uint8).reshape(256, 3).tobytes())
+        self.file.write(
+            b"\x21\xff\x0bNETSCAPE2.0" + struct.pack("<BBHB", 3, 1, loop, 0)
+        )
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Appends a frame of palette indices, of shape (height, width)
+        """
+        if frame.shape != self.shape:
+            raise ValueError(
+                f"Expected a frame of shape {self.shape}, got {frame.shape}"
+            )
+        # only the rectangle of the pixels that changed since the previous frame
+        # is written, the rest of the previous frame stays on screen
+        if self.previous is None:
+            top, left, (bottom, right) = 0, 0, self.shape
+        else:
+            changed = frame != self.previous
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(
+                changed.any(axis=0)
+            )
+            if len(rows) == 0:
+                # a single unchanged pixel keeps the timing of the animation
+                rows, cols = [0], [0]
+            top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        self.previous = frame.copy()
+        # graphic control extension (delay) and image descriptor
+        self.file.write(struct.pack("<4BHBB", 0x21, 0xF9, 4, 0x04, self.delay, 0, 0))
+        self.file.write(
+            struct.pack("<BHHHHB", 0x2C, left, top, right - left, bottom - top, 0)
+        )
+        pixels = np.ascontiguousarray(frame[top:bottom, left:right], dtype=np.uint8)
+        data = lzw_encode(pixels.tobytes())
+        self.file.write(b"\x08")
+        # data sub-blocks of at most 255 bytes
+        for start in range(0, len(data), 255):
+            block = data[start : start + 255]
+            self.file.write(bytes([len(block)]) + block)
+        self.file.write(b"\x00")
+        self.n_frames += 1
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.write(b"\x3b")
+            self.file.close()
+
+    def __enter__(self) -> "GifWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
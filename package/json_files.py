@@ -0,0 +1,13 @@
+import json
+import os
+
+
+def write_json(path: str, data) -> None:
+    """
+    Writes data to the json file path atomically: the file is written next to path
+    and then replaces it, readers see either the previous or the new content
+    """
+    temporary_file = f"{path}.tmp"
+    with open(temporary_file, "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temporary_file, path)
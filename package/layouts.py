@@ -0,0 +1,164 @@
+import numpy as np
+
+# cell codes of the layouts
+EMPTY, WALL, TRAP, PORTAL, PORTAL_EXIT, LATE_PORTAL, GOAL, START = range(8)
+
+# characters of the text maps
+CELL_CODES = {
+    ".": EMPTY,
+    "#": WALL,
+    "T": TRAP,
+    "P": PORTAL,
+    "O": PORTAL_EXIT,
+    "L": LATE_PORTAL,
+    "G": GOAL,
+    "A": START,
+}
+CELL_CHARACTERS = {code: character for character, code in CELL_CODES.items()}
+
+# the grid world of the experiment: the blue portal (P) leads to the top right
+# corner (O), the purple portal (L) only opens after 100 episodes
+DEFAULT_LAYOUT = """
+........T..O
+........T...
+.L......TG..
+###.....TTTT
+............
+...#........
+.A.#......P.
+...#........
+"""
+
+
+def parse_layout(layout) -> np.ndarray:
+    """
+    Converts a layout to an (n_rows, n_cols) int8 array of cell codes
+    @layout: text map (one line per row, see CELL_CODES), array of characters
+    or array of cell codes
+    """
+    if isinstance(layout, str):
+        rows = [row.strip() for row in layout.strip().splitlines()]
+        if len({len(row) for row in rows}) != 1:
+            raise ValueError("All the rows of the layout must have the same length")
+        layout = np.array([list(row) for row in rows])
+    layout = np.asarray(layout)
+    if layout.ndim != 2:
+        raise ValueError(f"Expected a 2D layout, got shape {layout.shape}")
+    if layout.dtype.kind in "iu":
+        return layout.astype(np.int8)
+    unknown = set(np.unique(layout)) - set(CELL_CODES)
+    if unknown:
+        raise ValueError(
+            f"Unknown cells {sorted(unknown)}, expected {list(CELL_CODES)}"
+        )
+    characters = np.array(list(CELL_CODES))
+    codes = np.array(list(CELL_CODES.values()), dtype=np.int8)
+    order = np.argsort(characters)
+    return codes[order][np.searchsorted(characters[order], layout)]
+
+
+def layout_to_text(cells: np.ndarray) -> str:
+    characters = np.array([CELL_CHARACTERS[code] for code in range(len(CELL_CODES))])
+    return "\n".join("".join(row) for row in characters[cells])
+
+
+def place_markers(
+    cells: np.ndarray,
+    rng: np.random.Generator,
+    n_traps: int = 0,
+    n_portals: int = 0,
+    late_portal: bool = False,
+) -> np.ndarray:
+    """
+    Places the start in the bottom left free cell, the goal in the top right free cell,
+    and n_traps traps, n_portals portals and a late portal on random free cells,
+    with a portal exit if there is any portal
+    """
+    free = np.flatnonzero(cells.ravel() == EMPTY)
+    n_cols = cells.shape[1]
+    rows, cols = np.divmod(free, n_cols)
+    start = free[np.lexsort((cols, -rows))[0]]
+    goal = free[np.lexsort((-cols, rows))[0]]
+    cells.flat[start], cells.flat[goal] = START, GOAL
+    free = free[(free != start) & (free != goal)]
+    # the portals and the late portal lead to the same portal exit
+    has_exit = bool(n_portals) or late_portal
+    n_markers = n_traps + n_portals + int(has_exit) + int(late_portal)
+    if n_markers > len(free):
+        raise ValueError(f"Not enough free cells for {n_markers} traps and portals")
+    chosen = rng.choice(free, size=n_markers, replace=False)
+    cells.flat[chosen[:n_traps]] = TRAP
+    cells.flat[chosen[n_traps : n_traps + n_portals]] = PORTAL
+    if has_exit:
+        cells.flat[chosen[n_traps + n_portals]] = PORTAL_EXIT
+    if late_portal:
+        cells.flat[chosen[-1]] = LATE_PORTAL
+    return cells
+
+
+def maze_layout(
+    n_rows: int,
+    n_cols: int,
+    seed: int = None,
+    n_traps: int = 0,
+    n_portals: int = 0,
+    late_portal: bool = False,
+) -> np.ndarray:
+    """
+    Perfect maze (a single path between any two free cells) generated with the
+    binary tree algorithm: every room cell, at even coordinates, opens the wall
+    above or to its right at random, which is vectorized over the whole grid
+    Rooms on the top row open to the right, rooms on the last column open upwards
+    Traps and portals are placed afterwards and can cut the path to the goal
+    """
+    rng = np.random.default_rng(seed)
+    cells = np.full((n_rows, n_cols), WALL, dtype=np.int8)
+    rows, cols = np.meshgrid(
+        np.arange(0, n_rows, 2), np.arange(0, n_cols, 2), indexing="ij"
+    )
+    cells[rows, cols] = EMPTY
+    can_go_up = rows > 0
+    can_go_right = cols + 2 < n_cols
+    go_up = np.where(can_go_up & can_go_right, rng.random(rows.shape) < 0.5, can_go_up)
+    go_right = ~go_up & can_go_right
+    cells[rows[go_up] - 1, cols[go_up]] = EMPTY
+    cells[rows[go_right], cols[go_right] + 1] = EMPTY
+    return place_markers(cells, rng, n_traps, n_portals, late_portal)
+
+
+def rooms_layout(
+    n_rows: int,
+    n_cols: int,
+    room_size: int = 8,
+    seed: int = None,
+    n_traps: int = 0,
+    n_portals: int = 0,
+    late_portal: bool = False,
+) -> np.ndarray:
+    """
+    Grid of rooms of room_size x room_size cells separated by walls,
+    with a door at a random position of every wall between two rooms
+    """
+    rng = np.random.default_rng(seed)
+    cells = np.full((n_rows, n_cols), EMPTY, dtype=np.int8)
+    # a wall is always followed by at least one row (column) of room
+    wall_rows = np.arange(room_size, n_rows - 1, room_size + 1)
+    wall_cols = np.arange(room_size, n_cols - 1, room_size + 1)
+    cells[wall_rows, :] = WALL
+    cells[:, wall_cols] = WALL
+    # first row and column of every room
+    room_rows = np.concatenate([[0], wall_rows + 1])
+    room_cols = np.concatenate([[0], wall_cols + 1])
+    row_ends = np.append(wall_rows, n_rows)
+    col_ends = np.append(wall_cols, n_cols)
+    # doors in the horizontal walls, one per (wall, room column)
+    offsets = rng.random((len(wall_rows), len(room_cols)))
+    door_cols = room_cols + (offsets * (col_ends - room_cols)).astype(np.int64)
+    cells[np.repeat(wall_rows, len(room_cols)), door_cols.ravel()] = EMPTY
+    # doors in the vertical walls, one per (room row, wall)
+    offsets = rng.random((len(room_rows), len(wall_cols)))
+    door_rows = room_rows[:, None] + (offsets * (row_ends - room_rows)[:, None]).astype(
+        np.int64
+    )
+    cells[door_rows.ravel(), np.tile(wall_cols, len(room_rows))] = EMPTY
+    return place_markers(cells, rng, n_traps, n_portals, late_portal)
@@ -0,0 +1,227 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class UpdateBuffer:
+    """
+    Bounded buffer of the updates of a feed, the training loop never waits on it
+    When the buffer is full, the oldest update is dropped, or with coalesce=True
+    merged into the following update if it is from the same run (the newer
+    metrics are kept and the value deltas are combined)
+    Consumers iterate over the buffer (blocking until an update arrives or the
+    buffer is closed) or drain it
+    """
+
+    def __init__(self, maxlen: int = 1024, coalesce: bool = False) -> None:
+        self.updates = deque()
+        self.maxlen = maxlen
+        self.coalesce = coalesce
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def offer(self, update: dict) -> None:
+        with self.condition:
+            if len(self.updates) >= self.maxlen:
+                oldest = self.updates.popleft()
+                # merged into the following update, which keeps the order of the deltas
+                following = self.updates[0] if self.updates else update
+                if self.coalesce and oldest.get("run") == following.get("run"):
+                    merged = coalesce_updates(oldest, following)
+                    if self.updates:
+                        self.updates[0] = merged
+                    else:
+                        update = merged
+                else:
+                    self.dropped += 1
+            self.updates.append(update)
+            self.condition.notify()
+
+    def drain(self) -> list:
+        """
+        Returns and removes the buffered updates
+        """
+        with self.condition:
+            updates = list(self.updates)
+            self.updates.clear()
+        return updates
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __iter__(self):
+        while True:
+            with self.condition:
+                while not self.updates and not self.closed:
+                    self.condition.wait()
+                if not self.updates:
+                    return
+                update = self.updates.popleft()
+            yield update
+
+
+def coalesce_updates(older: dict, newer: dict) -> dict:
+    """
+    Merges two consecutive updates of a run into the newer one
+    """
+    merged = dict(newer)
+    merged["coalesced"] = older.get("coalesced", 1) + newer.get("coalesced", 1)
+    if "values" in older:
+        cells = dict(zip(older["values"]["cells"], older["values"]["values"]))
+        if "values" in newer:
+            cells.update(zip(newer["values"]["cells"], newer["values"]["values"]))
+        merged["values"] = {"cells": list(cells), "values": list(cells.values())}
+    return merged
+
+
+class AsyncioQueueSink:
+    """
+    Forwards the updates to an asyncio.Queue from any thread, through the event loop
+    The oldest update is dropped when the queue is full
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop) -> None:
+        self.queue = queue
+        self.loop = loop
+        self.dropped = 0
+
+    def put(self, update: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(update)
+
+    def offer(self, update: dict) -> None:
+        self.loop.call_soon_threadsafe(self.put, update)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonLinesSink:
+    """
+    Writes the updates to a JSON lines file from a background thread,
+    so that the training loop does not wait on the disk
+    Updates are buffered (and dropped or coalesced when the writer falls behind)
+    in an UpdateBuffer, follow_feeds reads the files while they grow
+    """
+
+    def __init__(self, path: str, maxlen: int = 1024, coalesce: bool = True) -> None:
+        self.path = path
+        self.buffer = UpdateBuffer(maxlen, coalesce)
+        # replaces the updates of a previous run with the same name
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "w")
+        self.thread = threading.Thread(target=self.write_updates, daemon=True)
+        self.thread.start()
+
+    def write_updates(self) -> None:
+        with self.file as file:
+            for update in self.buffer:
+                file.write(json.dumps(update) + "\n")
+                if not self.buffer.updates:
+                    file.flush()
+
+    def offer(self, update: dict) -> None:
+        self.buffer.offer(update)
+
+    def close(self) -> None:
+        """
+        Writes the remaining updates and closes the file
+        """
+        self.buffer.close()
+        self.thread.join()
+
+
+class MetricsFeed:
+    """
+    Publishes the metrics of every episode played by fit(feed=...) to subscribers,
+    any object with a non-blocking offer(update) method (UpdateBuffer,
+    AsyncioQueueSink, JsonLinesSink)
+    An update is a JSON-serializable dict: run, episode, steps, reward, the running
+    aggregates of the agent's EpisodeMetrics and whether the late portal is open
+    @value_every: also publishes the cells of the value map (max over the actions of
+    q_table) that changed since the previous value update, every value_every episodes
+    @run: name of the run, distinguishes the runs followed by a single dashboard
+    """
+
+    def __init__(
+        self, subscribers: list = None, value_every: int = 0, run: str = None
+    ) -> None:
+        self.subscribers = list(subscribers or [])
+        self.value_every = value_every
+        self.run = run
+        self.last_values = None
+
+    def subscribe(self, subscriber) -> None:
+        self.subscribers.append(subscriber)
+
+    def value_delta(self, agent) -> dict:
+        values = np.asarray(agent.q_table.max(axis=1), dtype=np.float32)
+        if self.last_values is None:
+            self.last_values = np.zeros_like(values)
+        cells = np.flatnonzero(values != self.last_values)
+        self.last_values = values
+        return {"cells": cells.tolist(), "values": values[cells].tolist()}
+
+    def publish(self, agent) -> None:
+        """
+        Publishes the last episode recorded by the agent
+        """
+        metrics = agent.metrics
+        update = {
+            "run": self.run,
+            "time": time.time(),
+            "episode": metrics.count,
+            "steps": int(metrics.steps[-1]),
+            "reward": float(metrics.rewards[-1]),
+            **metrics.summary(),
+            "late_portal": agent.env.late_portal_active,
+        }
+        if self.value_every and metrics.count % self.value_every == 0:
+            update["values"] = self.value_delta(agent)
+        for subscriber in self.subscribers:
+            subscriber.offer(update)
+
+    def close(self) -> None:
+        for subscriber in self.subscribers:
+            subscriber.close()
+
+
+def follow_feeds(
+    directory: str, poll_interval: float = 0.2, idle_timeout: float = None
+):
+    """
+    Yields the updates written by the JsonLinesSinks of directory (*.jsonl),
+    including the files of runs started later, as they are appended
+    @idle_timeout: stops after idle_timeout seconds without updates (None: never)
+    """
+    offsets = {}
+    last_update = time.monotonic()
+    while True:
+        found = False
+        for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+            with open(path) as file:
+                file.seek(offsets.get(path, 0))
+                for line in iter(file.readline, ""):
+                    if not line.endswith("\n"):
+                        # partially written line, read again on the next poll
+                        break
+                    offsets[path] = file.tell()
+                    found = True
+                    yield json.loads(line)
+        if found:
+            last_update = time.monotonic()
+        elif idle_timeout is not None and time.monotonic() - last_update > idle_timeout:
+            return
+        else:
+            time.sleep(poll_interval)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# colors of the optimality classes in the bar charts:
+# blue if the agent terminates before finding the reward or in more than 17 steps,
+# red if the agent finds the treasure within 17 steps, green within 12 steps
+OPTIMALITY_COLORS = np.array(["#636EFA", "#EF553B", "#00CC96"])
+
+
+def optimality_class(n_steps, rewards) -> np.ndarray:
+    """
+    0: not optimal, 1: reward found in 13 to 17 steps, 2: reward found in 12 steps or less
+    """
+    n_steps, rewards = np.asarray(n_steps), np.asarray(rewards)
+    success = rewards == 1
+    return (
+        (success & (n_steps <= 17)).astype(np.int8) + (success & (n_steps <= 12))
+    ).astype(np.int8)
+
+
+def episodes_frame(n_steps, rewards, classes: np.ndarray = None) -> pd.DataFrame:
+    """
+    Records the steps and reward of each episode in a DataFrame
+    The is_optimal column holds the color of the episode in the bar charts
+    """
+    if classes is None:
+        classes = optimality_class(n_steps, rewards)
+    episodes = pd.DataFrame({"steps": n_steps, "reward": rewards})
+    episodes["is_optimal"] = pd.Categorical(OPTIMALITY_COLORS[classes])
+    return episodes
+
+
+class EpisodeMetrics:
+    """
+    Records the steps, reward and optimality class of each episode as it ends,
+    in preallocated arrays that double their capacity when full
+    Running aggregates (success rate, optimal path rate and rolling means over the
+    last window episodes) are updated incrementally
+    The episodes DataFrame is only built on demand (to_frame)
+    """
+
+    def __init__(self, capacity: int = 1024, window: int = 100) -> None:
+        self.window = window
+        self.count = 0
+        self.steps_buffer = np.zeros(capacity, dtype=np.int64)
+        self.reward_buffer = np.zeros(capacity, dtype=np.float32)
+        self.class_buffer = np.zeros(capacity, dtype=np.int8)
+        self.n_success = 0
+        self.n_optimal = 0
+        self.window_steps = 0
+        self.window_reward = 0.0
+
+    def reserve(self, capacity: int) -> None:
+        """
+        Grows the buffers so that they hold at least capacity episodes
+        """
+        if capacity <= len(self.steps_buffer):
+            return
+        for name in ["steps_buffer", "reward_buffer", "class_buffer"]:
+            buffer = getattr(self, name)
+            grown = np.zeros(capacity, dtype=buffer.dtype)
+            grown[: self.count] = buffer[: self.count]
+            setattr(self, name, grown)
+
+    def record(self, steps: int, reward: float) -> None:
+        if self.count == len(self.steps_buffer):
+            self.reserve(2 * max(self.count, 1))
+        index = self.count
+        episode_class = 0
+        if reward == 1:
+            self.n_success += 1
+            if steps <= 12:
+                episode_class = 2
+                self.n_optimal += 1
+            elif steps <= 17:
+                episode_class = 1
+        self.steps_buffer[index] = steps
+        self.reward_buffer[index] = reward
+        self.class_buffer[index] = episode_class
+        self.window_steps += steps
+        self.window_reward += reward
+        if index >= self.window:
+            self.window_steps -= self.steps_buffer[index - self.window]
+            self.window_reward -= self.reward_buffer[index - self.window]
+        self.count += 1
+
+    @property
+    def steps(self) -> np.ndarray:
+        return self.steps_buffer[: self.count]
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self.reward_buffer[: self.count]
+
+    @property
+    def classes(self) -> np.ndarray:
+        return self.class_buffer[: self.count]
+
+    @property
+    def success_rate(self) -> float:
+        return self.n_success / self.count if self.count else 0.0
+
+    @property
+    def optimal_rate(self) -> float:
+        return self.n_optimal / self.count if self.count else 0.0
+
+    @property
+    def rolling_mean_steps(self) -> float:
+        return self.window_steps / min(self.count, self.window) if self.count else 0.0
+
+    @property
+    def rolling_mean_reward(self) -> float:
+        return self.window_reward / min(self.count, self.window) if self.count else 0.0
+
+    def summary(self) -> dict:
+        return {
+            "episodes": self.count,
+            "success_rate": self.success_rate,
+            "optimal_rate": self.optimal_rate,
+            "rolling_mean_steps": self.rolling_mean_steps,
+            "rolling_mean_reward": self.rolling_mean_reward,
+        }
+
+    def to_frame(self, last: int = None) -> pd.DataFrame:
+        """
+        Builds the episodes DataFrame, only for the last episodes if last is set
+        """
+        start = 0 if last is None else max(self.count - last, 0)
+        episodes = episodes_frame(
+            self.steps[start:], self.rewards[start:], self.classes[start:]
+        )
+        episodes.index = pd.RangeIndex(start, self.count)
+        return episodes
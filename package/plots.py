@@ -1,6 +1,21 @@
+import os
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+from plotly.offline import get_plotlyjs_version
+
+from package.aggregates import aggregate_cache
+from package.frames import (
+    colorscale_palette,
+    level_ticks,
+    quantize,
+    select_frames,
+    value_range,
+)
+from package.gif import GifWriter
+from package.snapshots import ValueSnapshots
 
 
 def plot_heatmap(matrix, **kwargs):
@@ -17,102 +32,213 @@ def plot_bar_chart(dataframe: pd.DataFrame, attribute: "str", color: str):
     return go.Bar(y=dataframe[attribute], marker=dict(color=dataframe[color]))
 
 
-def animated_heatmap(state_value_dict: dict, agent_name: str = None):
-    value_estimates_array = np.array(list(state_value_dict.values()))
+def snapshot_frames(state_value_dict) -> tuple:
+    """
+    State values (n_frames, n_rows, n_cols) and episodes of the recorded snapshots
+    Accepts a ValueSnapshots store or a dict {episode: values}
+    """
+    if isinstance(state_value_dict, ValueSnapshots):
+        return state_value_dict.values, state_value_dict.episodes
+    return np.array(list(state_value_dict.values())), list(state_value_dict.keys())
 
-    fig = go.Figure(
-        data=[go.Heatmap(z=value_estimates_array[0])],
-        layout=go.Layout(
-            title="Frame 0",
-            title_x=0.5,
-            updatemenus=[
-                dict(
-                    type="buttons",
-                    buttons=[
-                        dict(label="Play", method="animate", args=[None]),
-                        dict(
-                            label="Pause",
-                            method="animate",
-                            args=[
-                                None,
-                                {
-                                    "frame": {"duration": 0, "redraw": False},
-                                    "mode": "immediate",
-                                    "transition": {"duration": 0},
-                                },
-                            ],
-                        ),
-                    ],
-                )
-            ],
-        ),
-        frames=[
-            go.Frame(
-                data=[go.Heatmap(z=value_estimates_array[i])],
-                layout=go.Layout(
-                    title_text=f"{agent_name}: State values for episode: {i}"
-                ),
-                traces=[0],
-                name=f"frame_{i}",
-            )
-            for i in range(len(value_estimates_array))
-        ],
-    )
 
-    fig.update_layout(
-        title=f"{agent_name}: State values after episode 1",
-        xaxis_title="X Coordinate",
-        yaxis_title="Y Coordinate",
-        yaxis=dict(autorange="reversed"),
-        height=600,
-        width=800,
-        showlegend=False,
-    )
+def heatmap_trace(values: np.ndarray, value_range: tuple = None) -> dict:
+    """
+    Heatmap of a frame, quantized to uint8 levels if value_range is set
+    """
+    if value_range is None:
+        return {"type": "heatmap", "z": values}
+    return {
+        "type": "heatmap",
+        "z": quantize(values, *value_range),
+        "zmin": 0,
+        "zmax": 255,
+        "colorbar": level_ticks(*value_range),
+    }
 
-    # Decrease the duration for faster transitions (in milliseconds)
-    fig.update_layout(
-        updatemenus=[
-            dict(
-                type="buttons",
-                buttons=[
-                    dict(
-                        label="Play",
-                        method="animate",
-                        args=[
+
+def heatmap_frame(
+    values: np.ndarray,
+    episode: int,
+    position: int,
+    agent_name: str = None,
+    value_range: tuple = None,
+) -> dict:
+    return {
+        "data": [heatmap_trace(values, value_range)],
+        "layout": {
+            "title": {"text": f"{agent_name}: State values for episode: {episode}"}
+        },
+        "traces": [0],
+        "name": f"frame_{position}",
+    }
+
+
+def heatmap_layout(agent_name: str = None) -> dict:
+    return {
+        "title": {"text": f"{agent_name}: State values after episode 1", "x": 0.5},
+        "xaxis": {"title": {"text": "X Coordinate"}},
+        "yaxis": {"title": {"text": "Y Coordinate"}, "autorange": "reversed"},
+        "height": 600,
+        "width": 800,
+        "showlegend": False,
+        "updatemenus": [
+            {
+                "type": "buttons",
+                "buttons": [
+                    {
+                        "label": "Play",
+                        "method": "animate",
+                        # decrease the duration for faster transitions (in milliseconds)
+                        "args": [
                             None,
                             {
                                 "frame": {"duration": 50, "redraw": True},
                                 "fromcurrent": True,
                             },
                         ],
-                    ),
-                    dict(
-                        label="Pause",
-                        method="animate",
-                        args=[[None], {"frame": {"duration": 0, "redraw": False}}],
-                    ),
+                    },
+                    {
+                        "label": "Pause",
+                        "method": "animate",
+                        "args": [[None], {"frame": {"duration": 0, "redraw": False}}],
+                    },
                 ],
-            )
-        ]
+            }
+        ],
+    }
+
+
+def animated_heatmap(
+    state_value_dict: dict,
+    agent_name: str = None,
+    max_frames: int = None,
+    every: int = 1,
+    min_change: float = None,
+    quantized: bool = False,
+    show: bool = True,
+) -> go.Figure:
+    """
+    Animates the state values recorded during fit (agent.value_estimates)
+    Accepts a ValueSnapshots store or a dict {episode: values}
+    @max_frames, every, min_change: frames selection (see package.frames.select_frames),
+    every snapshot is animated by default, max_frames caps the size of long animations
+    @quantized: sends the values as uint8 levels (4 times smaller than float32),
+    the colorbar is labelled with the original values
+    For long trainings, export_animated_heatmap writes the animation to a file
+    without building the figure
+    """
+    values, episodes = snapshot_frames(state_value_dict)
+    indices = select_frames(values, every, min_change, max_frames)
+    if len(indices) == 0:
+        raise ValueError("No state values to animate")
+    z_range = value_range(values, indices) if quantized else None
+    fig = go.Figure(
+        data=[heatmap_trace(values[indices[0]], z_range)],
+        layout=heatmap_layout(agent_name),
+        frames=[
+            heatmap_frame(values[index], episodes[index], position, agent_name, z_range)
+            for position, index in enumerate(indices)
+        ],
     )
+    if show:
+        fig.show()
+    return fig
+
+
+def export_animated_heatmap(
+    state_value_dict: dict,
+    path: str,
+    agent_name: str = None,
+    max_frames: int = None,
+    every: int = 1,
+    min_change: float = None,
+    quantized: bool = True,
+    cell_size: int = None,
+    delay: int = 8,
+) -> int:
+    """
+    Writes the animation of animated_heatmap to path frame by frame, the snapshots
+    (possibly memory-mapped) are read one frame at a time
+    @path: .gif file (like videos/*.gif), or .json (plotly figure) / .html (standalone page)
+    @quantized: uint8 levels in the .json and .html exports (always used by the GIF)
+    @cell_size: size of a cell of the grid in the GIF, in pixels
+    (800 pixels wide images by default)
+    @delay: time between two frames of the GIF, in hundredths of a second
+    Returns the number of frames written
+    """
+    values, episodes = snapshot_frames(state_value_dict)
+    indices = select_frames(values, every, min_change, max_frames)
+    if len(indices) == 0:
+        raise ValueError("No state values to animate")
+    extension = os.path.splitext(path)[1].lower()
+    z_range = value_range(values, indices) if quantized or extension == ".gif" else None
+
+    if extension == ".gif":
+        n_rows, n_cols = values.shape[1:]
+        cell_size = cell_size or max(800 // n_cols, 1)
+        palette = colorscale_palette("Viridis")
+        with GifWriter(
+            path, (n_rows * cell_size, n_cols * cell_size), palette, delay
+        ) as writer:
+            for index in indices:
+                levels = quantize(values[index], *z_range)
+                writer.write(levels.repeat(cell_size, axis=0).repeat(cell_size, axis=1))
+        return len(indices)
+
+    if extension not in (".json", ".html"):
+        raise ValueError(f"Unsupported animation format {extension}")
+    with open(path, "w") as file:
+        if extension == ".html":
+            file.write(
+                '<html>\n<head><meta charset="utf-8" />\n'
+                '<script src="https://cdn.plot.ly/plotly-'
+                f'{get_plotlyjs_version()}.min.js"></script>\n</head>\n<body>\n'
+                '<div id="animated_heatmap"></div>\n<script>\n'
+                'Plotly.newPlot("animated_heatmap", '
+            )
+        file.write('{"data": ')
+        file.write(to_json_plotly([heatmap_trace(values[indices[0]], z_range)]))
+        file.write(', "layout": ')
+        file.write(to_json_plotly(heatmap_layout(agent_name)))
+        file.write(', "frames": [')
+        for position, index in enumerate(indices):
+            frame = heatmap_frame(
+                values[index], episodes[index], position, agent_name, z_range
+            )
+            file.write((", " if position else "") + to_json_plotly(frame))
+        file.write("]}")
+        if extension == ".html":
+            file.write(");\n</script>\n</body>\n</html>\n")
+    return len(indices)
 
-    fig.show()
+
+def load_average_results(name: str) -> tuple:
+    """
+    Averages the steps and reward of each episode across the runs of an agent
+    Reads the results store of the agent, or its CSV file for older results,
+    through the aggregate cache (only the new runs are aggregated)
+    Returns the averages (indexed by episode) and the number of runs
+    """
+    aggregate = aggregate_cache.get(name)
+    return aggregate.to_frame()[["steps", "reward"]], aggregate.n_runs
+
+
+def results_name(agent) -> str:
+    """
+    Name of the results of an agent, given the agent, its class or its name
+    """
+    return agent if isinstance(agent, str) else agent.name
 
 
 def plot_average_reward(*agents):
+    """
+    @agents: agents, agent classes or names of the results to compare
+    """
     fig = go.Figure()
 
-    for agent in agents:
-        results_file = f"results/{agent.name}_results.csv"
-        agent_results_concatenated = pd.read_csv(
-            results_file, index_col=["Run", "episode"]
-        )
-
-        # Calculate the average results by episode across the runs
-        num_runs = agent_results_concatenated.index.get_level_values("Run").nunique()
-        agent_results_average = agent_results_concatenated.groupby("episode").agg(
-            "mean", numeric_only=True
-        )
+    for name in map(results_name, agents):
+        agent_results_average, num_runs = load_average_results(name)
 
         # cumulative_rewards = agent_results_average["reward"].cumsum()
         average_cumulative_reward = (
@@ -123,7 +249,7 @@ def plot_average_reward(*agents):
                 x=average_cumulative_reward.index,
                 y=average_cumulative_reward.reward,
                 mode="lines",
-                name=agent.name,
+                name=name,
             )
         )
 
@@ -136,18 +262,13 @@ def plot_average_reward(*agents):
 
 
 def plot_steps_per_episode(*agents):
+    """
+    @agents: agents, agent classes or names of the results to compare
+    """
     fig = go.Figure()
 
-    for agent in agents:
-        results_file = f"results/{agent.name}_results.csv"
-        agent_results_concatenated = pd.read_csv(
-            results_file, index_col=["Run", "episode"]
-        )
-
-        # Calculate the average results by episode across the runs
-        agent_results_average = agent_results_concatenated.groupby("episode").agg(
-            "mean", numeric_only=True
-        )
+    for name in map(results_name, agents):
+        agent_results_average, _ = load_average_results(name)
 
         steps_per_episode = agent_results_average["steps"]
 
@@ -155,7 +276,7 @@ def plot_steps_per_episode(*agents):
             go.Scatter(
                 x=steps_per_episode.index,
                 y=steps_per_episode,
-                name=agent.name,
+                name=name,
                 mode="lines",
             )
         )
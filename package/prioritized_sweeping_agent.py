@@ -0,0 +1,112 @@
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.env import Env
+from package.priority_queue import IndexedPriorityQueue
+from package.world_model import WorldModel
+
+
+class Prioritized_Sweeping_Agent(Dyna_Q_Agent):
+    """
+    Prioritized sweeping (Sutton & Barto, section 8.4)
+    Instead of sampling the model uniformly, planning updates the (state, action)
+    pairs whose value is expected to change the most first
+    The priority of a pair is |reward + gamma * max Q(next state) - Q(state, action)|,
+    pairs are queued when their priority exceeds theta
+    After each update, the predecessors of the updated state (found with the
+    predecessor index of the model) are queued, so that changes flow backwards
+    """
+
+    name = "Prioritized_sweeping"
+
+    def __init__(
+        self,
+        gamma: float = 1,
+        step_size: float = 0.1,
+        epsilon: float = 0.1,
+        planning_steps: int = 100,
+        theta: float = 1e-4,
+        env: Env = None,
+        sparse: bool = False,
+    ) -> None:
+        super().__init__(
+            gamma, step_size, epsilon, planning_steps, env=env, sparse=sparse
+        )
+        self.theta = theta
+        self.model = WorldModel(
+            self.env.n_states, self.n_actions, track_predecessors=True, sparse=sparse
+        )
+        # in sparse mode, the queued pairs are stored in the rows of the model's states
+        self.queue = IndexedPriorityQueue(
+            self.env.n_states * self.n_actions,
+            self.model.slot_index if sparse else None,
+            self.n_actions,
+        )
+
+    def td_target(self, state: int, action: int) -> float:
+        """
+        Target of a (state, action) pair according to the model
+        """
+        next_state = self.model.next_state[state, action]
+        reward = self.model.reward[state, action]
+        if next_state == -1:
+            return reward
+        return reward + self.gamma * self.q_table[next_state].max()
+
+    def queue_pair(self, state: int, action: int) -> None:
+        """
+        Queues a pair if its priority exceeds theta, the priority
+        of an already queued pair can only be raised
+        """
+        priority = abs(self.td_target(state, action) - self.q_table[state, action])
+        pair = state * self.n_actions + action
+        if priority > self.theta and priority > self.queue.get(pair, 0):
+            self.queue.push(pair, priority)
+
+    def planning_step(self) -> None:
+        """
+        Performs up to planning_steps updates, in order of priority
+        """
+        for _ in range(self.planning_steps):
+            if not self.queue:
+                break
+            pair, _ = self.queue.pop()
+            planning_state, planning_action = divmod(pair, self.n_actions)
+            update = self.q_table[planning_state, planning_action]
+            update += self.step_size * (
+                self.td_target(planning_state, planning_action) - update
+            )
+            self.q_table[planning_state, planning_action] = update
+            self.planning_updates += 1
+            # the value of planning_state changed, queue the pairs leading to it
+            for state, action in self.model.predecessors(planning_state):
+                self.queue_pair(state, action)
+
+    def step(self, state: int, reward: int) -> None:
+        """
+        The real transition is not applied directly, it is queued
+        with its priority and updated during planning
+        """
+        # model update
+        self.update_model(self.past_state, self.past_action, state, reward)
+        self.queue_pair(self.past_state, self.past_action)
+        # planning step
+        self.planning_step()
+        # action selection using the e-greedy policy
+        action = self.epsilon_greedy(state)
+        self.update_state(state, action)
+        # before performing the action, save the current state and action
+        self.past_state = state
+        self.past_action = action
+
+        return self.past_action
+
+    def agent_end(self) -> None:
+        """
+        Called once the agent reaches a terminal state
+        """
+        reward = self.observe_reward(self.position)
+        # model update with next_action = -1
+        self.update_model(self.past_state, self.past_action, -1, reward)
+        self.visit_counts[self.past_state] += 1
+        self.queue_pair(self.past_state, self.past_action)
+        # planning step
+        self.planning_step()
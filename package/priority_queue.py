@@ -0,0 +1,133 @@
+import numpy as np
+
+from package.sparse import SlotIndex, SparsePairTable, list_nbytes
+
+
+class IndexedPriorityQueue:
+    """
+    Binary max-heap over the integer items 0 .. capacity - 1
+    The position of every item in the heap is indexed, so that the priority
+    of a queued item can be increased or decreased in O(log n)
+    @slot_index: stores the positions and priorities of items = state * n_actions
+    + action in sparse tables (see package.sparse) instead of lists allocated
+    for every item, only the rows of the states of the index are stored
+    """
+
+    def __init__(
+        self, capacity: int, slot_index: SlotIndex = None, n_actions: int = 1
+    ) -> None:
+        self.heap = []
+        self.sparse = slot_index is not None
+        if self.sparse:
+            self.priorities = SparsePairTable(slot_index, n_actions, np.float64, 0.0)
+            # -1 when the item is not queued
+            self.position = SparsePairTable(slot_index, n_actions, np.int64, -1)
+        else:
+            # shared by the items never pushed
+            self.fill_priority = 0.0
+            self.priorities = [self.fill_priority] * capacity
+            self.position = [-1] * capacity  # -1 when the item is not queued
+
+    @property
+    def nbytes(self) -> int:
+        nbytes = list_nbytes(self.heap)
+        if self.sparse:
+            return nbytes + self.priorities.nbytes + self.position.nbytes
+        return (
+            nbytes
+            + list_nbytes(self.priorities, self.fill_priority)
+            + list_nbytes(self.position, -1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, item: int) -> bool:
+        return self.position[item] != -1
+
+    def get(self, item: int, default: float = None) -> float:
+        """
+        Returns the priority of a queued item, default otherwise
+        """
+        if self.position[item] == -1:
+            return default
+        return self.priorities[item]
+
+    def push(self, item: int, priority: float) -> None:
+        """
+        Queues an item, or changes its priority if it is already queued
+        """
+        index = self.position[item]
+        self.priorities[item] = priority
+        if index == -1:
+            self.heap.append(item)
+            self.position[item] = len(self.heap) - 1
+            self.sift_up(len(self.heap) - 1)
+        else:
+            self.sift_up(index)
+            self.sift_down(self.position[item])
+
+    def peek(self) -> tuple:
+        item = self.heap[0]
+        return item, self.priorities[item]
+
+    def pop(self) -> tuple:
+        """
+        Removes and returns the item with the highest priority and its priority
+        """
+        item = self.heap[0]
+        last = self.heap.pop()
+        self.position[item] = -1
+        if self.heap:
+            self.heap[0] = last
+            self.position[last] = 0
+            self.sift_down(0)
+        return item, self.priorities[item]
+
+    def remove(self, item: int) -> None:
+        index = self.position[item]
+        last = self.heap.pop()
+        self.position[item] = -1
+        if last != item:
+            self.heap[index] = last
+            self.position[last] = index
+            self.sift_up(index)
+            self.sift_down(self.position[last])
+
+    def sift_up(self, index: int) -> None:
+        heap, priorities, position = self.heap, self.priorities, self.position
+        item = heap[index]
+        priority = priorities[item]
+        while index > 0:
+            parent = (index - 1) >> 1
+            parent_item = heap[parent]
+            if priorities[parent_item] >= priority:
+                break
+            heap[index] = parent_item
+            position[parent_item] = index
+            index = parent
+        heap[index] = item
+        position[item] = index
+
+    def sift_down(self, index: int) -> None:
+        heap, priorities, position = self.heap, self.priorities, self.position
+        size = len(heap)
+        item = heap[index]
+        priority = priorities[item]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if (
+                child + 1 < size
+                and priorities[heap[child + 1]] > priorities[heap[child]]
+            ):
+                child += 1
+            child_item = heap[child]
+            if priorities[child_item] <= priority:
+                break
+            heap[index] = child_item
+            position[child_item] = index
+            index = child
+        heap[index] = item
+        position[item] = index
@@ -0,0 +1,129 @@
+import json
+from time import perf_counter_ns
+
+# (report name, agent method) of the timed phases
+PHASES = {
+    "direct_update": "direct_update",
+    "update_model": "update_model",
+    "planning_step": "planning_step",
+    "epsilon_greedy": "epsilon_greedy",
+    "update_state": "update_state",
+    "reward_lookup": "observe_reward",
+}
+
+
+class PhaseProfiler:
+    """
+    Opt-in timers for the phases of the agents' step loop
+    While attached, the methods of PHASES found on the agent are shadowed by
+    instance attributes that record their call count and total time
+    Detaching removes these attributes, so that an agent without profiler
+    runs its class methods without any overhead
+    Used as a context manager: with PhaseProfiler(agent): agent.fit(...)
+    """
+
+    def __init__(self, agent) -> None:
+        self.agent = agent
+        self.phases = [
+            phase for phase, method in PHASES.items() if hasattr(agent, method)
+        ]
+        self.time_ns = dict.fromkeys(self.phases, 0)
+        self.calls = dict.fromkeys(self.phases, 0)
+        self.total_ns = 0
+        self.episodes = 0
+        self.steps = 0
+        self.planning_updates = 0
+        self.attached = False
+
+    def timed(self, phase: str, method):
+        time_ns, calls = self.time_ns, self.calls
+
+        def wrapper(*args):
+            start = perf_counter_ns()
+            try:
+                return method(*args)
+            finally:
+                time_ns[phase] += perf_counter_ns() - start
+                calls[phase] += 1
+
+        return wrapper
+
+    def attach(self) -> None:
+        if self.attached:
+            return
+        for phase in self.phases:
+            method = PHASES[phase]
+            setattr(self.agent, method, self.timed(phase, getattr(self.agent, method)))
+        self.attached = True
+        # counters are recorded as differences from their value when attaching
+        self.start_episodes = self.agent.metrics.count
+        self.start_steps = int(self.agent.metrics.steps.sum())
+        self.start_planning_updates = getattr(self.agent, "planning_updates", 0)
+        self.start_ns = perf_counter_ns()
+
+    def detach(self) -> None:
+        if not self.attached:
+            return
+        self.total_ns += perf_counter_ns() - self.start_ns
+        for phase in self.phases:
+            delattr(self.agent, PHASES[phase])
+        self.attached = False
+        self.episodes += self.agent.metrics.count - self.start_episodes
+        self.steps += int(self.agent.metrics.steps.sum()) - self.start_steps
+        self.planning_updates += (
+            getattr(self.agent, "planning_updates", 0) - self.start_planning_updates
+        )
+
+    def __enter__(self) -> "PhaseProfiler":
+        self.attach()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.detach()
+
+    def report(self) -> dict:
+        """
+        Time (seconds), share of the total time and calls of each phase,
+        plus throughput counters over the profiled period
+        """
+        total = self.total_ns / 1e9
+        phases = {
+            phase: {
+                "seconds": self.time_ns[phase] / 1e9,
+                "share": self.time_ns[phase] / self.total_ns if self.total_ns else 0.0,
+                "calls": self.calls[phase],
+            }
+            for phase in self.phases
+        }
+        other = self.total_ns - sum(self.time_ns.values())
+        planning_seconds = self.time_ns.get("planning_step", 0) / 1e9
+        return {
+            "agent": self.agent.name,
+            "total_seconds": total,
+            "other_seconds": other / 1e9,
+            "phases": phases,
+            "counters": {
+                "episodes": self.episodes,
+                "steps": self.steps,
+                "steps_per_episode": (
+                    self.steps / self.episodes if self.episodes else 0.0
+                ),
+                "steps_per_second": self.steps / total if total else 0.0,
+                "planning_updates": self.planning_updates,
+                "planning_updates_per_second": (
+                    self.planning_updates / planning_seconds
+                    if planning_seconds
+                    else 0.0
+                ),
+            },
+        }
+
+    def to_json(self, path: str = None) -> str:
+        """
+        Returns the report as a JSON string, also written to path if given
+        """
+        report = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(report)
+        return report
@@ -1,7 +1,17 @@
+from contextlib import nullcontext
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+
 from package.agent import Agent
+from package.checkpoint import save_checkpoint
+from package.env import Env
+from package.profiling import PhaseProfiler
+from package.replay_buffer import ReplayBuffer
+from package.snapshots import ValueSnapshots
+from package.tables import StateDictView
+from package.trajectories import replay_batch
 from plotly.subplots import make_subplots
 
 # from tqdm.auto import tqdm
@@ -11,14 +21,37 @@ from plotly.subplots import make_subplots
 
 
 class Q_learning_Agent(Agent):
+    # name of the results of the agent (results/<name>)
+    name = "Q-learning"
+
     def __init__(
-        self, gamma: float = 1, step_size: float = 0.1, epsilon: float = 0.1
+        self,
+        gamma: float = 1,
+        step_size: float = 0.1,
+        epsilon: float = 0.1,
+        env: Env = None,
+        sparse: bool = False,
+        replay_capacity: int = 0,
+        replay_batch_size: int = 32,
+        replay_half_life: float = None,
     ) -> None:
-        super().__init__(gamma, step_size, epsilon)
-        self.name = "Q-learning"
+        """
+        @replay_capacity: keeps the last replay_capacity transitions in a ReplayBuffer,
+        every real transition is then followed by a minibatch of replay_batch_size
+        updates sampled from it, 0 disables experience replay
+        @replay_half_life: recency-weighted sampling (see ReplayBuffer),
+        None samples the buffer uniformly
+        """
+        super().__init__(gamma, step_size, epsilon, env, sparse)
         # used to display the performances of the model for every step
         self.cumulative_rewards = []
         self.reward_counter = 0
+        # TrajectoryRecorder of the transitions played, set by fit(trajectory_log=...)
+        self.trajectory_log = None
+        self.replay_buffer = (
+            ReplayBuffer(replay_capacity, replay_half_life) if replay_capacity else None
+        )
+        self.replay_batch_size = replay_batch_size
 
     def agent_start(self, state: int):
         """
@@ -31,13 +64,31 @@ class Q_learning_Agent(Agent):
         self.update_state(state, self.past_action)
         return self.past_action
 
-    def step(self, state: int, reward: int) -> None:
-        # direct RL update
-        update = self.q_values[self.past_state][self.past_action]
+    def direct_update(self, state: int, reward: int) -> None:
+        """
+        Q-learning update of the last (state, action) pair from the observed transition
+        """
+        update = self.q_table[self.past_state, self.past_action]
         update += self.step_size * (
-            reward + self.gamma * np.max(self.q_values[state]) - update
+            reward + self.gamma * self.q_table[state].max() - update
         )
-        self.q_values[self.past_state][self.past_action] = update
+        self.q_table[self.past_state, self.past_action] = update
+
+    def replay_update(self, state: int, reward: int, done: bool) -> None:
+        """
+        Stores the last transition in the replay buffer, then applies a minibatch
+        of Q-learning updates sampled from the buffer
+        """
+        replay = self.replay_buffer
+        replay.add(self.past_state, self.past_action, reward, state, done)
+        batch = replay.sample(self.rng, min(self.replay_batch_size, len(replay)))
+        replay_batch(self.q_table, batch, self.step_size, self.gamma)
+
+    def step(self, state: int, reward: int) -> None:
+        # direct RL update
+        self.direct_update(state, reward)
+        if self.replay_buffer is not None:
+            self.replay_update(state, reward, False)
         # action selection using the e-greedy policy
         action = self.epsilon_greedy(state)
         self.update_state(state, action)
@@ -51,15 +102,15 @@ class Q_learning_Agent(Agent):
         """
         Called once the agent reaches a terminal state
         """
-        terminal_coordinates = self.state_to_coord(self.position)
-        # the coordinates must be reversed when querying the dataframe
-        reward = self.env.get_reward(terminal_coordinates)
+        reward = self.observe_reward(self.position)
         # direct RL update for a terminal state
-        update = self.q_values[self.past_state][self.past_action]
+        update = self.q_table[self.past_state, self.past_action]
         update += self.step_size * (reward - update)
-        self.q_values[self.past_state][self.past_action] = update
+        self.q_table[self.past_state, self.past_action] = update
+        if self.replay_buffer is not None:
+            self.replay_update(self.position, reward, True)
         # model update with next_action = -1
-        self.state_visits[self.past_state] += 1
+        self.visit_counts[self.past_state] += 1
 
     def play_episode(self) -> None:
         """
@@ -69,49 +120,112 @@ class Q_learning_Agent(Agent):
         self.agent_start(self.start_position)
         episode_steps = 1
         while not self.done:
-            reward = self.env.get_reward(self.state_to_coord(self.position))
+            reward = self.observe_reward(self.position)
+            if self.trajectory_log is not None:
+                self.trajectory_log.record(
+                    self.past_state, self.past_action, reward, self.position, False
+                )
             self.step(self.position, reward)
             episode_steps += 1
-        self.n_steps.append(episode_steps)
+        self.metrics.record(episode_steps, self.episode_reward)
+        if self.trajectory_log is not None:
+            self.trajectory_log.record(
+                self.past_state,
+                self.past_action,
+                self.observe_reward(self.position),
+                self.position,
+                True,
+            )
         self.agent_end()
         self.reset()
 
     def fit(
-        self, n_episode: int, log_progress: list = None, plot: bool = False
+        self,
+        n_episode: int,
+        log_progress: list = None,
+        plot: bool = False,
+        snapshot_every: int = 1,
+        max_snapshots: int = None,
+        snapshot_path: str = None,
+        profile: bool = False,
+        checkpoint_every: int = 0,
+        checkpoint_path: str = None,
+        feed=None,
+        trajectory_log=None,
     ) -> None:
         """
         Plays n_episode episodes
         @log_progress (list): calls the log_agent_performances
         function for each episode in the list
         @plot (bool): whether to plot the recorded progress or not
+        @snapshot_every (int): records the state values in self.value_estimates
+        every snapshot_every episodes, 0 disables the snapshots
+        @max_snapshots (int): only keeps the most recent snapshots (ring buffer)
+        @snapshot_path (str): memory-maps the snapshots to a .npy file
+        @profile (bool): times the phases of the step loop, the report is
+        available with self.profiler.report() or self.profiler.to_json(path)
+        @checkpoint_every (int): saves the agent to checkpoint_path every
+        checkpoint_every episodes (see package.checkpoint), an interrupted fit is
+        resumed with load_checkpoint(checkpoint_path).fit(remaining episodes)
+        @feed (MetricsFeed): publishes the metrics of every episode to its subscribers
+        without blocking (see package.live_metrics)
+        @trajectory_log (TrajectoryRecorder): appends every transition played to a log,
+        which can be replayed with package.trajectories.train_offline
         """
-        self.value_estimates = {}
+        self.metrics.reserve(self.metrics.count + n_episode)
+        self.value_estimates = ValueSnapshots.for_fit(
+            (self.env.n_rows, self.env.n_cols),
+            n_episode,
+            every=snapshot_every,
+            max_snapshots=max_snapshots,
+            path=snapshot_path,
+        )
         self.episode_played = 0
-        for idx in range(n_episode):
-            if self.episode_played == 100:
-                self.env.activate_late_portal()
-            self.play_episode()
-            self.value_estimates[self.episode_played] = self.state_dict_to_matrix(
-                self.q_values
-            ).values
-
-            self.episode_played += 1
-            if log_progress is not None:
-                if idx in log_progress:
-                    self.log_agent_performances(plot=plot)
-
-    def state_dict_to_matrix(self, dictionary: dict) -> pd.DataFrame:
-        """
-        Convert a dictionary of states (e.g. q_values and n_visits) to a
+        self.profiler = PhaseProfiler(self) if profile else None
+        self.trajectory_log = trajectory_log
+        with self.profiler or nullcontext():
+            for idx in range(n_episode):
+                # counted over all the episodes of the agent, so that training
+                # can be resumed with further calls to fit
+                if self.metrics.count == 100:
+                    self.env.activate_late_portal()
+                self.play_episode()
+                if feed is not None:
+                    feed.publish(self)
+                if self.value_estimates.should_record(self.episode_played):
+                    self.value_estimates.record(
+                        self.episode_played,
+                        self.env.state_array_to_grid(self.q_table.max(axis=1)),
+                    )
+
+                self.episode_played += 1
+                if checkpoint_every and self.episode_played % checkpoint_every == 0:
+                    save_checkpoint(self, checkpoint_path)
+                if log_progress is not None:
+                    if idx in log_progress:
+                        self.log_agent_performances(plot=plot)
+        self.value_estimates.flush()
+        if trajectory_log is not None:
+            trajectory_log.flush()
+            self.trajectory_log = None
+
+    def state_dict_to_matrix(self, dictionary) -> pd.DataFrame:
+        """
+        Convert a table of states (e.g. q_values and n_visits) to a
         matrix representation matching the environment's grid representation
+        Accepts the dict views of the agent, arrays indexed by state and plain dicts
         """
-        key_val = [
-            (self.state_to_coord(key)[::-1], np.max(values))
-            for (key, values) in list(dictionary.items())
-        ]
-        matrix = pd.DataFrame(np.zeros((8, 12)))
-        for key, value in key_val:
-            matrix.loc[key] = value
+        if isinstance(dictionary, StateDictView):
+            table = np.asarray(dictionary.table)
+        elif isinstance(dictionary, dict):
+            table = np.zeros(self.env.n_states, dtype=np.float32)
+            for key, values in dictionary.items():
+                table[key] = np.max(values)
+        else:
+            table = np.asarray(dictionary)
+        if table.ndim == 2:
+            table = table.max(axis=1)
+        matrix = pd.DataFrame(self.env.state_array_to_grid(table))
         matrix.index = [str(i) for i in matrix.index]
         matrix.columns = [str(c) for c in matrix.columns]
         return matrix
@@ -128,30 +242,23 @@ class Q_learning_Agent(Agent):
     def plot_bar_chart(self, dataframe: pd.DataFrame, attribute: "str", color: str):
         return go.Bar(y=dataframe[attribute], marker=dict(color=dataframe[color]))
 
+    @property
+    def episodes(self) -> pd.DataFrame:
+        """
+        Steps, reward and optimality color of each episode played so far
+        """
+        return self.metrics.to_frame()
+
     def log_agent_performances(self, plot: bool = False) -> None:
         """
-        Records the steps and reward for each episode until the current time step
+        The steps and reward of each episode are recorded by self.metrics
         @plot: plots the current state of the agent's q values, the number of visits for each state
         and the number of steps per episode
         """
-        q_values = self.state_dict_to_matrix(self.q_values)
-        state_visits = self.state_dict_to_matrix(self.state_visits)
-
-        # # assign the color green if the agent finds the treasure within 12 steps, red if 17 steps
-        # # blue if the agent terminates before finding the reward or in more than 17 steps
-        episodes = pd.DataFrame({"steps": self.n_steps, "reward": self.rewards})
-        episodes["is_optimal"] = "#636EFA"  # Assign default blue color
-        episodes.loc[
-            (episodes["reward"] == 1) & (episodes["steps"].between(13, 17)),
-            "is_optimal",
-        ] = "#EF553B"  # Red color
-        episodes.loc[
-            (episodes["reward"] == 1) & (episodes["steps"] <= 12), "is_optimal"
-        ] = "#00CC96"  # Green color
-        episodes["is_optimal"] = pd.Categorical(episodes["is_optimal"])
-        self.episodes = episodes
-
         if plot:
+            q_values = self.state_dict_to_matrix(self.q_values)
+            state_visits = self.state_dict_to_matrix(self.state_visits)
+            episodes = self.metrics.to_frame(last=100)
             # create the plots
             heatmap1 = self.plot_heatmap(
                 q_values, **{"colorbar": dict(x=0.45, y=0.78, len=0.473)}
@@ -160,7 +267,7 @@ class Q_learning_Agent(Agent):
                 state_visits, **{"colorbar": dict(x=1, y=0.78, len=0.473)}
             )
             bar_chart = self.plot_bar_chart(
-                episodes.tail(100), attribute="steps", color="is_optimal"
+                episodes, attribute="steps", color="is_optimal"
             )
 
             # Create subplot figure
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class RandomStreams:
+    """
+    Random numbers of an agent, with the rand() and randint(high, size) calls of RandomState
+    @generator: numpy Generator (e.g. default_rng, PCG64) or legacy RandomState
+    @block_size: number of uniforms drawn from the generator at once,
+    rand() and randint() then hand them out one by one, an integer below high
+    is derived from a uniform u as int(u * high)
+    0 is the compatibility mode: each value is drawn with its own generator call,
+    with a RandomState this reproduces the former seeded sequences
+    (choice(values) draws the same number as values[randint(len(values))])
+    By default, a RandomState is used in compatibility mode and a Generator in blocks
+    """
+
+    def __init__(self, generator=None, block_size: int = None) -> None:
+        if generator is None:
+            generator = np.random.default_rng()
+        legacy = isinstance(generator, np.random.RandomState)
+        if block_size is None:
+            block_size = 0 if legacy else 4096
+        self.generator = generator
+        self.block_size = block_size
+        self.bind()
+        if block_size:
+            self.refill()
+
+    def bind(self) -> None:
+        """
+        Binds rand() and randint(), they are direct generator calls in compatibility mode
+        """
+        generator = self.generator
+        legacy = isinstance(generator, np.random.RandomState)
+        self.draw = generator.random_sample if legacy else generator.random
+        if self.block_size == 0:
+            self.rand = self.draw
+            self.randint = generator.randint if legacy else generator.integers
+        else:
+            self.rand = self.block_rand
+            self.randint = self.block_randint
+
+    def refill(self) -> None:
+        self.buffer = self.draw(self.block_size)
+        # python floats are faster to hand out one by one than numpy scalars
+        self.values = self.buffer.tolist()
+        self.position = 0
+
+    def uniforms(self, n: int) -> np.ndarray:
+        """
+        Next n uniforms of the block, as an array
+        """
+        if n > self.block_size - self.position:
+            if n > self.block_size:
+                return self.draw(n)
+            self.refill()
+        values = self.buffer[self.position : self.position + n]
+        self.position += n
+        return values
+
+    def block_rand(self) -> float:
+        if self.position == self.block_size:
+            self.refill()
+        value = self.values[self.position]
+        self.position += 1
+        return value
+
+    def block_randint(self, high, size: int = None):
+        """
+        Integers in [0, high), high can also be an array of upper bounds
+        """
+        if size is None and not isinstance(high, np.ndarray):
+            return int(self.block_rand() * high)
+        n = size if size is not None else len(high)
+        return (self.uniforms(n) * high).astype(np.int64)
+
+    def __getstate__(self) -> dict:
+        # the bound methods and the list of values are rebuilt when unpickling
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in ("draw", "rand", "randint", "values")
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.bind()
+        if self.block_size:
+            self.values = self.buffer.tolist()
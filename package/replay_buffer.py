@@ -0,0 +1,92 @@
+import numpy as np
+
+# fixed-size record of a stored transition, 17 bytes
+REPLAY_TRANSITION = np.dtype(
+    [
+        ("state", np.int32),
+        ("action", np.int32),
+        ("reward", np.float32),
+        ("next_state", np.int32),
+        ("done", np.bool_),
+    ]
+)
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of the last capacity transitions of an agent, preallocated as
+    REPLAY_TRANSITION records (int32 states and actions, float32 rewards, bool done)
+    Transitions are written field by field into the columns of the buffer,
+    adding one does not allocate any object
+    @half_life: recency-weighted sampling, the probability of a transition halves
+    every half_life transitions back in time (truncated exponential of the age),
+    None samples the stored transitions uniformly
+    """
+
+    def __init__(self, capacity: int, half_life: float = None) -> None:
+        self.capacity = capacity
+        self.half_life = half_life
+        self.buffer = np.zeros(capacity, dtype=REPLAY_TRANSITION)
+        self.size = 0
+        # slot of the next transition
+        self.next_slot = 0
+        self.bind()
+
+    def bind(self) -> None:
+        # views of the columns of the buffer
+        self.states = self.buffer["state"]
+        self.actions = self.buffer["action"]
+        self.rewards = self.buffer["reward"]
+        self.next_states = self.buffer["next_state"]
+        self.dones = self.buffer["done"]
+
+    def add(
+        self, state: int, action: int, reward: float, next_state: int, done: bool
+    ) -> None:
+        slot = self.next_slot
+        self.states[slot] = state
+        self.actions[slot] = action
+        self.rewards[slot] = reward
+        self.next_states[slot] = next_state
+        self.dones[slot] = done
+        self.next_slot = (slot + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def ages(self, uniforms: np.ndarray) -> np.ndarray:
+        """
+        Maps uniforms to ages (0 for the last transition added) of stored transitions
+        """
+        if self.half_life is None:
+            return (uniforms * self.size).astype(np.int64)
+        decay = np.log(2) / self.half_life
+        # inverse of the cdf of the exponential truncated to [0, size)
+        ages = -np.log1p(-uniforms * -np.expm1(-decay * self.size)) / decay
+        return np.minimum(ages.astype(np.int64), self.size - 1)
+
+    def sample(self, rng, batch_size: int) -> np.ndarray:
+        """
+        Samples batch_size stored transitions (with replacement)
+        @rng: RandomStreams of the agent
+        """
+        slots = (self.next_slot - 1 - self.ages(rng.draw(batch_size))) % self.capacity
+        return self.buffer[slots]
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self) -> dict:
+        # the column views are rebuilt from the buffer when loading
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in ("states", "actions", "rewards", "next_states", "dones")
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.bind()
@@ -0,0 +1,143 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from package.json_files import write_json
+from package.metrics import episodes_frame
+
+
+def results_path(name: str, results_dir: str = "results") -> str:
+    return os.path.join(results_dir, name)
+
+
+class ResultsStore:
+    """
+    Columnar store of the episode results of an agent, kept in a directory:
+    @metadata.json: agent name, hyperparameters, number of episodes and seed of each run
+    @steps.bin: int32 steps, one row of n_episode values per run
+    @rewards.bin: float32 rewards, one row of n_episode values per run
+    New runs are appended to the binary files, loading memory-maps them
+    The is_optimal colors are derived data and are only computed by to_frame
+    """
+
+    metadata_file = "metadata.json"
+    columns = {"steps": np.int32, "rewards": np.float32}
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, self.metadata_file)) as file:
+            self.metadata = json.load(file)
+
+    @classmethod
+    def create(
+        cls, path: str, name: str, n_episode: int, parameters: dict = None
+    ) -> "ResultsStore":
+        """
+        Creates an empty store, replacing the results previously saved at path
+        """
+        os.makedirs(path, exist_ok=True)
+        for column in cls.columns:
+            open(os.path.join(path, f"{column}.bin"), "wb").close()
+        metadata = {
+            "name": name,
+            # distinguishes the store from the stores previously created at path
+            "created": time.time_ns(),
+            "n_episode": n_episode,
+            "parameters": parameters or {},
+            "seeds": [],
+        }
+        cls.write_metadata(path, metadata)
+        return cls(path)
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return os.path.isfile(os.path.join(path, cls.metadata_file))
+
+    @classmethod
+    def write_metadata(cls, path: str, metadata: dict) -> None:
+        # the metadata is replaced atomically, the rows it does not count are ignored
+        write_json(os.path.join(path, cls.metadata_file), metadata)
+
+    @property
+    def name(self) -> str:
+        return self.metadata["name"]
+
+    @property
+    def n_episode(self) -> int:
+        return self.metadata["n_episode"]
+
+    @property
+    def n_runs(self) -> int:
+        return len(self.metadata["seeds"])
+
+    @property
+    def seeds(self) -> list:
+        return self.metadata["seeds"]
+
+    def append(self, steps, rewards, seed: int = None) -> None:
+        """
+        Appends the results of a single run
+        """
+        self.append_runs(np.atleast_2d(steps), np.atleast_2d(rewards), [seed])
+
+    def append_runs(self, steps, rewards, seeds: list) -> None:
+        """
+        Appends the results of several runs, arrays of shape (n_runs, n_episode)
+        """
+        values = {"steps": steps, "rewards": rewards}
+        for column, dtype in self.columns.items():
+            array = np.ascontiguousarray(values[column], dtype=dtype)
+            if array.shape != (len(seeds), self.n_episode):
+                raise ValueError(
+                    f"Expected {column} of shape {(len(seeds), self.n_episode)}, got {array.shape}"
+                )
+            with open(os.path.join(self.path, f"{column}.bin"), "r+b") as file:
+                # overwrite the rows that are not counted by the metadata, if any
+                file.seek(self.n_runs * self.n_episode * array.itemsize)
+                file.write(array.tobytes())
+        self.metadata["seeds"] = self.seeds + [
+            None if seed is None else int(seed) for seed in seeds
+        ]
+        self.write_metadata(self.path, self.metadata)
+
+    def load(self, column: str) -> np.ndarray:
+        """
+        Memory-maps a column, returns an array of shape (n_runs, n_episode)
+        """
+        dtype = self.columns[column]
+        if self.n_runs == 0:
+            return np.empty((0, self.n_episode), dtype=dtype)
+        return np.memmap(
+            os.path.join(self.path, f"{column}.bin"),
+            dtype=dtype,
+            mode="r",
+            shape=(self.n_runs, self.n_episode),
+        )
+
+    @property
+    def steps(self) -> np.ndarray:
+        return self.load("steps")
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self.load("rewards")
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Episode results indexed by (Run, episode), as in the former CSV files
+        """
+        episodes = episodes_frame(self.steps.ravel(), self.rewards.ravel())
+        episodes.index = pd.MultiIndex.from_product(
+            [range(self.n_runs), range(self.n_episode)], names=["Run", "episode"]
+        )
+        return episodes
+
+    def to_csv(self, path: str) -> None:
+        self.to_frame().to_csv(
+            path,
+            header=["steps", "reward", "is_optimal"],
+            index_label=["Run", "episode"],
+        )
@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from tqdm import tqdm
+
+from package.live_metrics import JsonLinesSink, MetricsFeed
+from package.metrics import episodes_frame
+
+
+def run_experiment(
+    agent_class: type,
+    agent_parameters: dict,
+    seed: int,
+    n_episode: int,
+    feed_dir: str = None,
+) -> tuple:
+    """
+    Trains a new agent seeded with seed, like a run of main.py
+    Only the compact per-episode arrays (steps, rewards) are returned,
+    so that no agent object has to be sent back between processes
+    @feed_dir: streams the metrics of every episode to feed_dir/<name>_<seed>.jsonl
+    (see package.live_metrics.follow_feeds)
+    """
+    agent = agent_class(**agent_parameters)
+    agent.random_generator = np.random.RandomState(seed=seed)
+    feed = None
+    if feed_dir is not None:
+        run = f"{agent.name}_{seed}"
+        sink = JsonLinesSink(os.path.join(feed_dir, f"{run}.jsonl"))
+        feed = MetricsFeed([sink], run=run)
+    try:
+        agent.fit(n_episode=n_episode, snapshot_every=0, feed=feed)
+    finally:
+        if feed is not None:
+            feed.close()
+    return (
+        np.asarray(agent.n_steps, dtype=np.int32),
+        np.asarray(agent.rewards, dtype=np.float32),
+    )
+
+
+def run_experiments(
+    agents_parameters: dict,
+    seeds: list,
+    n_episode: int,
+    max_workers: int = None,
+    progress: bool = True,
+    feed_dir: str = None,
+):
+    """
+    Runs every (agent class, parameters, seed) job across a process pool
+    Yields (agent_class, run, episodes) as soon as a job completes, where run is
+    the index of the seed and episodes the DataFrame recorded by log_agent_performances
+    @agents_parameters: {agent_class: parameters} as in main.py
+    @max_workers: number of processes (os.cpu_count() by default),
+    1 runs the jobs one after another in the current process
+    @progress: displays a single progress bar for all the jobs
+    @feed_dir: directory of the live metrics of the runs (see run_experiment)
+    """
+    jobs = [
+        (agent_class, agent_parameters, run, seed)
+        for agent_class, agent_parameters in agents_parameters.items()
+        for run, seed in enumerate(seeds)
+    ]
+    progress_bar = tqdm(total=len(jobs), disable=not progress, leave=True)
+
+    if max_workers == 1:
+        for agent_class, agent_parameters, run, seed in jobs:
+            n_steps, rewards = run_experiment(
+                agent_class, agent_parameters, seed, n_episode, feed_dir
+            )
+            progress_bar.update()
+            yield agent_class, run, episodes_frame(n_steps, rewards)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    run_experiment,
+                    agent_class,
+                    agent_parameters,
+                    seed,
+                    n_episode,
+                    feed_dir,
+                ): (agent_class, run)
+                for agent_class, agent_parameters, run, seed in jobs
+            }
+            for future in as_completed(futures):
+                agent_class, run = futures[future]
+                n_steps, rewards = future.result()
+                progress_bar.update()
+                yield agent_class, run, episodes_frame(n_steps, rewards)
+    progress_bar.close()
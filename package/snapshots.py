@@ -0,0 +1,110 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+
+class ValueSnapshots(Mapping):
+    """
+    Snapshots of the state values of an agent (grid layout), recorded during fit
+    Preallocated (capacity, n_rows, n_cols) float32 buffer, in memory or memory-mapped
+    @every: records one episode out of every, 0 disables the snapshots
+    @capacity: maximum number of snapshots
+    @ring: when the buffer is full, overwrites the oldest snapshots (ring buffer)
+    instead of raising an error
+    @path: memory-maps the buffer to this file instead of keeping it in memory
+    Can be read like the former dict value_estimates[episode] = values
+    """
+
+    def __init__(
+        self,
+        grid_shape: tuple,
+        capacity: int,
+        every: int = 1,
+        ring: bool = False,
+        path: str = None,
+    ) -> None:
+        if ring and every and capacity < 1:
+            raise ValueError(f"A ring buffer needs at least 1 snapshot, got {capacity}")
+        self.every = every
+        self.capacity = capacity if every else 0
+        self.ring = ring
+        self.path = path
+        shape = (self.capacity, *grid_shape)
+        if path is not None and self.capacity:
+            self.buffer = np.lib.format.open_memmap(
+                path, mode="w+", dtype=np.float32, shape=shape
+            )
+        else:
+            self.buffer = np.zeros(shape, dtype=np.float32)
+        self.episode_buffer = np.zeros(self.capacity, dtype=np.int64)
+        self.count = 0
+
+    @classmethod
+    def for_fit(
+        cls,
+        grid_shape: tuple,
+        n_episode: int,
+        every: int = 1,
+        max_snapshots: int = None,
+        path: str = None,
+    ) -> "ValueSnapshots":
+        """
+        Snapshots sized for n_episode episodes, a ring buffer of
+        max_snapshots snapshots (at least 1) if max_snapshots is set
+        """
+        if max_snapshots is not None:
+            return cls(grid_shape, max_snapshots, every, ring=True, path=path)
+        capacity = -(-n_episode // every) if every else 0
+        return cls(grid_shape, capacity, every, path=path)
+
+    def should_record(self, episode: int) -> bool:
+        return self.every > 0 and episode % self.every == 0
+
+    def record(self, episode: int, values: np.ndarray) -> None:
+        """
+        Copies values into the next slot of the buffer
+        """
+        if self.count >= self.capacity and not self.ring:
+            raise IndexError(f"The {self.capacity} snapshots are already recorded")
+        slot = self.count % self.capacity
+        self.buffer[slot] = values
+        self.episode_buffer[slot] = episode
+        self.count += 1
+
+    def order(self) -> np.ndarray:
+        """
+        Slots of the recorded snapshots, from the oldest to the most recent
+        """
+        if self.count <= self.capacity:
+            return np.arange(self.count)
+        return (np.arange(self.capacity) + self.count) % self.capacity
+
+    @property
+    def episodes(self) -> np.ndarray:
+        return self.episode_buffer[self.order()]
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Recorded snapshots, (n_snapshots, n_rows, n_cols) from the oldest to the most recent
+        """
+        if self.count <= self.capacity:
+            return self.buffer[: self.count]
+        return self.buffer[self.order()]
+
+    def flush(self) -> None:
+        if isinstance(self.buffer, np.memmap):
+            self.buffer.flush()
+
+    def __getitem__(self, episode: int) -> np.ndarray:
+        slots = self.order()
+        match = np.flatnonzero(self.episode_buffer[slots] == episode)
+        if len(match) == 0:
+            raise KeyError(episode)
+        return self.buffer[slots[match[0]]]
+
+    def __iter__(self):
+        return (int(episode) for episode in self.episodes)
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
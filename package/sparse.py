@@ -0,0 +1,194 @@
+import sys
+
+import numpy as np
+
+
+def list_nbytes(items: list, fill_value=None) -> int:
+    """
+    Memory of a list and of the objects it references, except fill_value
+    (the object the list was created with, shared by all its entries)
+    """
+    return sys.getsizeof(items) + sum(
+        sys.getsizeof(item) for item in items if item is not fill_value
+    )
+
+
+class SlotIndex:
+    """
+    Maps states to the rows (slots) of sparse tables, slots are allocated
+    on the first write to a state, in order of first touch
+    @slots: int32 slot of each state, -1 if the state was never written
+    @states: state of each allocated slot
+    Every SparseTable registered with the index grows with it, so that
+    a slot is a valid row of all of them
+    """
+
+    def __init__(self, n_states: int, capacity: int = 1024) -> None:
+        self.n_states = n_states
+        self.slots = np.full(n_states, -1, dtype=np.int32)
+        self.capacity = max(min(capacity, n_states), 1)
+        self.states = np.zeros(self.capacity, dtype=np.int64)
+        self.count = 0
+        self.tables = []
+
+    def register(self, table: "SparseTable") -> None:
+        self.tables.append(table)
+
+    def grow(self, size: int) -> None:
+        """
+        Doubles the capacity until it holds size slots
+        """
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        self.states = np.concatenate(
+            [self.states, np.zeros(capacity - self.capacity, dtype=np.int64)]
+        )
+        for table in self.tables:
+            table.resize(capacity)
+        self.capacity = capacity
+
+    def allocate(self, state: int) -> int:
+        slot = self.slots[state]
+        if slot < 0:
+            slot = self.count
+            if slot == self.capacity:
+                self.grow(slot + 1)
+            self.slots[state] = slot
+            self.states[slot] = state
+            self.count += 1
+        return slot
+
+    def allocate_many(self, states: np.ndarray) -> np.ndarray:
+        missing = np.unique(states[self.slots[states] < 0])
+        if len(missing):
+            end = self.count + len(missing)
+            if end > self.capacity:
+                self.grow(end)
+            self.slots[missing] = np.arange(self.count, end)
+            self.states[self.count : end] = missing
+            self.count = end
+        return self.slots[states]
+
+    @property
+    def nbytes(self) -> int:
+        return self.slots.nbytes + self.states.nbytes
+
+
+class SparseTable:
+    """
+    Table indexed by state like a dense (n_states, *row_shape) array, where only the
+    rows of the states written at least once are stored, in a compact array of slots
+    Supports the indexing used by the agents: table[state], table[state, action],
+    table[states] and table[states, actions] for reading (unwritten states read
+    as fill_value) and writing (allocates the rows of new states)
+    Rows returned for unwritten states are read-only, and the rows returned for written
+    states are views that become stale when the table grows: assign values with
+    table[state] = values or table[state, action] = value
+    """
+
+    def __init__(
+        self,
+        index: SlotIndex,
+        row_shape: tuple = (),
+        dtype=np.float32,
+        fill_value=0,
+    ) -> None:
+        self.index = index
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.fill_value = fill_value
+        self.fill_row = np.full(self.row_shape, fill_value, dtype=self.dtype)
+        self.fill_row.flags.writeable = False
+        self.data = np.full((index.capacity, *self.row_shape), fill_value, self.dtype)
+        index.register(self)
+
+    def resize(self, capacity: int) -> None:
+        grown = np.full((capacity, *self.row_shape), self.fill_value, self.dtype)
+        grown[: len(self.data)] = self.data
+        self.data = grown
+
+    @property
+    def shape(self) -> tuple:
+        return (self.index.n_states, *self.row_shape)
+
+    @property
+    def ndim(self) -> int:
+        return 1 + len(self.row_shape)
+
+    def __len__(self) -> int:
+        return self.index.n_states
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __getitem__(self, key):
+        state, rest = (key[0], key[1:]) if type(key) is tuple else (key, ())
+        if isinstance(state, np.ndarray):
+            slots = self.index.slots[state]
+            allocated = slots >= 0
+            if rest:
+                values = self.data[(np.maximum(slots, 0), *rest)]
+                return np.where(allocated, values, self.fill_value)
+            rows = self.data[np.maximum(slots, 0)]
+            rows[~allocated] = self.fill_value
+            return rows
+        slot = self.index.slots[state]
+        row = self.data[slot] if slot >= 0 else self.fill_row
+        # row[()] is the whole row, or a scalar for tables of scalars
+        return row[rest]
+
+    def __setitem__(self, key, value) -> None:
+        state, rest = (key[0], key[1:]) if type(key) is tuple else (key, ())
+        if isinstance(state, np.ndarray):
+            slots = self.index.allocate_many(state)
+        else:
+            slots = self.index.allocate(state)
+        self.data[(slots, *rest)] = value
+
+    def max(self, axis: int = None):
+        """
+        Maximum over the rows of every state (axis=1), or over the whole table
+        """
+        if axis is None:
+            return np.asarray(self).max()
+        if axis != 1:
+            raise ValueError("Only axis=1 and axis=None are supported")
+        values = np.full(self.index.n_states, self.fill_row.max(), dtype=self.dtype)
+        count = self.index.count
+        values[self.index.states[:count]] = self.data[:count].max(axis=1)
+        return values
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        """
+        Dense (n_states, *row_shape) copy of the table
+        """
+        dense = np.full(self.shape, self.fill_value, dtype=self.dtype)
+        count = self.index.count
+        dense[self.index.states[:count]] = self.data[:count]
+        return dense if dtype is None else dense.astype(dtype)
+
+
+class SparsePairTable:
+    """
+    Values of the (state, action) pairs indexed by pair = state * n_actions + action,
+    like a dense list of n_states * n_actions values, stored in the rows of a
+    SparseTable (only the rows of the states written at least once)
+    """
+
+    def __init__(
+        self, index: SlotIndex, n_actions: int, dtype=np.int64, fill_value=-1
+    ) -> None:
+        self.n_actions = n_actions
+        self.table = SparseTable(index, (n_actions,), dtype, fill_value)
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def __getitem__(self, pair: int):
+        return self.table[divmod(pair, self.n_actions)]
+
+    def __setitem__(self, pair: int, value) -> None:
+        self.table[divmod(pair, self.n_actions)] = value
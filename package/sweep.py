@@ -0,0 +1,252 @@
+import copy
+import itertools
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from package.checkpoint import load_checkpoint, save_checkpoint
+
+# the agents open the late portal before playing this episode
+LATE_PORTAL_EPISODE = 100
+
+
+def mean_steps(n_steps: np.ndarray, rewards: np.ndarray) -> float:
+    return float(np.mean(n_steps))
+
+
+def mean_reward(n_steps: np.ndarray, rewards: np.ndarray) -> float:
+    return float(np.mean(rewards))
+
+
+def late_portal_reward(n_steps: np.ndarray, rewards: np.ndarray) -> float:
+    """
+    Mean reward of the episodes played after the late portal opened,
+    or of all the episodes if it is not open yet
+    """
+    if len(rewards) > LATE_PORTAL_EPISODE:
+        rewards = rewards[LATE_PORTAL_EPISODE:]
+    return float(np.mean(rewards))
+
+
+# name: (score function of the episodes of a run, whether higher is better)
+SCORES = {
+    "steps": (mean_steps, False),
+    "reward": (mean_reward, True),
+    "late_reward": (late_portal_reward, True),
+}
+
+
+def sample_configurations(
+    search_space: dict, n_configs: int = None, seed: int = None
+) -> list:
+    """
+    Draws n_configs parameter dicts from the search space
+    @search_space: {parameter: values}, a list of values is sampled uniformly,
+    a (low, high) tuple is sampled uniformly in [low, high] (integers if both are)
+    @n_configs: None returns every combination of the lists (grid search)
+    """
+    names = list(search_space)
+    if n_configs is None:
+        if any(isinstance(values, tuple) for values in search_space.values()):
+            raise ValueError("Grid search requires lists of values, got a range")
+        return [
+            dict(zip(names, values))
+            for values in itertools.product(*search_space.values())
+        ]
+    rng = np.random.default_rng(seed)
+    configurations = []
+    for _ in range(n_configs):
+        configuration = {}
+        for name, values in search_space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    configuration[name] = int(rng.integers(low, high + 1))
+                else:
+                    configuration[name] = float(rng.uniform(low, high))
+            else:
+                configuration[name] = values[rng.integers(len(values))]
+        configurations.append(configuration)
+    return configurations
+
+
+def train_trial(
+    agent_class: type,
+    parameters: dict,
+    seed: int,
+    n_episode: int,
+    checkpoint: str,
+    resume: bool = False,
+) -> tuple:
+    """
+    Trains the agent of a (configuration, seed) trial for n_episode more episodes
+    and saves it in the checkpoint directory, so that the next rung resumes from it
+    (only paths and compact results go through the worker processes)
+    A new agent seeded with seed is created on the first rung, from a copy of
+    parameters so that trials never share an env (and its late portal)
+    Returns the steps (int32) and rewards (float32) of all the episodes played so far
+    """
+    if resume:
+        agent = load_checkpoint(checkpoint)
+    else:
+        agent = agent_class(**copy.deepcopy(parameters))
+        agent.random_generator = np.random.RandomState(seed=seed)
+    agent.fit(n_episode=n_episode, snapshot_every=0)
+    save_checkpoint(agent, checkpoint)
+    return (
+        np.asarray(agent.n_steps, dtype=np.int32),
+        np.asarray(agent.rewards, dtype=np.float32),
+    )
+
+
+def rung_sizes(n_configs: int, eta: int) -> list:
+    """
+    Number of configurations trained on each rung, divided by eta until one is left
+    """
+    sizes = [n_configs]
+    # the last rung still compares several configurations
+    while sizes[-1] // eta > 1:
+        sizes.append(sizes[-1] // eta)
+    return sizes
+
+
+def successive_halving(
+    agent_class: type,
+    search_space: dict,
+    budget: int,
+    n_configs: int = 16,
+    seeds: list = (100,),
+    eta: int = 2,
+    score: str = "steps",
+    parameters: dict = None,
+    seed: int = None,
+    max_workers: int = None,
+    progress: bool = True,
+) -> pd.DataFrame:
+    """
+    Tunes the parameters of an agent with successive halving: all the configurations
+    are trained for a few episodes, only the best 1/eta are trained further, and so on
+    Each rung spends an equal share of the budget, split between its trials
+    (configuration, seed), and the trials resume their training on the next rung
+    Returns one row per (configuration, rung) with the parameters, the number of
+    episodes played per seed, the mean score over the seeds and whether the
+    configuration was promoted (the winner is promoted on the last rung)
+    @budget: total number of episodes played, over all the trials
+    @n_configs: number of configurations sampled (None for a grid search)
+    @seeds: the score of a configuration is averaged over a run per seed
+    @score: name of the metric ranking the configurations (see SCORES),
+    computed on all the episodes played so far
+    @parameters: fixed parameters of the agents (e.g. env), copied for every trial
+    @seed: seed of the configurations sampling
+    @max_workers: number of processes (os.cpu_count() by default),
+    1 trains the trials one after another in the current process
+    """
+    score_function, higher_is_better = SCORES[score]
+    configurations = sample_configurations(search_space, n_configs, seed)
+    sizes = rung_sizes(len(configurations), eta)
+    if budget // (len(sizes) * sizes[0] * len(seeds)) == 0:
+        raise ValueError(
+            f"A budget of {budget} episodes is too small for {sizes[0]} configurations"
+            f" and {len(seeds)} seeds over {len(sizes)} rungs"
+        )
+    parameters = parameters or {}
+    # steps and rewards of the last rung of each trial
+    episodes = {}
+    survivors = list(range(len(configurations)))
+    played = 0
+    rows = []
+    progress_bar = tqdm(total=sum(sizes) * len(seeds), disable=not progress, leave=True)
+    executor = ProcessPoolExecutor(max_workers) if max_workers != 1 else None
+    # the trials are resumed from their checkpoint on the next rung
+    directory = tempfile.mkdtemp(prefix="sweep_")
+    checkpoints = {
+        (config, agent_seed): os.path.join(directory, f"{config}_{agent_seed}")
+        for config in survivors
+        for agent_seed in seeds
+    }
+    try:
+        for rung in range(len(sizes)):
+            n_episode = budget // (len(sizes) * len(survivors) * len(seeds))
+            trials = [
+                (config, agent_seed) for config in survivors for agent_seed in seeds
+            ]
+            jobs = [
+                (
+                    agent_class,
+                    {**parameters, **configurations[config]},
+                    agent_seed,
+                    n_episode,
+                    checkpoints[config, agent_seed],
+                    rung > 0,
+                )
+                for config, agent_seed in trials
+            ]
+            results = (
+                map(train_trial, *zip(*jobs))
+                if executor is None
+                else executor.map(train_trial, *zip(*jobs))
+            )
+            for trial, result in zip(trials, results):
+                episodes[trial] = result
+                progress_bar.update()
+            played += n_episode * len(trials)
+
+            scores = {
+                config: np.mean(
+                    [
+                        score_function(*episodes[config, agent_seed])
+                        for agent_seed in seeds
+                    ]
+                )
+                for config in survivors
+            }
+            # best configurations first, ties keep the order of the previous rung
+            sign = -1 if higher_is_better else 1
+            ranking = sorted(survivors, key=lambda config: sign * scores[config])
+            n_promoted = sizes[rung + 1] if rung + 1 < len(sizes) else 1
+            promoted = set(ranking[:n_promoted])
+            for config in survivors:
+                rows.append(
+                    {
+                        "config": config,
+                        **configurations[config],
+                        "rung": rung,
+                        "episodes": len(episodes[config, seeds[0]][0]),
+                        "score": scores[config],
+                        "promoted": config in promoted,
+                    }
+                )
+            # the eliminated agents are not trained any further
+            for config in set(survivors) - promoted:
+                for agent_seed in seeds:
+                    del episodes[config, agent_seed]
+                    shutil.rmtree(checkpoints[config, agent_seed])
+            survivors = ranking[:n_promoted]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+        progress_bar.close()
+
+    results = pd.DataFrame(rows)
+    results.attrs.update(
+        parameters=list(search_space), score=score, budget=budget, played=played
+    )
+    return results
+
+
+def best_parameters(results: pd.DataFrame) -> dict:
+    """
+    Parameters of the configuration promoted on the last rung of a sweep
+    """
+    last_rung = results[results["rung"] == results["rung"].max()]
+    best = last_rung[last_rung["promoted"]].iloc[0]
+    return {
+        name: best[name].item() if isinstance(best[name], np.generic) else best[name]
+        for name in results.attrs["parameters"]
+    }
@@ -0,0 +1,44 @@
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class StateDictView(MutableMapping):
+    """
+    Dict-compatible view over an array indexed by state
+    Used to keep the former dict interface of q_values and state_visits
+    (view[state], view.get(state), view.keys(), view.values(), ...)
+    while the agents read and write the underlying array directly
+    @table: array of shape (n_states,) or (n_states, n_actions)
+    @states: valid states (keys of the view), in iteration order
+    """
+
+    def __init__(self, table: np.ndarray, states: np.ndarray) -> None:
+        self.table = table
+        self.states = states
+        self.valid = np.zeros(len(table), dtype=bool)
+        self.valid[states] = True
+
+    def check_state(self, state: int) -> None:
+        if not (0 <= state < len(self.table) and self.valid[state]):
+            raise KeyError(state)
+
+    def __getitem__(self, state: int):
+        self.check_state(state)
+        return self.table[state]
+
+    def __setitem__(self, state: int, value) -> None:
+        self.check_state(state)
+        self.table[state] = value
+
+    def __delitem__(self, state: int) -> None:
+        raise TypeError("States cannot be removed from an array-backed table")
+
+    def __iter__(self):
+        return (int(state) for state in self.states)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())})"
@@ -0,0 +1,250 @@
+import json
+import os
+
+import numpy as np
+
+from package.json_files import write_json
+
+# fixed-size record of a transition, 21 bytes
+TRANSITION = np.dtype(
+    [
+        ("state", np.int32),
+        ("action", np.int32),
+        ("reward", np.float32),
+        ("next_state", np.int32),
+        ("done", np.bool_),
+        ("episode", np.int32),
+    ]
+)
+METADATA_FILE = "metadata.json"
+TRANSITIONS_FILE = "transitions.bin"
+
+
+def write_metadata(path: str, metadata: dict) -> None:
+    # replaced atomically, the records it does not count are ignored
+    write_json(os.path.join(path, METADATA_FILE), metadata)
+
+
+class TrajectoryRecorder:
+    """
+    Appends the transitions played by an agent (fit(trajectory_log=...)) to a log:
+    @transitions.bin: TRANSITION records (state, action, reward, next state,
+    done, episode), done marks the last transition of an episode
+    @metadata.json: number of states and actions, agent name and number of
+    transitions and episodes recorded
+    Transitions are buffered and appended buffer_size at a time,
+    the log is read with TrajectoryLog
+    """
+
+    def __init__(
+        self,
+        path: str,
+        n_states: int,
+        n_actions: int,
+        name: str = None,
+        buffer_size: int = 4096,
+    ) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.buffer = np.zeros(buffer_size, dtype=TRANSITION)
+        self.n_buffered = 0
+        self.episode = 0
+        self.metadata = {
+            "name": name,
+            "n_states": n_states,
+            "n_actions": n_actions,
+            "n_transitions": 0,
+            "n_episodes": 0,
+        }
+        self.file = open(os.path.join(path, TRANSITIONS_FILE), "wb")
+        write_metadata(path, self.metadata)
+
+    @classmethod
+    def for_agent(cls, path: str, agent, buffer_size: int = 4096):
+        return cls(path, agent.env.n_states, agent.n_actions, agent.name, buffer_size)
+
+    def record(
+        self, state: int, action: int, reward: float, next_state: int, done: bool
+    ) -> None:
+        if self.file.closed:
+            raise ValueError(f"The trajectory log {self.path} is closed")
+        self.buffer[self.n_buffered] = (
+            state,
+            action,
+            reward,
+            next_state,
+            done,
+            self.episode,
+        )
+        self.n_buffered += 1
+        if done:
+            self.episode += 1
+        if self.n_buffered == len(self.buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Appends the buffered transitions and updates the metadata
+        """
+        if self.file.closed:
+            return
+        self.file.write(self.buffer[: self.n_buffered].tobytes())
+        self.file.flush()
+        self.metadata["n_transitions"] += self.n_buffered
+        self.metadata["n_episodes"] = self.episode
+        self.n_buffered = 0
+        write_metadata(self.path, self.metadata)
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TrajectoryLog:
+    """
+    Memory-mapped transitions of a log written by TrajectoryRecorder
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, METADATA_FILE)) as file:
+            self.metadata = json.load(file)
+        if self.n_transitions == 0:
+            self.transitions = np.zeros(0, dtype=TRANSITION)
+        else:
+            self.transitions = np.memmap(
+                os.path.join(path, TRANSITIONS_FILE),
+                dtype=TRANSITION,
+                mode="r",
+                shape=(self.n_transitions,),
+            )
+
+    @property
+    def n_states(self) -> int:
+        return self.metadata["n_states"]
+
+    @property
+    def n_actions(self) -> int:
+        return self.metadata["n_actions"]
+
+    @property
+    def n_transitions(self) -> int:
+        return self.metadata["n_transitions"]
+
+    @property
+    def n_episodes(self) -> int:
+        return self.metadata["n_episodes"]
+
+    def episode_bounds(self) -> np.ndarray:
+        """
+        Index of the first transition of each episode, followed by n_transitions
+        """
+        ends = np.flatnonzero(self.transitions["done"]) + 1
+        return np.concatenate([[0], ends]).astype(np.int64)
+
+    def episode(self, episode: int) -> np.ndarray:
+        """
+        Transitions of a single episode
+        """
+        bounds = self.episode_bounds()
+        return self.transitions[bounds[episode] : bounds[episode + 1]]
+
+    def batches(self, batch_size: int):
+        """
+        Yields consecutive slices of batch_size transitions
+        """
+        for start in range(0, self.n_transitions, batch_size):
+            yield self.transitions[start : start + batch_size]
+
+    def __len__(self) -> int:
+        return self.n_transitions
+
+
+def replay_batch(
+    q_table: np.ndarray, batch: np.ndarray, step_size: float, gamma: float
+) -> None:
+    """
+    Q-learning updates of a batch of transitions, in place
+    The targets of a batch are computed from the q-values at the start of the batch,
+    a pair that appears n times receives n successive updates towards its targets:
+    q <- (1 - step_size) ** n * q + sum_k step_size * (1 - step_size) ** (n - k) * target_k
+    """
+    n_actions = q_table.shape[1]
+    states = batch["state"].astype(np.int64)
+    next_states = batch["next_state"].astype(np.int64)
+    bootstrap = np.where(batch["done"], 0, gamma * q_table[next_states].max(axis=1))
+    targets = batch["reward"] + bootstrap
+    # groups the occurrences of each pair, in the order of the log
+    keys = states * n_actions + batch["action"]
+    order = np.argsort(keys, kind="stable")
+    pairs, first, counts = np.unique(keys[order], return_index=True, return_counts=True)
+    # number of later occurrences of the same pair in the batch
+    later = np.repeat(first + counts, counts) - np.arange(len(keys)) - 1
+    weights = step_size * (1 - step_size) ** later
+    contributions = np.bincount(
+        np.repeat(np.arange(len(pairs)), counts),
+        weights=weights * targets[order],
+        minlength=len(pairs),
+    )
+    pair_states, pair_actions = np.divmod(pairs, n_actions)
+    q = q_table[pair_states, pair_actions].astype(np.float64)
+    q_table[pair_states, pair_actions] = (1 - step_size) ** counts * q + contributions
+
+
+def replay_q_learning(
+    log: TrajectoryLog,
+    q_table: np.ndarray = None,
+    step_size: float = 0.1,
+    gamma: float = 1,
+    n_epochs: int = 1,
+    batch_size: int = 1024,
+) -> np.ndarray:
+    """
+    Trains a q_table (a new float32 table if None) on the transitions of a log,
+    n_epochs passes in batches of batch_size transitions
+    batch_size=1 replays the updates of an online Q-learning agent
+    """
+    if q_table is None:
+        q_table = np.zeros((log.n_states, log.n_actions), dtype=np.float32)
+    for _ in range(n_epochs):
+        for batch in log.batches(batch_size):
+            replay_batch(q_table, batch, step_size, gamma)
+    return q_table
+
+
+def replay_model(log: TrajectoryLog, model) -> None:
+    """
+    Records the transitions of a log in a WorldModel, as the Dyna agents do
+    (terminal transitions lead to -1)
+    Each pair keeps its last transition and the pairs are inserted in the order
+    of their first transition, so a single update per pair is needed
+    """
+    transitions = log.transitions
+    keys = transitions["state"].astype(np.int64) * log.n_actions + transitions["action"]
+    _, first = np.unique(keys, return_index=True)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last
+    # the np.unique outputs are both sorted by pair
+    for index in last[np.argsort(first)]:
+        state, action, reward, next_state, done, _ = transitions[index]
+        model.update(int(state), int(action), -1 if done else int(next_state), reward)
+
+
+def train_offline(agent, log: TrajectoryLog, n_epochs: int = 1, batch_size: int = 1024):
+    """
+    Trains an agent on a log instead of playing episodes, with its own
+    step_size and gamma: the Dyna agents also record the transitions in their model,
+    so that planning (agent.planning_step()) can follow
+    """
+    if hasattr(agent, "model"):
+        replay_model(log, agent.model)
+    replay_q_learning(
+        log, agent.q_table, agent.step_size, agent.gamma, n_epochs, batch_size
+    )
+    return agent
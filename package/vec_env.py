@@ -0,0 +1,75 @@
+import copy
+
+import numpy as np
+
+from package.env import Env
+
+
+class VecEnv:
+    """
+    N independent copies of the grid world stepped together with array indexing
+    Each copy keeps its own position, episode counter and late portal status,
+    the late portal of a copy opens once it has completed late_portal_episode episodes
+    (the agents activate it before playing episode 100)
+    Finished copies are automatically reset to the start position
+    """
+
+    def __init__(
+        self, n_envs: int, env: Env = None, late_portal_episode: int = 100
+    ) -> None:
+        self.n_envs = n_envs
+        self.env = Env() if env is None else env
+        self.n_states = self.env.n_states
+        self.n_actions = self.env.n_actions
+        self.late_portal_episode = late_portal_episode
+        self.start_state = self.env.start_state
+        # tables are stacked along a first axis: 0 = initial grid, 1 = late portal open
+        layouts = [self.env]
+        if self.env.has_late_portal and late_portal_episode is not None:
+            late_env = copy.deepcopy(self.env)
+            late_env.activate_late_portal()
+            layouts.append(late_env)
+        self.next_state = np.stack([layout.next_state for layout in layouts])
+        self.reward = np.stack([layout.reward for layout in layouts])
+        self.terminal = np.stack([layout.terminal for layout in layouts])
+        self.reset()
+
+    def reset(self) -> np.ndarray:
+        """
+        Resets every copy to the start position and closes the late portals
+        """
+        self.states = np.full(self.n_envs, self.start_state)
+        self.episodes = np.zeros(self.n_envs, dtype=np.int64)
+        self.layout = np.zeros(self.n_envs, dtype=np.int64)
+        return self.states.copy()
+
+    def activate_late_portal(self, mask: np.ndarray = None) -> None:
+        """
+        Opens the late portal in the copies selected by mask (all copies by default)
+        """
+        if len(self.next_state) == 1:
+            return
+        if mask is None:
+            self.layout[:] = 1
+        else:
+            self.layout[mask] = 1
+
+    def step(self, actions: np.ndarray, envs: np.ndarray = None) -> tuple:
+        """
+        Takes one action in every copy
+        Returns the next states, rewards and done flags of the transitions,
+        next states are the terminal states for the finished copies while
+        self.states already holds their reset (start) position
+        @envs: indices of the copies to step, all the copies by default
+        """
+        if envs is None:
+            envs = slice(None)
+        layout, states = self.layout[envs], self.states[envs]
+        next_states = self.next_state[layout, states, actions]
+        rewards = self.reward[layout, states, actions]
+        dones = self.terminal[layout, states, actions]
+        self.states[envs] = np.where(dones, self.start_state, next_states)
+        self.episodes[envs] += dones
+        if self.late_portal_episode is not None:
+            self.activate_late_portal(self.episodes >= self.late_portal_episode)
+        return next_states, rewards, dones
@@ -0,0 +1,191 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from package.sparse import SlotIndex, SparsePairTable, SparseTable, list_nbytes
+
+
+def grow(array: np.ndarray) -> np.ndarray:
+    """
+    Doubles the size of a dense list
+    """
+    return np.concatenate([array, np.zeros_like(array)])
+
+
+class WorldModel(Mapping):
+    """
+    Tabular model of the environment used by the Dyna agents
+    Stored in preallocated arrays indexed by [state, action]:
+    @next_state: predicted next state (-1 for terminal transitions)
+    @reward: predicted reward
+    @observed: whether the transition was recorded
+    The visited states and the recorded actions of each state are also kept as
+    dense lists in insertion order, so that sampling draws two integers and
+    updates are O(1)
+    Reading the model like a dict (model[state][action] = (next state, reward))
+    is still supported for inspection and testing
+    @track_predecessors: maintains, for every state, the linked list of the pairs
+    predicted to lead to it (used by prioritized sweeping)
+    @sparse: only stores the rows of the visited states (SparseTable), the dense
+    lists grow with the model instead of being allocated for every state
+    """
+
+    def __init__(
+        self,
+        n_states: int,
+        n_actions: int,
+        track_predecessors: bool = False,
+        sparse: bool = False,
+    ) -> None:
+        self.n_actions = n_actions
+        self.sparse = sparse
+        if sparse:
+            self.slot_index = SlotIndex(n_states)
+
+        def table(row_shape: tuple, dtype, fill_value=0):
+            if sparse:
+                return SparseTable(self.slot_index, row_shape, dtype, fill_value)
+            return np.full((n_states, *row_shape), fill_value, dtype=dtype)
+
+        capacity = self.slot_index.capacity if sparse else n_states
+        self.next_state = table((n_actions,), np.int64)
+        self.reward = table((n_actions,), np.float32)
+        self.observed = table((n_actions,), bool)
+        # visited states
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.n_visited = 0
+        # recorded actions of each state
+        self.actions = table((n_actions,), np.int64)
+        self.n_recorded = table((), np.int64)
+        self.track_predecessors = track_predecessors
+        if track_predecessors:
+            # doubly linked lists of pairs, -1 marks the end of a list
+            if sparse:
+                self.predecessor_head = table((), np.int64, -1)
+                self.predecessor_next = SparsePairTable(self.slot_index, n_actions)
+                self.predecessor_previous = SparsePairTable(self.slot_index, n_actions)
+            else:
+                self.predecessor_head = [-1] * n_states
+                self.predecessor_next = [-1] * (n_states * n_actions)
+                self.predecessor_previous = [-1] * (n_states * n_actions)
+
+    def update(self, state: int, action: int, next_state: int, reward: float) -> None:
+        """
+        Records a transition, the first visit of a state or action
+        appends it to the dense lists
+        """
+        if not self.observed[state, action]:
+            if self.n_recorded[state] == 0:
+                if self.n_visited == len(self.states):
+                    self.states = grow(self.states)
+                self.states[self.n_visited] = state
+                self.n_visited += 1
+            self.actions[state, self.n_recorded[state]] = action
+            self.n_recorded[state] += 1
+            self.observed[state, action] = True
+            if self.track_predecessors:
+                self.link_predecessor(state * self.n_actions + action, next_state)
+        elif self.track_predecessors and self.next_state[state, action] != next_state:
+            pair = state * self.n_actions + action
+            self.unlink_predecessor(pair, self.next_state[state, action])
+            self.link_predecessor(pair, next_state)
+        self.next_state[state, action] = next_state
+        self.reward[state, action] = reward
+
+    def link_predecessor(self, pair: int, next_state: int) -> None:
+        if next_state == -1:
+            return
+        head = self.predecessor_head[next_state]
+        self.predecessor_next[pair] = head
+        self.predecessor_previous[pair] = -1
+        if head != -1:
+            self.predecessor_previous[head] = pair
+        self.predecessor_head[next_state] = pair
+
+    def unlink_predecessor(self, pair: int, next_state: int) -> None:
+        if next_state == -1:
+            return
+        previous = self.predecessor_previous[pair]
+        following = self.predecessor_next[pair]
+        if previous == -1:
+            self.predecessor_head[next_state] = following
+        else:
+            self.predecessor_next[previous] = following
+        if following != -1:
+            self.predecessor_previous[following] = previous
+
+    def predecessors(self, state: int):
+        """
+        Yields the (state, action) pairs predicted to lead to state
+        """
+        pair = self.predecessor_head[state]
+        while pair != -1:
+            yield divmod(pair, self.n_actions)
+            pair = self.predecessor_next[pair]
+
+    def sample(self, rng) -> tuple:
+        """
+        Samples a visited state, then one of its recorded actions, uniformly
+        @rng: RandomStreams of the agent, or any object with a RandomState-like randint
+        With a RandomState, draws the same random numbers as choice(list(model.keys()))
+        followed by choice(list(model[state].keys())) on the former dict model
+        """
+        state = self.states[rng.randint(self.n_visited)]
+        action = self.actions[state, rng.randint(self.n_recorded[state])]
+        return state, action
+
+    def sample_batch(self, rng, n_samples: int) -> tuple:
+        """
+        Vectorized version of sample, returns arrays of n_samples states and actions
+        """
+        states = self.states[rng.randint(self.n_visited, size=n_samples)]
+        actions = self.actions[states, rng.randint(self.n_recorded[states])]
+        return states, actions
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays (and linked lists) of the model
+        """
+        arrays = [
+            self.next_state,
+            self.reward,
+            self.observed,
+            self.states,
+            self.actions,
+            self.n_recorded,
+        ]
+        nbytes = sum(array.nbytes for array in arrays)
+        if self.sparse:
+            nbytes += self.slot_index.nbytes
+        if self.track_predecessors:
+            for links in [
+                self.predecessor_head,
+                self.predecessor_next,
+                self.predecessor_previous,
+            ]:
+                nbytes += links.nbytes if self.sparse else list_nbytes(links, -1)
+        return nbytes
+
+    def __contains__(self, state) -> bool:
+        return 0 <= state < len(self.n_recorded) and self.n_recorded[state] > 0
+
+    def __getitem__(self, state: int) -> dict:
+        if state not in self:
+            raise KeyError(state)
+        return {
+            int(action): (
+                int(self.next_state[state, action]),
+                self.reward[state, action].item(),
+            )
+            for action in self.actions[state, : self.n_recorded[state]]
+        }
+
+    def __iter__(self):
+        return (int(state) for state in self.states[: self.n_visited])
+
+    def __len__(self) -> int:
+        return self.n_visited
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())})"
@@ -1,16 +1,20 @@
 import numpy as np
+import pytest
 
 from package.agent import Agent
 from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.prioritized_sweeping_agent import Prioritized_Sweeping_Agent
+from package.q_learning_agent import Q_learning_Agent
 
 
 def test_agent_update_model():
     a = Dyna_Q_Agent()
-    a.update_model(6, 1, 7, 0)
-    a.update_model(11, 3, 10, 0)
-    a.update_model(111, 0, 110, 1)
+    a.update_model(72, 1, 84, 0)
+    a.update_model(13, 3, 1, 0)
+    a.update_model(23, 0, 11, 1)
 
-    assert a.model == {6: {1: (7, 0)}, 11: {3: (10, 0)}, 111: {0: (110, 1)}}
+    assert a.model == {72: {1: (84, 0)}, 13: {3: (1, 0)}, 23: {0: (11, 1)}}
 
 
 def test_argmax():
@@ -29,7 +33,7 @@ def test_coord_to_state():
     rows, cols = a.env.grid.index, a.env.grid.columns
     for row in rows:
         for col in cols:
-            assert a.coord_to_state((col, row)) == col * 10 + row
+            assert a.coord_to_state((col, row)) == row * 12 + col
 
 
 def test_state_coord_identity():
@@ -42,29 +46,30 @@ def test_state_coord_identity():
 
 def test_update_state_movement():
     a = Agent()
+    s = a.coord_to_state
     # attempt to leave the grid from the bottom left corner
-    assert a.update_state(7, 3) == 7
-    assert a.update_state(7, 2) == 7
+    assert a.update_state(s((0, 7)), 3) == s((0, 7))
+    assert a.update_state(s((0, 7)), 2) == s((0, 7))
     # attempt to leave the grid from the top right corner
-    assert a.update_state(110, 0) == 110
-    assert a.update_state(110, 1) == 110
+    assert a.update_state(s((11, 0)), 0) == s((11, 0))
+    assert a.update_state(s((11, 0)), 1) == s((11, 0))
     # test normal movement in the center of the grid
-    assert a.update_state(53, 0) == 52
-    assert a.update_state(53, 1) == 63
-    assert a.update_state(45, 2) == 46
-    assert a.update_state(64, 3) == 54
+    assert a.update_state(s((5, 3)), 0) == s((5, 2))
+    assert a.update_state(s((5, 3)), 1) == s((6, 3))
+    assert a.update_state(s((4, 5)), 2) == s((4, 6))
+    assert a.update_state(s((6, 4)), 3) == s((5, 4))
     # test wall collision
-    assert a.update_state(24, 0) == 24
-    assert a.update_state(26, 1) == 26
-    assert a.update_state(34, 2) == 34
-    assert a.update_state(46, 3) == 46
+    assert a.update_state(s((2, 4)), 0) == s((2, 4))
+    assert a.update_state(s((2, 6)), 1) == s((2, 6))
+    assert a.update_state(s((3, 4)), 2) == s((3, 4))
+    assert a.update_state(s((4, 6)), 3) == s((4, 6))
     # test termination on reaching the goal
     assert a.done is False
-    a.update_state(91, 2)
+    a.update_state(s((9, 1)), 2)
     assert a.done is True
     # test position reset on red portals
     a.done = False
-    a.update_state(72, 1)
+    a.update_state(s((7, 2)), 1)
     # assert a.state_to_coord(a.position) == a.env.coordinates["A"][0]
     assert a.done is True
 
@@ -74,8 +79,8 @@ def test_epsilon_greedy_selection():
     Test greedy selection and random tie breaking
     """
     a = Agent()
-    a.q_values[107] = [0, 1, 0, 1]
-    assert [a.epsilon_greedy(107) for _ in range(10)] == [3, 3, 2, 3, 3, 3, 1, 3, 1, 3]
+    a.q_values[94] = [0, 1, 0, 1]
+    assert [a.epsilon_greedy(94) for _ in range(10)] == [3, 3, 2, 3, 3, 3, 1, 3, 1, 3]
 
 
 def test_planning_step():
@@ -110,7 +115,7 @@ def test_agent_start_step_end(planning_steps=4, epsilon=0.1, gamma=1, step_size=
     # ----------------
     action = a.agent_start(a.start_position)
     assert action == 3
-    assert a.position == 6
+    assert a.position == 72
     assert a.model == {}
     for action_values in list(a.q_values.values()):
         assert np.all(action_values == 0)
@@ -120,15 +125,15 @@ def test_agent_start_step_end(planning_steps=4, epsilon=0.1, gamma=1, step_size=
     # ----------------
     action = a.step(a.position, a.env.get_reward(a.state_to_coord(a.position)))
     assert action == 1
-    assert a.position == 16
+    assert a.position == 73
     action = a.step(a.position, a.env.get_reward(a.state_to_coord(a.position)))
     assert action == 0
-    assert a.position == 15
+    assert a.position == 61
     action = a.step(a.position, a.env.get_reward(a.state_to_coord(a.position)))
     assert action == 2
-    assert a.position == 16
+    assert a.position == 73
 
-    expected_model = {16: {3: (6, 0.0), 0: (15, 0.0)}, 6: {1: (16, 0.0)}}
+    expected_model = {73: {3: (72, 0.0), 0: (61, 0.0)}, 72: {1: (73, 0.0)}}
     assert a.model == expected_model
 
     for action_values in list(a.q_values.values()):
@@ -138,21 +143,94 @@ def test_agent_start_step_end(planning_steps=4, epsilon=0.1, gamma=1, step_size=
     # test agent end
     # ----------------
     # test the final update with a reward
-    a.update_state(102, 3)
+    a.update_state(34, 3)
     a.agent_end()
 
     expected_q_values = np.array([0.0, 0.0, 0.271, 0.0], dtype=np.float32)
-    assert np.all(a.q_values.get(15) == expected_q_values)
+    assert np.all(a.q_values.get(61) == expected_q_values)
 
 
 def test_portal():
     a = Agent()
-    assert a.position == 16
-    a.update_state(107, 0)
-    assert a.position == 110
-    a.update_state(96, 1)
-    assert a.position == 110
-    a.update_state(105, 2)
-    assert a.position == 110
-    a.update_state(116, 3)
-    assert a.position == 110
+    s = a.coord_to_state
+    assert a.position == s((1, 6))
+    a.update_state(s((10, 7)), 0)
+    assert a.position == s((11, 0))
+    a.update_state(s((9, 6)), 1)
+    assert a.position == s((11, 0))
+    a.update_state(s((10, 5)), 2)
+    assert a.position == s((11, 0))
+    a.update_state(s((11, 6)), 3)
+    assert a.position == s((11, 0))
+
+
+def test_q_values_view_shares_q_table():
+    a = Agent()
+    assert list(a.q_values.keys()) == list(range(96))
+    a.q_values[94] = [0, 1, 0, 1]
+    a.q_values[41][2] = 3
+    assert np.all(a.q_table[94] == [0, 1, 0, 1])
+    assert a.q_table[41, 2] == 3
+    a.state_visits[73] += 2
+    assert a.visit_counts[73] == 2
+    with pytest.raises(KeyError):
+        a.q_values[96]
+
+
+def test_state_dict_to_matrix():
+    a = Q_learning_Agent()
+    a.q_values[94] = [0, 1, 0, 2]
+    a.state_visits[41] = 5
+    q_matrix = a.state_dict_to_matrix(a.q_values)
+    assert q_matrix.shape == (8, 12)
+    assert q_matrix.loc["7", "10"] == 2
+    assert q_matrix.values.sum() == 2
+    assert a.state_dict_to_matrix(a.state_visits).loc["3", "5"] == 5
+    assert np.all(a.state_dict_to_matrix({94: [0, 2]}).values == q_matrix.values)
+
+
+def test_batched_planning_step():
+    a = Dyna_Q_Agent(planning_steps=10, batched_planning=True, planning_chunk_size=4)
+    a.update_model(1, 1, -1, 1)
+    a.planning_step()
+    # 10 updates towards the terminal reward, whatever the chunking
+    assert np.isclose(a.q_values[1][1], 1 - 0.9**10)
+
+    a = Dyna_Q_Agent(planning_steps=1, batched_planning=True, gamma=0.5)
+    a.q_values[2] = [0, 2, 0, 0]
+    a.update_model(0, 2, 2, 1)
+    a.planning_step()
+    assert np.isclose(a.q_values[0][2], 0.1 * (1 + 0.5 * 2))
+
+
+def test_dyna_q_plus_tau():
+    a = Dyna_Q_plus_Agent()
+    a.update_tau(16, 1)
+    a.update_tau(16, 2)
+    a.update_tau(15, 0)
+    assert a.get_tau(16, 1) == 2
+    assert a.get_tau(16, 2) == 1
+    assert a.get_tau(15, 0) == 0
+    assert a.tau[53, 3] == 3
+    assert np.all(a.get_tau(np.array([16, 15]), np.array([1, 3])) == [2, 3])
+
+
+def test_prioritized_sweeping_planning():
+    a = Prioritized_Sweeping_Agent(planning_steps=10, gamma=0.9)
+    # chain of states 0 -> 1 -> 2 -> terminal with a reward of 1
+    a.update_model(0, 2, 1, 0)
+    a.update_model(1, 2, 2, 0)
+    a.update_model(2, 2, -1, 1)
+    a.queue_pair(2, 2)
+    assert len(a.queue) == 1
+    a.planning_step()
+    # the reward flows backwards through the predecessors
+    assert a.q_values[2][2] > 0 and a.q_values[1][2] > 0 and a.q_values[0][2] > 0
+    assert a.planning_updates <= 10
+
+
+def test_prioritized_sweeping_fit():
+    a = Prioritized_Sweeping_Agent(planning_steps=5, epsilon=0.2)
+    a.fit(3, log_progress=[2])
+    assert len(a.episodes) == 3
+    assert len(a.model) > 0
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from package.aggregates import AggregateCache, EpisodeAggregate
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.plots import results_name
+from package.results_store import ResultsStore
+
+
+def test_incremental_update_matches_batch_statistics():
+    rng = np.random.default_rng(0)
+    steps = rng.integers(10, 200, size=(7, 5))
+    rewards = rng.integers(0, 2, size=(7, 5)).astype(np.float32)
+    aggregate = EpisodeAggregate(5)
+    for start, stop in [(0, 1), (1, 4), (4, 4), (4, 7)]:
+        aggregate.update(steps[start:stop], rewards[start:stop])
+    frame = aggregate.to_frame()
+    assert aggregate.n_runs == 7 and list(frame["count"]) == [7] * 5
+    assert np.allclose(frame["steps"], steps.mean(axis=0))
+    assert np.allclose(frame["steps_var"], steps.var(axis=0, ddof=1))
+    assert np.allclose(frame["reward_var"], rewards.var(axis=0, ddof=1))
+
+
+def test_cache_merges_appended_runs(tmp_path):
+    cache = AggregateCache(str(tmp_path))
+    store = ResultsStore.create(os.path.join(tmp_path, "Dyna-Q"), "Dyna-Q", n_episode=3)
+    store.append([12, 17, 40], [1, 1, 0], seed=100)
+    aggregate = cache.get("Dyna-Q")
+    assert cache.get("Dyna-Q") is aggregate and aggregate.n_runs == 1
+
+    store.append_runs([[5, 6, 7], [8, 9, 10]], [[0, 0, 1], [1, 0, 1]], seeds=[1, 2])
+    assert cache.get("Dyna-Q") is aggregate and aggregate.n_runs == 3
+    assert np.allclose(aggregate.mean["steps"], [25 / 3, 32 / 3, 19])
+    assert np.allclose(
+        aggregate.variance("reward"),
+        np.var([[1, 1, 0], [0, 0, 1], [1, 0, 1]], axis=0, ddof=1),
+    )
+
+    # a new store at the same path is aggregated from scratch
+    store = ResultsStore.create(os.path.join(tmp_path, "Dyna-Q"), "Dyna-Q", n_episode=3)
+    store.append_runs([[1, 2, 3]] * 4, [[0, 0, 0]] * 4, seeds=[1, 2, 3, 4])
+    aggregate = cache.get("Dyna-Q")
+    assert aggregate.n_runs == 4 and list(aggregate.mean["steps"]) == [1, 2, 3]
+
+
+def test_cache_reads_csv_results(tmp_path):
+    store = ResultsStore.create(os.path.join(tmp_path, "store"), "Q-learning", 2)
+    store.append_runs([[12, 17], [30, 5]], [[1, 1], [0, 1]], seeds=[100, 101])
+    store.to_csv(os.path.join(tmp_path, "Q-learning_results.csv"))
+    cache = AggregateCache(str(tmp_path))
+    frame = cache.get("Q-learning").to_frame()
+    assert list(frame["steps"]) == [21, 11] and list(frame["count"]) == [2, 2]
+    assert list(frame["reward_var"]) == [0.5, 0]
+    with pytest.raises(FileNotFoundError):
+        cache.get("Dyna-Q")
+
+
+def test_results_name_without_instantiation():
+    assert results_name(Dyna_Q_Agent) == "Dyna-Q" == results_name(Dyna_Q_Agent())
+    assert results_name("Dyna-Q_plus") == "Dyna-Q_plus"
@@ -0,0 +1,30 @@
+import numpy as np
+
+from package.argmax import argmax, argmax_batch
+
+
+def test_argmax_matches_choice_draws():
+    values = np.array([0, 2, 4, 4, 1, 4], dtype=np.float32)
+    a, b = np.random.RandomState(0), np.random.RandomState(0)
+    for _ in range(50):
+        assert argmax(values, a.randint) == b.choice(np.flatnonzero(values == 4))
+    # a single maximum does not draw a random number
+    assert argmax([1.0, 3.0, 2.0], None) == 1
+
+
+def test_argmax_tie_breaking_is_uniform():
+    rng = np.random.RandomState(1)
+    counts = np.bincount([argmax([1, 0, 1, 1], rng.randint) for _ in range(3000)])
+    assert counts[1] == 0
+    assert np.allclose(counts[[0, 2, 3]] / 3000, 1 / 3, atol=0.03)
+
+
+def test_argmax_batch():
+    values = np.array([[0, 1, 0, 0], [2, 2, 0, 2], [0, 0, 0, 0]], dtype=np.float32)
+    actions = argmax_batch(values, np.array([0.9, 0.5, 0.99]))
+    assert list(actions) == [1, 1, 3]
+    assert list(argmax_batch(values, np.zeros(3))) == [1, 0, 0]
+    rows = np.repeat(values[1:2], 3000, axis=0)
+    counts = np.bincount(argmax_batch(rows, np.random.default_rng(0).random(3000)))
+    assert counts[2] == 0
+    assert np.allclose(counts[[0, 1, 3]] / 3000, 1 / 3, atol=0.03)
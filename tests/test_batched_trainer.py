@@ -0,0 +1,42 @@
+import numpy as np
+
+from package.batched_trainer import BatchedTrainer
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.q_learning_agent import Q_learning_Agent
+
+
+def test_batched_trainer_results_shape():
+    trainer = BatchedTrainer(Q_learning_Agent, seeds=[0, 1, 2], epsilon=0.2)
+    trainer.fit(5)
+    assert trainer.q_values.shape == (3, trainer.n_states, 4)
+    assert trainer.n_steps.shape == (3, 5)
+    assert np.all(trainer.n_steps > 0)
+    assert np.all(np.isin(trainer.rewards, [0, 1]))
+    results = trainer.results()
+    assert results.index.names == ["Run", "episode"]
+    assert list(results.columns) == ["steps", "reward", "is_optimal"]
+    assert len(results) == 15
+
+
+def test_batched_trainer_seeds_are_independent():
+    for agent_class in [Q_learning_Agent, Dyna_Q_Agent, Dyna_Q_plus_Agent]:
+        parameters = {} if agent_class is Q_learning_Agent else {"planning_steps": 5}
+        alone = BatchedTrainer(agent_class, seeds=[7], **parameters)
+        alone.fit(3)
+        batch = BatchedTrainer(agent_class, seeds=[3, 7, 11], **parameters)
+        batch.fit(3)
+        assert np.all(alone.n_steps[0] == batch.n_steps[1])
+        assert np.all(alone.q_values[0] == batch.q_values[1])
+
+
+def test_batched_trainer_dyna_q_model():
+    trainer = BatchedTrainer(Dyna_Q_Agent, seeds=[0, 1], planning_steps=5)
+    trainer.fit(2)
+    for run in range(2):
+        states = trainer.model_states[run, : trainer.n_model_states[run]]
+        # every state of the model has recorded actions
+        assert np.all(trainer.n_model_actions[run, states] > 0)
+        assert trainer.model_observed[run].sum() == trainer.n_model_actions[run].sum()
+        # terminal transitions are stored with a next state of -1
+        assert (trainer.model_next_state[run] == -1).any()
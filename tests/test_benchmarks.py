@@ -0,0 +1,67 @@
+import os
+
+import package.benchmarks as benchmarks
+from package.benchmarks import (
+    bench_env_steps,
+    bench_logging,
+    bench_planning,
+    bench_q_learning,
+    compare,
+    record,
+)
+
+
+def test_benchmark_records():
+    results = (
+        bench_q_learning((8, 12), 200, repeat=1)
+        + bench_q_learning((20, 30), 200, repeat=1)
+        + bench_logging(2, repeat=1)
+    )
+    assert [result["name"] for result in results] == [
+        "q_learning_transitions_8x12",
+        "q_learning_transitions_pcg64_8x12",
+        "q_learning_transitions_20x30",
+        "q_learning_transitions_pcg64_20x30",
+        "state_dict_to_matrix",
+        "episodes_frame",
+    ]
+    assert all(result["value"] > 0 for result in results)
+    planning = bench_planning((20, 30), [10], n_calls=2, repeat=1)
+    assert planning[0]["name"] == "Dyna-Q_scalar_planning_10_20x30"
+    assert planning[-1]["name"] == "Prioritized_sweeping_planning_10_20x30"
+    assert len(planning) == 5 and planning[-1]["value"] > 0
+    env_results = bench_env_steps((20, 30), 200, repeat=1)
+    assert env_results[-1]["name"] == "vec_env_steps_20x30"
+
+
+def test_missing_baseline_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        benchmarks,
+        "run_benchmarks",
+        lambda quick, repeat: [record("duration", 1.0, "s", False)],
+    )
+    output, baseline = str(tmp_path / "results.json"), str(tmp_path / "baseline.json")
+    arguments = ["--output", output, "--baseline", baseline]
+    assert benchmarks.main(arguments) == 2
+    assert benchmarks.main(arguments + ["--init-baseline"]) == 0
+    assert os.path.isfile(baseline)
+    os.remove(baseline)
+    assert benchmarks.main(arguments + ["--save-baseline"]) == 0
+    assert benchmarks.main(arguments) == 0
+
+
+def test_compare_detects_slowdowns():
+    baseline = [
+        record("throughput", 100.0, "steps/s", True),
+        record("duration", 1.0, "s", False),
+        record("removed", 1.0, "s", False),
+    ]
+    results = [
+        record("throughput", 70.0, "steps/s", True),
+        record("duration", 1.1, "s", False),
+        record("new", 5.0, "s", False),
+    ]
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert [regression["name"] for regression in regressions] == ["throughput"]
+    assert regressions[0]["slowdown"] == 100 / 70
+    assert compare(results, baseline, tolerance=0.5) == []
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from package.checkpoint import load_checkpoint, save_checkpoint
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.env import Env
+from package.prioritized_sweeping_agent import Prioritized_Sweeping_Agent
+from package.q_learning_agent import Q_learning_Agent
+
+# small grid with a late portal, to resume the training after it opens
+LAYOUT = """
+..L..G
+.#.#..
+A..T.O
+"""
+
+AGENTS = [
+    (Q_learning_Agent, {}),
+    (Dyna_Q_Agent, {"planning_steps": 5}),
+    (Dyna_Q_Agent, {"planning_steps": 5, "batched_planning": True}),
+    (Dyna_Q_plus_Agent, {"planning_steps": 5}),
+    (Prioritized_Sweeping_Agent, {"planning_steps": 5}),
+    (Dyna_Q_Agent, {"planning_steps": 5, "sparse": True}),
+    (Prioritized_Sweeping_Agent, {"planning_steps": 5, "sparse": True}),
+]
+
+
+def assert_same_agent(agent, other):
+    assert list(agent.n_steps) == list(other.n_steps)
+    assert list(agent.rewards) == list(other.rewards)
+    assert np.array_equal(np.asarray(agent.q_table), np.asarray(other.q_table))
+    assert np.array_equal(
+        np.asarray(agent.visit_counts), np.asarray(other.visit_counts)
+    )
+    assert agent.env.late_portal_active == other.env.late_portal_active
+    assert agent.metrics.summary() == other.metrics.summary()
+    if hasattr(agent, "model"):
+        assert dict(agent.model) == dict(other.model)
+    if hasattr(agent, "last_tried"):
+        assert agent.time == other.time
+        assert np.array_equal(agent.last_tried, other.last_tried)
+    assert agent.rng.rand() == other.rng.rand()
+
+
+@pytest.mark.parametrize("agent_class, parameters", AGENTS)
+@pytest.mark.parametrize("generator", [np.random.RandomState, np.random.default_rng])
+def test_resume_matches_uninterrupted_fit(tmp_path, agent_class, parameters, generator):
+    agent = agent_class(env=Env(LAYOUT), **parameters)
+    agent.random_generator = generator(3)
+    agent.fit(120, snapshot_every=0)
+
+    path = str(tmp_path / "checkpoint")
+    interrupted = agent_class(env=Env(LAYOUT), **parameters)
+    interrupted.random_generator = generator(3)
+    # interrupted after the checkpoint of episode 90
+    interrupted.fit(95, snapshot_every=0, checkpoint_every=30, checkpoint_path=path)
+    resumed = load_checkpoint(path)
+    assert resumed.metrics.count == 90
+    resumed.fit(30, snapshot_every=0)
+    assert_same_agent(agent, resumed)
+
+
+def test_checkpoint_is_memory_mapped(tmp_path):
+    agent = Dyna_Q_plus_Agent(planning_steps=5, env=Env(LAYOUT))
+    agent.fit(110, snapshot_every=0)
+    path = str(tmp_path / "checkpoint")
+    save_checkpoint(agent, path)
+    resumed = load_checkpoint(path)
+    assert isinstance(resumed.q_table, np.memmap)
+    assert resumed.q_values.table is resumed.q_table
+    assert resumed.env.late_portal_active and resumed.env.has_late_portal
+    # copy-on-write: training does not modify the checkpoint
+    q_table = np.load(os.path.join(path, "agent.q_table.npy"))
+    resumed.fit(5, snapshot_every=0)
+    assert np.array_equal(np.load(os.path.join(path, "agent.q_table.npy")), q_table)
+    assert not np.array_equal(resumed.q_table, q_table)
+    # saving over the checkpoint the agent was loaded from
+    save_checkpoint(resumed, path)
+    assert_same_agent(resumed, load_checkpoint(path, mmap_mode=None))
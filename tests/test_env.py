@@ -13,3 +13,37 @@ def test_env_value_map_null_reward():
         for col in range(cols):
             if (row, col) != env.coordinates.get("G")[0]:
                 assert env.get_reward((row, col), reverse=False) == 0
+
+
+def test_transition_table_shapes():
+    env = Env()
+    for table in (env.next_state, env.reward, env.terminal, env.portal):
+        assert table.shape == (env.n_states, env.n_actions)
+    # one state per cell, in row-major order
+    assert env.n_states == 96
+    assert env.coord_to_state((11, 0)) == 11
+    assert env.state_to_coord(13) == (1, 1)
+
+
+def test_transition_table_dynamics():
+    env = Env()
+    s = env.coord_to_state
+    # walls and edges leave the agent in place
+    assert env.next_state[s((2, 4)), 0] == s((2, 4))
+    assert env.next_state[s((0, 7)), 3] == s((0, 7))
+    # portals redirect to the top right corner
+    assert env.next_state[s((9, 6)), 1] == s((11, 0))
+    assert env.portal[s((9, 6)), 1]
+    # traps and goal end the episode
+    assert env.terminal[s((7, 2)), 1] and env.reward[s((7, 2)), 1] == 0
+    assert env.terminal[s((9, 1)), 2] and env.reward[s((9, 1)), 2] == 1
+    assert not env.terminal[s((5, 5)), 0]
+
+
+def test_late_portal_rebuilds_table():
+    env = Env()
+    s = env.coord_to_state
+    assert env.next_state[s((1, 1)), 2] == s((1, 2))
+    env.activate_late_portal()
+    assert env.next_state[s((1, 1)), 2] == s((11, 0))
+    assert env.portal[s((1, 1)), 2]
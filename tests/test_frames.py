@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+
+from package.frames import level_ticks, quantize, select_frames
+from package.gif import GifWriter
+from package.plots import animated_heatmap, export_animated_heatmap
+from package.snapshots import ValueSnapshots
+
+
+def lzw_decode(data: bytes, min_code_size: int = 8) -> list:
+    clear, end = 1 << min_code_size, (1 << min_code_size) + 1
+    bits = int.from_bytes(data, "little")
+    position, code_size, table, previous, pixels = 0, min_code_size + 1, None, None, []
+    while True:
+        code = (bits >> position) & ((1 << code_size) - 1)
+        position += code_size
+        if code == clear:
+            table = [[i] for i in range(clear)] + [None, None]
+            code_size, previous = min_code_size + 1, None
+            continue
+        if code == end:
+            return pixels
+        if code < len(table):
+            entry = table[code]
+            if previous is not None:
+                table.append(previous + entry[:1])
+        else:
+            entry = previous + previous[:1]
+            table.append(entry)
+        pixels.extend(entry)
+        previous = entry
+        if len(table) == 1 << code_size and code_size < 12:
+            code_size += 1
+
+
+def read_gif_frames(path: str, shape: tuple) -> list:
+    """
+    Minimal GIF reader for the files of GifWriter (global palette, no local tables)
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    assert data[:6] == b"GIF89a" and data[-1:] == b"\x3b"
+    position = 13 + 768 + 19
+    canvas, frames = np.zeros(shape, dtype=np.uint8), []
+    while data[position] != 0x3B:
+        assert data[position : position + 2] == b"\x21\xf9"
+        position += 8
+        left, top, width, height = np.frombuffer(
+            data[position + 1 : position + 9], dtype="<u2"
+        )
+        position += 11
+        blocks = b""
+        while data[position]:
+            blocks += data[position + 1 : position + 1 + data[position]]
+            position += 1 + data[position]
+        position += 1
+        pixels = np.array(lzw_decode(blocks), dtype=np.uint8)
+        canvas[top : top + height, left : left + width] = pixels.reshape(height, width)
+        frames.append(canvas.copy())
+    return frames
+
+
+def test_select_frames():
+    values = np.zeros((10, 2, 2))
+    values[4:] = 1
+    values[7:] = 1.05
+    assert list(select_frames(values)) == list(range(10))
+    assert list(select_frames(values, every=4)) == [0, 4, 8, 9]
+    assert list(select_frames(values, min_change=0.5)) == [0, 4, 9]
+    assert list(select_frames(values, max_frames=4)) == [0, 3, 6, 9]
+    assert len(select_frames(values[:0])) == 0
+
+
+def test_quantize():
+    levels = quantize(np.array([-1.0, 0.0, 0.5, 1.0, 2.0]), 0, 1)
+    assert levels.dtype == np.uint8 and list(levels) == [0, 0, 128, 255, 255]
+    assert level_ticks(0, 1, 3)["ticktext"] == ["0", "0.5", "1"]
+
+
+def test_gif_writer_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    first = rng.integers(0, 256, size=(30, 40), dtype=np.uint8)
+    second = first.copy()
+    second[5:9, 10:12] = 3
+    frames = [first, second, second, rng.integers(0, 3, size=(30, 40), dtype=np.uint8)]
+    path = str(tmp_path / "frames.gif")
+    with GifWriter(path, (30, 40), np.zeros((256, 3)), delay=5) as writer:
+        for frame in frames:
+            writer.write(frame)
+    decoded = read_gif_frames(path, (30, 40))
+    assert len(decoded) == 4
+    assert all(np.array_equal(frame, other) for frame, other in zip(frames, decoded))
+
+
+def test_animated_heatmap_exports(tmp_path):
+    snapshots = ValueSnapshots((3, 4), capacity=50)
+    for episode in range(50):
+        snapshots.record(episode, np.full((3, 4), episode / 50))
+    fig = animated_heatmap(snapshots, "Dyna-Q", max_frames=10, show=False)
+    assert len(fig.frames) == 10
+    assert fig.frames[-1].layout.title.text == "Dyna-Q: State values for episode: 49"
+
+    path = str(tmp_path / "values.json")
+    assert export_animated_heatmap(snapshots, path, "Dyna-Q", every=5) == 11
+    with open(path) as file:
+        figure = json.load(file)
+    assert len(figure["frames"]) == 11
+    assert figure["frames"][-1]["data"][0]["z"] == [[255] * 4] * 3
+    assert figure["data"][0]["colorbar"]["ticktext"][-1] == "0.98"
+
+    path = str(tmp_path / "values.gif")
+    assert export_animated_heatmap(snapshots, path, cell_size=2, every=7) == 8
+    frames = read_gif_frames(path, (6, 8))
+    assert len(frames) == 8 and np.all(frames[-1] == 255) and np.all(frames[0] == 0)
@@ -0,0 +1,13 @@
+import json
+import os
+
+from package.json_files import write_json
+
+
+def test_write_json_replaces_the_file(tmp_path):
+    path = str(tmp_path / "metadata.json")
+    write_json(path, {"n_runs": 1})
+    write_json(path, {"n_runs": 2})
+    with open(path) as file:
+        assert json.load(file) == {"n_runs": 2}
+    assert os.listdir(tmp_path) == ["metadata.json"]
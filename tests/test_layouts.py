@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from package.env import Env
+from package.layouts import (
+    DEFAULT_LAYOUT,
+    GOAL,
+    PORTAL_EXIT,
+    START,
+    TRAP,
+    WALL,
+    layout_to_text,
+    maze_layout,
+    parse_layout,
+    rooms_layout,
+)
+from package.q_learning_agent import Q_learning_Agent
+
+
+def reachable(env: Env, ends: list = (TRAP, GOAL)) -> np.ndarray:
+    """
+    States reachable from the start, without going through the cells of ends
+    """
+    ends = np.isin(env.cells.ravel(), ends)
+    seen = np.zeros(env.n_states, dtype=bool)
+    frontier = np.array([env.start_state])
+    seen[frontier] = True
+    while len(frontier):
+        next_states = np.unique(env.next_state[frontier])
+        next_states = next_states[~seen[next_states]]
+        seen[next_states] = True
+        frontier = next_states[~ends[next_states]]
+    return seen
+
+
+def test_parse_layout():
+    cells = parse_layout("A.#\n.TG")
+    assert cells.tolist() == [[START, 0, WALL], [0, TRAP, GOAL]]
+    assert layout_to_text(parse_layout(DEFAULT_LAYOUT)) == DEFAULT_LAYOUT.strip()
+    with pytest.raises(ValueError):
+        parse_layout("A.\n.")
+    with pytest.raises(ValueError):
+        parse_layout("A.x")
+
+
+def test_env_from_text_layout():
+    env = Env("A.P\n#.G\nO..")
+    s = env.coord_to_state
+    assert (env.n_rows, env.n_cols, env.n_states) == (3, 3, 9)
+    assert env.start_state == 0
+    assert env.next_state[s((1, 0)), 1] == s((0, 2))
+    assert env.portal[s((1, 0)), 1]
+    assert env.next_state[s((0, 0)), 2] == s((0, 0))
+    assert env.terminal[s((1, 1)), 1] and env.reward[s((1, 1)), 1] == 1
+    assert not env.has_late_portal
+    with pytest.raises(ValueError):
+        Env("..P\n.AG")
+    with pytest.raises(ValueError):
+        Env("..L\n.AG")
+
+
+def test_agent_on_custom_layout():
+    env = Env("A...\n.##.\n...G")
+    a = Q_learning_Agent(env=env)
+    a.fit(5)
+    assert a.q_table.shape == (12, 4)
+    assert a.value_estimates[0].shape == (3, 4)
+    assert (a.rewards == 1).all()
+
+
+@pytest.mark.parametrize("generator", [maze_layout, rooms_layout])
+def test_generated_layouts_are_connected(generator):
+    cells = generator(41, 63, seed=3, n_portals=2, late_portal=True)
+    assert cells.shape == (41, 63)
+    assert (cells == START).sum() == 1 and (cells == GOAL).sum() == 1
+    assert (cells == PORTAL_EXIT).sum() == 1
+    # without portals and traps, every free cell is connected to the start
+    cells = generator(41, 63, seed=3)
+    assert reachable(Env(cells), ends=[])[cells.ravel() != WALL].all()
+    assert reachable(Env(cells))[cells.ravel() == GOAL].all()
+
+
+@pytest.mark.parametrize("generator", [maze_layout, rooms_layout])
+@pytest.mark.parametrize("n_portals", [0, 2])
+def test_generated_late_portal_has_an_exit(generator, n_portals):
+    env = Env(generator(21, 21, seed=17, n_portals=n_portals, late_portal=True))
+    assert (env.cells == PORTAL_EXIT).sum() == 1
+    env.activate_late_portal()
+    assert env.next_state.min() >= 0
+
+
+def test_large_grid():
+    env = Env(maze_layout(500, 500, seed=0, n_traps=100))
+    assert env.next_state.shape == (250_000, 4)
+    assert env.state_array_to_grid(np.arange(env.n_states))[2, 3] == 1003
@@ -0,0 +1,93 @@
+import asyncio
+import functools
+
+import numpy as np
+
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.live_metrics import (
+    AsyncioQueueSink,
+    MetricsFeed,
+    UpdateBuffer,
+    follow_feeds,
+)
+from package.q_learning_agent import Q_learning_Agent
+from package.runner import run_experiments
+
+
+def test_update_buffer_drops_or_coalesces():
+    buffer = UpdateBuffer(maxlen=2)
+    for episode in range(5):
+        buffer.offer({"run": "a", "episode": episode})
+    assert [update["episode"] for update in buffer.drain()] == [3, 4]
+    assert buffer.dropped == 3
+
+    buffer = UpdateBuffer(maxlen=2, coalesce=True)
+    buffer.offer(
+        {"run": "a", "episode": 1, "values": {"cells": [0, 1], "values": [1, 1]}}
+    )
+    buffer.offer({"run": "a", "episode": 2, "values": {"cells": [1], "values": [2]}})
+    buffer.offer({"run": "a", "episode": 3})
+    buffer.close()
+    first, last = list(buffer)
+    assert first["episode"] == 2 and first["coalesced"] == 2
+    assert first["values"] == {"cells": [0, 1], "values": [1, 2]}
+    assert last["episode"] == 3 and buffer.dropped == 0
+
+
+def test_fit_publishes_episodes_and_value_deltas():
+    buffer = UpdateBuffer()
+    agent = Dyna_Q_Agent(planning_steps=5)
+    agent.fit(6, feed=MetricsFeed([buffer], value_every=2, run="dyna"))
+    updates = buffer.drain()
+    assert [update["episode"] for update in updates] == [1, 2, 3, 4, 5, 6]
+    assert [update["steps"] for update in updates] == list(agent.n_steps)
+    assert updates[-1]["success_rate"] == agent.metrics.success_rate
+    # applying the deltas in order rebuilds the value map
+    values = np.zeros(agent.env.n_states, dtype=np.float32)
+    for update in updates:
+        if "values" in update:
+            values[update["values"]["cells"]] = update["values"]["values"]
+    assert np.array_equal(values, agent.q_table.max(axis=1))
+    assert sum("values" in update for update in updates) == 3
+
+    reference = Dyna_Q_Agent(planning_steps=5)
+    reference.fit(6)
+    assert np.array_equal(reference.q_table, agent.q_table)
+
+
+def test_slow_consumers_do_not_stall_training():
+    buffer = UpdateBuffer(maxlen=4)
+    Q_learning_Agent().fit(20, feed=MetricsFeed([buffer]))
+    assert len(buffer.drain()) == 4 and buffer.dropped == 16
+
+
+def test_asyncio_queue_sink():
+    async def follow():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=3)
+        feed = MetricsFeed([AsyncioQueueSink(queue, loop)])
+        fit = functools.partial(Q_learning_Agent().fit, 10, feed=feed)
+        await loop.run_in_executor(None, fit)
+        # lets the updates scheduled by the training thread reach the queue
+        await asyncio.sleep(0)
+        return [queue.get_nowait()["episode"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(follow()) == [8, 9, 10]
+
+
+def test_follow_feeds_of_parallel_runs(tmp_path):
+    feed_dir = str(tmp_path / "live")
+    results = list(
+        run_experiments(
+            {Q_learning_Agent: {}},
+            [100, 101],
+            n_episode=4,
+            max_workers=2,
+            progress=False,
+            feed_dir=feed_dir,
+        )
+    )
+    updates = list(follow_feeds(feed_dir, poll_interval=0.01, idle_timeout=0.05))
+    assert len(results) == 2 and len(updates) == 8
+    runs = {update["run"] for update in updates}
+    assert runs == {"Q-learning_100", "Q-learning_101"}
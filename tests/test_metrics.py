@@ -0,0 +1,39 @@
+import numpy as np
+
+from package.metrics import EpisodeMetrics, episodes_frame
+from package.q_learning_agent import Q_learning_Agent
+
+
+def test_episodes_frame_colors():
+    episodes = episodes_frame([12, 17, 13, 18, 5, 200], [1, 1, 1, 1, 0, 0])
+    assert list(episodes["is_optimal"]) == [
+        "#00CC96",
+        "#EF553B",
+        "#EF553B",
+        "#636EFA",
+        "#636EFA",
+        "#636EFA",
+    ]
+
+
+def test_episode_metrics_aggregates():
+    metrics = EpisodeMetrics(capacity=2, window=3)
+    for steps, reward in [(12, 1), (15, 1), (40, 0), (11, 1), (20, 1)]:
+        metrics.record(steps, reward)
+    assert metrics.count == 5 and len(metrics.steps_buffer) >= 5
+    assert list(metrics.steps) == [12, 15, 40, 11, 20]
+    assert list(metrics.classes) == [2, 1, 0, 2, 0]
+    assert metrics.success_rate == 0.8
+    assert metrics.optimal_rate == 0.4
+    assert metrics.rolling_mean_steps == np.mean([40, 11, 20])
+    assert np.isclose(metrics.rolling_mean_reward, 2 / 3)
+    frame = metrics.to_frame(last=2)
+    assert list(frame.index) == [3, 4]
+    assert list(frame["steps"]) == [11, 20]
+
+
+def test_agent_records_metrics():
+    a = Q_learning_Agent()
+    a.fit(3)
+    assert len(a.n_steps) == len(a.rewards) == 3
+    assert list(a.episodes["steps"]) == list(a.n_steps)
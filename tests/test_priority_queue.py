@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from package.priority_queue import IndexedPriorityQueue
+from package.sparse import SlotIndex
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_priority_queue_pops_in_order(sparse):
+    queue = IndexedPriorityQueue(100, SlotIndex(100, capacity=4) if sparse else None)
+    priorities = np.random.RandomState(0).rand(100)
+    for item, priority in enumerate(priorities):
+        queue.push(item, priority)
+    popped = [queue.pop() for _ in range(100)]
+    assert [priority for _, priority in popped] == sorted(priorities, reverse=True)
+    assert len(queue) == 0
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_priority_queue_change_key(sparse):
+    queue = IndexedPriorityQueue(10, SlotIndex(5, capacity=1) if sparse else None, 2)
+    for item in range(5):
+        queue.push(item, item)
+    # increase and decrease keys
+    queue.push(1, 10)
+    queue.push(4, 0.5)
+    assert queue.get(4) == 0.5
+    assert queue.get(7) is None
+    assert 4 in queue and 7 not in queue
+    queue.remove(3)
+    assert [queue.pop()[0] for _ in range(len(queue))] == [1, 2, 4, 0]
@@ -0,0 +1,37 @@
+import json
+
+from package import Dyna_Q_Agent, Q_learning_Agent
+from package.profiling import PhaseProfiler
+
+
+def test_profiled_fit_report(tmp_path):
+    a = Dyna_Q_Agent(planning_steps=5)
+    a.fit(3, snapshot_every=0, profile=True)
+    report = a.profiler.report()
+    counters = report["counters"]
+    assert counters["episodes"] == 3
+    assert counters["steps"] == a.n_steps.sum()
+    assert counters["planning_updates"] == a.planning_updates
+    phases = report["phases"]
+    assert phases["update_state"]["calls"] == a.n_steps.sum()
+    assert phases["planning_step"]["calls"] == a.planning_updates // 5
+    assert json.loads(a.profiler.to_json(tmp_path / "profile.json")) == json.loads(
+        (tmp_path / "profile.json").read_text()
+    )
+
+
+def test_profiler_detaches():
+    a = Q_learning_Agent()
+    with PhaseProfiler(a) as profiler:
+        a.fit(2, snapshot_every=0)
+    assert "epsilon_greedy" not in vars(a)
+    assert "planning_step" not in profiler.phases
+    assert profiler.report()["phases"]["epsilon_greedy"]["calls"] > 0
+
+
+def test_profiling_keeps_results():
+    a, b = Q_learning_Agent(), Q_learning_Agent()
+    a.fit(5, snapshot_every=0)
+    b.fit(5, snapshot_every=0, profile=True)
+    assert list(a.n_steps) == list(b.n_steps)
+    assert (a.q_table == b.q_table).all()
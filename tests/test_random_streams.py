@@ -0,0 +1,47 @@
+import pickle
+
+import numpy as np
+
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.random_streams import RandomStreams
+
+
+def test_compatibility_mode_matches_random_state():
+    rng, reference = RandomStreams(np.random.RandomState(3)), np.random.RandomState(3)
+    values = [0, 4, 7]
+    for _ in range(20):
+        assert rng.rand() == reference.rand()
+        assert values[rng.randint(len(values))] == reference.choice(values)
+    assert rng.block_size == 0
+
+
+def test_block_mode():
+    rng = RandomStreams(np.random.default_rng(3), block_size=16)
+    reference = np.random.default_rng(3).random(64)
+    assert [rng.rand() for _ in range(20)] == list(reference[:20])
+    integers = [rng.randint(5) for _ in range(10)]
+    assert integers == list((reference[20:30] * 5).astype(int))
+    highs = np.array([1, 2, 3, 4, 5, 6, 7, 8])
+    batch = rng.randint(highs)
+    assert (batch >= 0).all() and (batch < highs).all()
+    assert len(rng.randint(10, size=40)) == 40
+
+
+def test_block_mode_pickle_continues_sequence():
+    rng = RandomStreams(np.random.default_rng(5), block_size=8)
+    for _ in range(5):
+        rng.rand()
+    copy = pickle.loads(pickle.dumps(rng))
+    assert [copy.rand() for _ in range(20)] == [rng.rand() for _ in range(20)]
+
+
+def test_agent_with_generator_is_reproducible():
+    runs = []
+    for _ in range(2):
+        a = Dyna_Q_Agent(planning_steps=5)
+        a.random_generator = np.random.default_rng(11)
+        assert a.rng.block_size > 0
+        a.fit(3, snapshot_every=0)
+        runs.append((list(a.n_steps), a.q_table.copy()))
+    assert runs[0][0] == runs[1][0]
+    assert (runs[0][1] == runs[1][1]).all()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from package.checkpoint import load_checkpoint, save_checkpoint
+from package.q_learning_agent import Q_learning_Agent
+from package.random_streams import RandomStreams
+from package.replay_buffer import ReplayBuffer
+
+
+def test_replay_buffer_keeps_the_last_transitions():
+    replay = ReplayBuffer(capacity=4)
+    for state in range(6):
+        replay.add(state, 1, 0.5, state + 1, state == 5)
+    assert len(replay) == 4 and replay.nbytes == 4 * 17
+    assert sorted(replay.buffer["state"]) == [2, 3, 4, 5]
+    assert replay.buffer.dtype["state"] == np.int32
+    batch = replay.sample(RandomStreams(np.random.default_rng(0)), 100)
+    assert set(batch["state"]) <= {2, 3, 4, 5}
+    assert np.all(batch["done"] == (batch["state"] == 5))
+
+
+def test_recency_weighted_sampling():
+    uniform, recent = ReplayBuffer(1000), ReplayBuffer(1000, half_life=50)
+    for state in range(1000):
+        uniform.add(state, 0, 0, state, False)
+        recent.add(state, 0, 0, state, False)
+    ages = recent.ages(np.random.default_rng(0).random(20000))
+    assert ages.min() >= 0 and ages.max() < 1000
+    # half of the samples are among the half_life most recent transitions
+    assert abs(np.mean(ages < 50) - 0.5) < 0.02
+    # uniform sampling maps evenly spaced uniforms to every age once
+    ages = uniform.ages(np.arange(1000) / 1000)
+    assert np.array_equal(np.sort(ages), np.arange(1000))
+
+
+def test_q_learning_with_replay():
+    agent = Q_learning_Agent(replay_capacity=256, replay_batch_size=8)
+    agent.fit(10)
+    assert len(agent.replay_buffer) == min(256, agent.n_steps.sum())
+    assert agent.memory_usage()["replay_buffer"] == agent.replay_buffer.nbytes
+    # the last transition of the last episode is terminal
+    last = agent.replay_buffer.buffer[agent.replay_buffer.next_slot - 1]
+    assert last["done"]
+    assert Q_learning_Agent().replay_buffer is None
+
+
+def test_replay_buffer_checkpoint(tmp_path):
+    agent = Q_learning_Agent(replay_capacity=64, replay_half_life=10)
+    agent.fit(3)
+    save_checkpoint(agent, str(tmp_path / "checkpoint"))
+    loaded = load_checkpoint(str(tmp_path / "checkpoint"))
+    assert np.array_equal(loaded.replay_buffer.buffer, agent.replay_buffer.buffer)
+    agent.fit(2)
+    loaded.fit(2)
+    assert np.array_equal(loaded.q_table, agent.q_table)
+    assert np.shares_memory(loaded.replay_buffer.states, loaded.replay_buffer.buffer)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from package.results_store import ResultsStore
+
+
+def test_results_store_append_and_load(tmp_path):
+    path = tmp_path / "Dyna-Q"
+    store = ResultsStore.create(path, "Dyna-Q", n_episode=3, parameters={"gamma": 0.9})
+    assert store.n_runs == 0 and store.steps.shape == (0, 3)
+    store.append([12, 17, 40], [1, 1, 0], seed=100)
+    store.append_runs([[5, 6, 7], [8, 9, 10]], [[0, 0, 1], [1, 0, 1]], seeds=[101, 102])
+
+    loaded = ResultsStore(path)
+    assert loaded.name == "Dyna-Q"
+    assert loaded.metadata["parameters"] == {"gamma": 0.9}
+    assert loaded.seeds == [100, 101, 102]
+    assert loaded.steps.dtype == np.int32 and loaded.rewards.dtype == np.float32
+    assert np.all(loaded.steps == [[12, 17, 40], [5, 6, 7], [8, 9, 10]])
+    assert np.all(loaded.rewards[0] == [1, 1, 0])
+
+    with pytest.raises(ValueError):
+        loaded.append([1, 2], [0, 0], seed=103)
+
+
+def test_results_store_csv_export(tmp_path):
+    store = ResultsStore.create(tmp_path / "Q-learning", "Q-learning", n_episode=2)
+    store.append([12, 17], [1, 1], seed=100)
+    store.append([30, 5], [0, 1], seed=101)
+    store.to_csv(tmp_path / "Q-learning_results.csv")
+
+    results = pd.read_csv(
+        tmp_path / "Q-learning_results.csv", index_col=["Run", "episode"]
+    )
+    assert list(results.columns) == ["steps", "reward", "is_optimal"]
+    assert list(results["steps"]) == [12, 17, 30, 5]
+    assert list(results["is_optimal"]) == ["#00CC96", "#EF553B", "#636EFA", "#00CC96"]
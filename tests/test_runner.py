@@ -0,0 +1,29 @@
+import numpy as np
+
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.q_learning_agent import Q_learning_Agent
+from package.runner import run_experiments
+
+
+def test_run_experiments_matches_serial_runs():
+    agents_parameters = {
+        Q_learning_Agent: {"epsilon": 0.2},
+        Dyna_Q_Agent: {"planning_steps": 5},
+    }
+    seeds = [100, 101]
+    results = {
+        (agent_class, run): episodes
+        for agent_class, run, episodes in run_experiments(
+            agents_parameters, seeds, n_episode=3, max_workers=2, progress=False
+        )
+    }
+    assert len(results) == 4
+    for agent_class, agent_parameters in agents_parameters.items():
+        for run, seed in enumerate(seeds):
+            agent = agent_class(**agent_parameters)
+            agent.random_generator = np.random.RandomState(seed=seed)
+            agent.fit(n_episode=3, log_progress=[2])
+            episodes = results[(agent_class, run)]
+            assert list(episodes["steps"]) == list(agent.episodes["steps"])
+            assert list(episodes["reward"]) == list(agent.episodes["reward"])
+            assert list(episodes["is_optimal"]) == list(agent.episodes["is_optimal"])
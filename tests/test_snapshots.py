@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from package.q_learning_agent import Q_learning_Agent
+from package.snapshots import ValueSnapshots
+
+
+def test_value_snapshots_every_k():
+    snapshots = ValueSnapshots.for_fit((2, 3), n_episode=10, every=3)
+    for episode in range(10):
+        if snapshots.should_record(episode):
+            snapshots.record(episode, np.full((2, 3), episode))
+    assert list(snapshots.episodes) == [0, 3, 6, 9]
+    assert snapshots.values.shape == (4, 2, 3)
+    assert np.all(snapshots[6] == 6)
+
+
+def test_value_snapshots_ring_buffer():
+    snapshots = ValueSnapshots.for_fit((2, 3), n_episode=10, max_snapshots=3)
+    for episode in range(10):
+        snapshots.record(episode, np.full((2, 3), episode))
+    assert list(snapshots) == [7, 8, 9]
+    assert np.all(snapshots.values[:, 0, 0] == [7, 8, 9])
+    with pytest.raises(ValueError):
+        ValueSnapshots.for_fit((2, 3), n_episode=10, max_snapshots=0)
+
+
+def test_value_snapshots_memory_mapped(tmp_path):
+    path = tmp_path / "snapshots.npy"
+    snapshots = ValueSnapshots.for_fit((2, 3), n_episode=4, path=path)
+    for episode in range(4):
+        snapshots.record(episode, np.full((2, 3), episode))
+    snapshots.flush()
+    assert np.all(np.load(path)[:, 1, 2] == [0, 1, 2, 3])
+
+
+def test_fit_snapshots():
+    a = Q_learning_Agent()
+    a.fit(3, snapshot_every=2)
+    assert list(a.value_estimates) == [0, 2]
+    assert a.value_estimates.values.shape == (2, 8, 12)
+    # the last snapshot is taken after the last episode
+    assert np.all(a.value_estimates[2] == a.state_dict_to_matrix(a.q_values).values)
+
+    a = Q_learning_Agent()
+    a.fit(3, snapshot_every=0)
+    assert len(a.value_estimates) == 0
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.dyna_q_plus_agent import Dyna_Q_plus_Agent
+from package.env import Env
+from package.layouts import rooms_layout
+from package.prioritized_sweeping_agent import Prioritized_Sweeping_Agent
+from package.q_learning_agent import Q_learning_Agent
+from package.sparse import SlotIndex, SparseTable
+
+
+def test_sparse_table_indexing():
+    index = SlotIndex(n_states=100, capacity=2)
+    q = SparseTable(index, (4,), np.float32)
+    visits = SparseTable(index, (), np.int64)
+    assert q[5, 2] == 0 and index.count == 0
+    assert np.all(q[7] == 0) and visits[7] == 0
+    q[5, 2] = 1.5
+    visits[9] += 1
+    visits[9] += 1
+    q[np.array([3, 5, 8])] = np.array([[1, 0, 0, 0], [0, 0, 2, 0], [0, 0, 0, 3]])
+    assert index.count == 4 and index.capacity == 4
+    assert list(index.states[: index.count]) == [5, 9, 3, 8]
+    assert visits[9] == 2 and q[5, 2] == 2
+    assert list(q[np.array([3, 4, 8]), np.array([0, 0, 3])]) == [1, 0, 3]
+    assert q.max(axis=1)[[3, 4, 5, 8]].tolist() == [1, 0, 2, 3]
+    dense = np.asarray(q)
+    assert dense.shape == (100, 4) and dense.sum() == 6
+    with pytest.raises(ValueError):
+        q[1][0] = 1
+
+
+@pytest.mark.parametrize(
+    "agent_class",
+    [Q_learning_Agent, Dyna_Q_Agent, Dyna_Q_plus_Agent, Prioritized_Sweeping_Agent],
+)
+def test_sparse_agent_matches_dense(agent_class):
+    parameters = {} if agent_class is Q_learning_Agent else {"planning_steps": 5}
+    dense, sparse = agent_class(**parameters), agent_class(sparse=True, **parameters)
+    dense.fit(5)
+    sparse.fit(5)
+    assert list(dense.n_steps) == list(sparse.n_steps)
+    assert np.all(dense.q_table == np.asarray(sparse.q_table))
+    assert np.all(dense.visit_counts == np.asarray(sparse.visit_counts))
+    assert dict(dense.model if hasattr(dense, "model") else {}) == dict(
+        sparse.model if hasattr(sparse, "model") else {}
+    )
+    assert dense.state_dict_to_matrix(dense.q_values).equals(
+        sparse.state_dict_to_matrix(sparse.q_values)
+    )
+
+
+def test_sparse_memory_usage():
+    env = Env(rooms_layout(1000, 1000, seed=0))
+    dense = Dyna_Q_Agent(planning_steps=5, env=env)
+    sparse = Dyna_Q_Agent(planning_steps=5, env=env, sparse=True)
+    for agent in [dense, sparse]:
+        agent.random_generator = np.random.default_rng(0)
+        agent.agent_start(agent.start_position)
+        for _ in range(500):
+            agent.step(agent.position, 0)
+    dense_usage, sparse_usage = dense.memory_usage(), sparse.memory_usage()
+    assert dense_usage["env"] == sparse_usage["env"]
+    assert sparse_usage["q_table"] * 100 < dense_usage["q_table"]
+    assert sparse_usage["model"] * 10 < dense_usage["model"]
+
+
+def test_sparse_priority_queue_memory_usage():
+    env = Env(rooms_layout(1000, 1000, seed=0))
+    dense = Prioritized_Sweeping_Agent(planning_steps=5, env=env)
+    sparse = Prioritized_Sweeping_Agent(planning_steps=5, env=env, sparse=True)
+    for agent in [dense, sparse]:
+        agent.random_generator = np.random.default_rng(0)
+        agent.agent_start(agent.start_position)
+        for _ in range(500):
+            agent.step(agent.position, 1)
+    assert dense.queue.heap == sparse.queue.heap
+    dense_usage, sparse_usage = dense.memory_usage(), sparse.memory_usage()
+    assert sparse_usage["queue"] * 100 < dense_usage["queue"]
+    sparse_tables = sparse_usage["total"] - sparse_usage["env"]
+    assert sparse_tables * 20 < dense_usage["total"] - dense_usage["env"]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from package.checkpoint import load_checkpoint
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.env import Env
+from package.q_learning_agent import Q_learning_Agent
+from package.sweep import (
+    best_parameters,
+    rung_sizes,
+    sample_configurations,
+    successive_halving,
+    train_trial,
+)
+
+
+def test_sample_configurations():
+    search_space = {"step_size": (0.1, 0.5), "planning_steps": (1, 10), "gamma": [0.9]}
+    configurations = sample_configurations(search_space, n_configs=20, seed=0)
+    assert configurations == sample_configurations(search_space, n_configs=20, seed=0)
+    assert all(0.1 <= config["step_size"] <= 0.5 for config in configurations)
+    assert all(type(config["planning_steps"]) is int for config in configurations)
+    assert {config["gamma"] for config in configurations} == {0.9}
+    grid = sample_configurations({"epsilon": [0.1, 0.2], "gamma": [0.9, 1]})
+    assert grid[1] == {"epsilon": 0.1, "gamma": 1} and len(grid) == 4
+    with pytest.raises(ValueError):
+        sample_configurations(search_space)
+
+
+def test_rung_sizes():
+    assert rung_sizes(16, 2) == [16, 8, 4, 2]
+    assert rung_sizes(10, 3) == [10, 3]
+    assert rung_sizes(3, 2) == [3]
+
+
+def test_resumed_trial_matches_single_fit(tmp_path):
+    resumed, reference = str(tmp_path / "resumed"), str(tmp_path / "reference")
+    first_steps, _ = train_trial(Q_learning_Agent, {}, 100, 60, resumed)
+    n_steps, rewards = train_trial(Q_learning_Agent, {}, 100, 60, resumed, True)
+    reference_steps, _ = train_trial(Q_learning_Agent, {}, 100, 120, reference)
+    assert n_steps.dtype == np.int32 and rewards.dtype == np.float32
+    assert list(n_steps[:60]) == list(first_steps)
+    assert list(n_steps) == list(reference_steps)
+    agent, reference_agent = load_checkpoint(resumed), load_checkpoint(reference)
+    assert reference_agent.env.late_portal_active and agent.env.late_portal_active
+    assert np.all(agent.q_table == reference_agent.q_table)
+
+
+def test_successive_halving():
+    search_space = {"step_size": [0.05, 0.1, 0.25, 0.5], "planning_steps": [1, 5]}
+    sweep = {
+        "agent_class": Dyna_Q_Agent,
+        "search_space": search_space,
+        "budget": 120,
+        "n_configs": None,
+        "seeds": [100, 101],
+        "progress": False,
+    }
+    results = successive_halving(max_workers=2, **sweep)
+    assert results.equals(successive_halving(max_workers=1, **sweep))
+    assert list(results.groupby("rung").size()) == [8, 4, 2]
+    assert list(results.groupby("rung")["promoted"].sum()) == [4, 2, 1]
+    # each rung spends 120 // 3 episodes: 2, 2 + 5 and 2 + 5 + 10 per trial
+    assert list(results.groupby("rung")["episodes"].max()) == [2, 7, 17]
+    assert results.attrs["played"] <= 120
+    for rung, scores in results.groupby("rung"):
+        kept = scores[scores["promoted"]]
+        assert kept["score"].max() <= scores[~scores["promoted"]]["score"].min()
+    best = best_parameters(results)
+    assert best in sample_configurations(search_space)
+    with pytest.raises(ValueError):
+        successive_halving(Dyna_Q_Agent, search_space, budget=10, n_configs=None)
+
+
+def test_successive_halving_copies_the_env():
+    # small grid with a late portal, opened during the 120 episodes of each trial
+    env = Env("..L..G\n.#.#..\nA..T.O")
+    sweep = {
+        "agent_class": Q_learning_Agent,
+        "search_space": {"step_size": [0.1, 0.5], "epsilon": [0.1, 0.2]},
+        "budget": 960,
+        "n_configs": None,
+        "parameters": {"env": env},
+        "progress": False,
+    }
+    results = successive_halving(max_workers=1, **sweep)
+    assert results.equals(successive_halving(max_workers=2, **sweep))
+    assert not env.late_portal_active
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from package.checkpoint import load_checkpoint
+from package.dyna_q_agent import Dyna_Q_Agent
+from package.q_learning_agent import Q_learning_Agent
+from package.trajectories import (
+    TRANSITION,
+    TrajectoryLog,
+    TrajectoryRecorder,
+    replay_batch,
+    replay_q_learning,
+    train_offline,
+)
+
+
+def record(agent, path, n_episode, buffer_size=64):
+    with TrajectoryRecorder.for_agent(path, agent, buffer_size) as recorder:
+        agent.fit(n_episode, trajectory_log=recorder)
+    return TrajectoryLog(path)
+
+
+def test_recorded_log_matches_the_episodes(tmp_path):
+    agent = Q_learning_Agent()
+    log = record(agent, tmp_path / "log", 5)
+    assert log.metadata["name"] == "Q-learning" and log.n_episodes == 5
+    assert len(log) == agent.n_steps.sum()
+    bounds = log.episode_bounds()
+    assert np.array_equal(np.diff(bounds), agent.n_steps)
+    episode = log.episode(2)
+    assert np.all(episode["episode"] == 2) and episode["done"][-1]
+    assert np.all(episode["state"][1:] == episode["next_state"][:-1])
+    assert np.all(log.transitions["state"][bounds[:-1]] == agent.env.start_state)
+    assert agent.trajectory_log is None
+
+
+def test_recording_does_not_change_training(tmp_path):
+    reference = Q_learning_Agent()
+    reference.fit(5)
+    agent = Q_learning_Agent()
+    record(agent, tmp_path / "log", 5)
+    assert np.array_equal(reference.q_table, agent.q_table)
+
+
+def test_replay_of_single_transitions_matches_q_learning(tmp_path):
+    agent = Q_learning_Agent()
+    log = record(agent, tmp_path / "log", 20)
+    q_table = replay_q_learning(log, batch_size=1, step_size=agent.step_size)
+    assert np.allclose(q_table, agent.q_table, atol=1e-5)
+
+
+def test_replay_batch_applies_updates_in_order():
+    rng = np.random.default_rng(0)
+    batch = np.zeros(200, dtype=TRANSITION)
+    batch["state"] = rng.integers(0, 4, 200)
+    batch["action"] = rng.integers(0, 2, 200)
+    batch["reward"] = rng.normal(size=200)
+    batch["next_state"] = rng.integers(0, 4, 200)
+    batch["done"] = rng.random(200) < 0.2
+    q_table = rng.normal(size=(4, 2))
+    expected = q_table.copy()
+    # sequential updates towards the targets of the q-values before the batch
+    targets = batch["reward"] + np.where(
+        batch["done"], 0, 0.9 * q_table[batch["next_state"]].max(axis=1)
+    )
+    for transition, target in zip(batch, targets):
+        state, action = transition["state"], transition["action"]
+        expected[state, action] += 0.1 * (target - expected[state, action])
+    replay_batch(q_table, batch, step_size=0.1, gamma=0.9)
+    assert np.allclose(q_table, expected)
+
+
+def test_train_offline_fills_the_dyna_model(tmp_path):
+    agent = Dyna_Q_Agent(planning_steps=5)
+    log = record(agent, tmp_path / "log", 5)
+    offline = train_offline(Dyna_Q_Agent(planning_steps=5), log, n_epochs=3)
+    assert dict(offline.model.items()) == dict(agent.model.items())
+    assert list(offline.model) == list(agent.model)
+    expected = replay_q_learning(log, step_size=offline.step_size, n_epochs=3)
+    assert np.array_equal(offline.q_table, expected)
+
+
+def test_checkpoint_during_a_recorded_fit(tmp_path):
+    agent = Q_learning_Agent()
+    with TrajectoryRecorder.for_agent(tmp_path / "log", agent) as recorder:
+        agent.fit(
+            4,
+            trajectory_log=recorder,
+            checkpoint_every=2,
+            checkpoint_path=str(tmp_path / "checkpoint"),
+        )
+    assert load_checkpoint(str(tmp_path / "checkpoint")).trajectory_log is None
+
+
+def test_closed_recorder_raises(tmp_path):
+    agent = Q_learning_Agent()
+    recorder = TrajectoryRecorder.for_agent(tmp_path / "log", agent)
+    agent.fit(2, trajectory_log=recorder)
+    recorder.close()
+    with pytest.raises(ValueError, match="closed"):
+        agent.fit(1, trajectory_log=recorder)
+    assert len(TrajectoryLog(tmp_path / "log")) == agent.n_steps[:2].sum()
@@ -0,0 +1,41 @@
+import numpy as np
+
+from package.env import Env
+from package.vec_env import VecEnv
+
+
+def test_vec_env_matches_env():
+    env = Env()
+    vec_env = VecEnv(n_envs=4)
+    rng = np.random.RandomState(0)
+    for _ in range(50):
+        states = vec_env.states.copy()
+        actions = rng.randint(4, size=4)
+        next_states, rewards, dones = vec_env.step(actions)
+        assert np.all(next_states == env.next_state[states, actions])
+        assert np.all(rewards == env.reward[states, actions])
+        assert np.all(dones == env.terminal[states, actions])
+
+
+def test_vec_env_auto_reset():
+    vec_env = VecEnv(n_envs=2)
+    s = Env().coord_to_state
+    vec_env.states[:] = [s((9, 1)), s((5, 5))]
+    next_states, rewards, dones = vec_env.step(np.array([2, 0]))
+    assert np.all(next_states == [s((9, 2)), s((5, 4))])
+    assert np.all(rewards == [1, 0])
+    assert np.all(dones == [True, False])
+    assert np.all(vec_env.states == [vec_env.start_state, s((5, 4))])
+    assert np.all(vec_env.episodes == [1, 0])
+
+
+def test_vec_env_late_portal_per_copy():
+    vec_env = VecEnv(n_envs=2, late_portal_episode=1)
+    s = Env().coord_to_state
+    # the first copy finishes an episode, which opens its late portal
+    vec_env.states[:] = [s((9, 1)), s((1, 1))]
+    vec_env.step(np.array([2, 0]))
+    assert np.all(vec_env.layout == [1, 0])
+    vec_env.states[:] = s((1, 1))
+    next_states, _, _ = vec_env.step(np.array([2, 2]))
+    assert np.all(next_states == [s((11, 0)), s((1, 2))])
@@ -0,0 +1,43 @@
+import numpy as np
+
+from package.world_model import WorldModel
+
+
+def test_world_model_update():
+    model = WorldModel(n_states=120, n_actions=4)
+    model.update(6, 1, 7, 0)
+    model.update(11, 3, 10, 0)
+    model.update(6, 2, -1, 1)
+    model.update(6, 1, 8, 0)
+
+    assert model == {6: {1: (8, 0), 2: (-1, 1)}, 11: {3: (10, 0)}}
+    assert list(model.states[: model.n_visited]) == [6, 11]
+    assert model.observed.sum() == 3
+    assert 6 in model and 7 not in model and -1 not in model
+
+
+def test_world_model_sample_matches_dict_sampling():
+    model = WorldModel(n_states=120, n_actions=4)
+    rng = np.random.RandomState(0)
+    for state, action in zip(rng.randint(120, size=50), rng.randint(4, size=50)):
+        model.update(state, action, state, 0)
+    as_dict = dict(model)
+
+    a, b = np.random.RandomState(17), np.random.RandomState(17)
+    for _ in range(100):
+        state = a.choice(list(as_dict.keys()))
+        action = a.choice(list(as_dict[state].keys()))
+        assert model.sample(b) == (state, action)
+
+
+def test_world_model_predecessors():
+    model = WorldModel(n_states=120, n_actions=4, track_predecessors=True)
+    model.update(6, 1, 7, 0)
+    model.update(8, 0, 7, 0)
+    model.update(8, 2, -1, 1)
+    assert set(model.predecessors(7)) == {(6, 1), (8, 0)}
+    # the prediction of (6, 1) changes, it moves to the predecessors of 9
+    model.update(6, 1, 9, 0)
+    assert set(model.predecessors(7)) == {(8, 0)}
+    assert set(model.predecessors(9)) == {(6, 1)}
+    assert list(model.predecessors(8)) == []